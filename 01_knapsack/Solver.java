@@ -1,6 +1,8 @@
 import java.io.*;
+import java.nio.charset.StandardCharsets;
 import java.util.List;
 import java.util.ArrayList;
+import java.util.Arrays;
 
 /**
  * The class <code>Solver</code> is an implementation of a greedy algorithm to solve the knapsack problem.
@@ -13,12 +15,51 @@ public class Solver {
      */
     public static void main(String[] args) {
         try {
-            solve(args);
+            if(Arrays.asList(args).contains("-worker"))
+                serve(System.in, System.out);
+            else
+                solve(args);
         } catch (IOException e) {
             e.printStackTrace();
         }
     }
     
+    /**
+     * Worker mode: solve the instances read from the input until it is closed.
+     * Each instance and each solution is a frame: its length in bytes (4 bytes, big endian) followed by the UTF-8 text.
+     * An instance that cannot be solved gets an error frame instead: the negative length of the error message
+     * followed by the message, and the worker keeps running.
+     */
+    public static void serve(InputStream in, OutputStream out) throws IOException {
+        DataInputStream input = new DataInputStream(new BufferedInputStream(in));
+        DataOutputStream output = new DataOutputStream(new BufferedOutputStream(out));
+        while(true){
+            int length;
+            try {
+                length = input.readInt();
+            } catch (EOFException e) {
+                return;
+            }
+            byte[] frame = new byte[length];
+            input.readFully(frame);
+            String solution;
+            int sign = 1;
+            try {
+                String data = new String(frame, StandardCharsets.UTF_8);
+                solution = solve(Arrays.asList(data.split("\n")));
+            } catch (RuntimeException e) {
+                e.printStackTrace();
+                // the message is never empty, since it starts with the class of the exception
+                solution = e.toString();
+                sign = -1;
+            }
+            byte[] bytes = solution.getBytes(StandardCharsets.UTF_8);
+            output.writeInt(sign * bytes.length);
+            output.write(bytes);
+            output.flush();
+        }
+    }
+
     /**
      * Read the instance, solve it, and print the solution in the standard output
      */
@@ -47,8 +88,13 @@ public class Solver {
         finally {
             input.close();
         }
-        
-        
+        System.out.print(solve(lines));
+    }
+
+    /**
+     * Solve the instance given by the lines of the input file and return the solution in the output format
+     */
+    public static String solve(List<String> lines) {
         // parse the data in the file
         String[] firstLine = lines.get(0).split("\\s+");
         int items = Integer.parseInt(firstLine[0]);
@@ -82,10 +128,12 @@ public class Solver {
         }
         
         // prepare the solution in the specified output format
-        System.out.println(value+" 0");
+        StringBuilder output = new StringBuilder();
+        output.append(value+" 0\n");
         for(int i=0; i < items; i++){
-            System.out.print(taken[i]+" ");
+            output.append(taken[i]+" ");
         }
-        System.out.println("");        
+        output.append("\n");
+        return output.toString();
     }
 }
\ No newline at end of file
@@ -10,28 +10,76 @@
 
     TODO:
 
-        * Implement bound described in eq 2.19 and 2.20 of "Martello, S. & Toth, P. Knapsack problems: 
-        algorithms and computer implementations. John Wiley & Sons, 1990".
         * Reimplement the algorithm more in the style of Sec 2.5.1 Horowitz-Sahni Algorithm.
         * Implement the algorithm more in the style of Sec 2.5.2 Martello-Toth Algorithm.
 
 """
 
 import time # used for performance measurements
-import networkx as nx # used only to save the tree
 import math # used only for the trunc
-
-# profiled with
-# https://github.com/benfred/py-spy
-# https://github.com/jlfwong/speedscope
-# other possible profiler
-# https://github.com/nvdv/vprof
+import heapq # used only by the best-first and discrepancy frontiers
+import bisect # used to find the critical item in the prefix sums
+import random # used only by check_relaxation
+import os
+import sys
+import json # used only by the checkpoints
+import numpy as np # used by the checkpoints and the input
+
+try:
+    from solutions.heuristics import primal_solution
+    from solutions.loader import load_items
+    from solutions.tree_trace import Trace_Writer, STATUS_OPEN, STATUS_PRUNED, STATUS_INCUMBENT, STATUS_INFEASIBLE
+    from solutions.search_stats import Search_Stats
+except ImportError:
+    from heuristics import primal_solution
+    from loader import load_items
+    from tree_trace import Trace_Writer, STATUS_OPEN, STATUS_PRUNED, STATUS_INCUMBENT, STATUS_INFEASIBLE
+    from search_stats import Search_Stats
+
+# the counters and timers of the search are saved with stats_file (see search_stats.py).
+# For a profile of the whole program, py-spy (https://github.com/benfred/py-spy) was used
 
 # assign False to submit the solution
 debug = True
 
-# Assign True to build a Networkx graph of the tree and, at the end, save it in Pickle format
+# Assign True to save the tree in a binary trace file while searching. See tree_trace.py
 build_tree = True
+tree_file = 'tree.trace'
+# write only 1 node in trace_sample and only the nodes up to trace_max_depth (None for all depths)
+trace_sample = 1
+trace_max_depth = None
+
+# order in which the nodes of the search tree are expanded: 'dfs', 'best' or 'lds'
+search_order = 'dfs'
+
+# max number of nodes in the heap of the best first search. Above it, the search dives depth first
+max_frontier_nodes = 2**20
+
+# Assign True to fix items to 0 or 1 before the search. See reduce_items
+reduce_variables = True
+
+# Assign True to run the primal heuristics before the search. Their solution is the initial best value
+primal_heuristics = True
+
+# Assign a file name to save a checkpoint of the search at every housekeeping check. The search
+# continues from the last checkpoint with: python bb_heap.py --resume <checkpoint_file>
+checkpoint_file = None
+
+# bound used when an item is left out: 'incremental' (Dantzig's bound with prefix sums, O(log n)),
+# 'scan' (Dantzig's bound, O(n)), 'mt' (Martello and Toth U2), or 'enum' (eq 2.19 and 2.20 of Martello and Toth)
+bound_strategy = 'incremental'
+
+# Assign True to run the depth first search in the compiled kernel of bb_kernel.py when numba is installed.
+# It is used only with the 'incremental' bound, without build_tree, stats_file, or checkpoints
+jit_kernel = True
+
+# Assign a file name to save the counters and timers of the search as JSON: nodes created and pruned
+# per depth, time of the bound, max frontier size and the best values over time. See search_stats.py
+stats_file = None
+
+# the module of the compiled kernel. Imported by load_kernel when the kernel is about to run, since numba
+# takes a while to import
+bb_kernel = None
 
 class Input_Item:
     def __init__(self, index, value, weight):
@@ -53,6 +101,10 @@ class Input_Item:
         return '<%d, %d, %d>' % (self.index, int(self.value), self.weight)
 
 class Heap_Node:
+    # one node is created per expansion, so the nodes have no __dict__. This saves about half of their memory
+    __slots__ = ('left', 'right', 'heap_depth', 'index', 'iter', 'value', 'room', 'estimate', 'slack_idx',
+        'slack_used', 'parent', 'taken', 'discrepancies')
+
     def __init__(self):
         """ Item in the heap.
 
@@ -77,20 +129,259 @@ class Heap_Node:
         self.slack_idx = 0
         # e.g. if the slack item has weight 5, but only 3 was used, then slack_used is 3
         self.slack_used = 0
-        # current taken itens
-        self.taken_itens = []
+        # parent node in the search tree. None for the root
+        self.parent = None
+        # True if the item 'index' was taken to create this node
+        self.taken = False
+        # number of left branches (items left out) in the path to this node
+        self.discrepancies = 0
 
     def __str__(self):
         return '<%d, %d, %d, %d, %.2f, %d, %d, %s>' % (self.heap_depth, self.index, 
             int(self.value), self.room, self.estimate, self.slack_idx, self.slack_used,
-            str(self.taken_itens))
+            str(self.taken))
+
+
+class Stack_Frontier:
+    def __init__(self):
+        """ Depth first frontier of the search.
+
+        The nodes are kept in a python list used as a stack. Both push and pop
+        work at the end of the list, so they are O(1) regardless of the search depth.
+        """
+        # name of the search order, saved in the checkpoints
+        self.order = 'dfs'
+        self.nodes = []
+
+    def push(self, node):
+        self.nodes.append(node)
+
+    def pop(self):
+        return self.nodes.pop()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def bound(self, best_value):
+        """ Upper bound of the nodes not expanded yet: their best estimate, but not less than best_value. """
+        return max(max((node.estimate for node in self.nodes), default=best_value), best_value)
+
+    def dump(self):
+        """ The nodes, their insertion counters, and the state of the frontier. Used by save_checkpoint. """
+        return list(self.nodes), [0]*len(self.nodes), {}
+
+    def load(self, nodes, counters, state):
+        """ Restore the frontier saved by :meth:`dump`. """
+        self.nodes = list(nodes)
+
+
+class Best_First_Frontier:
+    def __init__(self, max_nodes=None):
+        """ Best first frontier of the search.
+
+        The node with the highest estimate is expanded first. Ties are broken by the 
+        deepest node, which makes the search dive as a depth first search would do.
+        The heap holds at most 'max_nodes' nodes. When it is full, the new nodes go to a stack
+        and the search dives depth first until this stack is empty, using O(depth) memory.
+
+        Args:
+            max_nodes (int): The node budget of the heap. None means no limit.
+        """
+        self.order = 'best'
+        self.nodes = []
+        # nodes of the current depth first dive
+        self.dive = []
+        self.max_nodes = max_nodes
+        # insertion counter. it avoids comparing Heap_Node when the keys are the same
+        self.count = 0
+        # number of depth first dives caused by the full heap
+        self.dives = 0
+
+    def push(self, node):
+        if self.dive or (self.max_nodes is not None and len(self.nodes) >= self.max_nodes):
+            if not self.dive:
+                self.dives += 1
+            self.dive.append(node)
+        else:
+            self.count += 1
+            heapq.heappush(self.nodes, (-node.estimate, -node.heap_depth, -self.count, node))
+
+    def pop(self):
+        if self.dive:
+            return self.dive.pop()
+        return heapq.heappop(self.nodes)[3]
+
+    def __len__(self):
+        return len(self.nodes) + len(self.dive)
+
+    def bound(self, best_value):
+        """ Upper bound of the nodes not expanded yet. The heap top has the best estimate of the heap. """
+        bound = -self.nodes[0][0] if self.nodes else best_value
+        return max(max((node.estimate for node in self.dive), default=bound), bound, best_value)
+
+    def dump(self):
+        """ The nodes, their insertion counters, and the state of the frontier. Used by save_checkpoint. """
+        nodes = [entry[3] for entry in self.nodes] + self.dive
+        counters = [-entry[2] for entry in self.nodes] + [0]*len(self.dive)
+        return nodes, counters, {'heap': len(self.nodes), 'count': self.count, 'dives': self.dives, 'max_nodes': self.max_nodes}
+
+    def load(self, nodes, counters, state):
+        """ Restore the frontier saved by :meth:`dump`. The heap keeps the same order. """
+        heap = state['heap']
+        self.nodes = [(-node.estimate, -node.heap_depth, -counter, node) for node, counter in zip(nodes[:heap], counters[:heap])]
+        self.dive = list(nodes[heap:])
+        self.count = state['count']
+        self.dives = state['dives']
+        self.max_nodes = state['max_nodes']
+
+
+class Discrepancy_Frontier:
+    def __init__(self):
+        """ Limited discrepancy frontier of the search.
+
+        Following the relaxation, i.e. taking the next item, is the heuristic choice, 
+        while leaving it out is a discrepancy, unless the item does not fit. The nodes with less
+        discrepancies in their path are expanded first, deepest first. A node whose right side was
+        already expanded is pushed back with one extra discrepancy if its item fits, since its next child is the left one.
+        """
+        self.order = 'lds'
+        self.nodes = []
+        self.count = 0
+        # weight of the item branched at each depth. Assigned by Heap
+        self.weights = None
+
+    def discrepancies(self, node):
+        """ Discrepancies of the next child of the node. Leaving out an item that does not fit is not a choice. """
+        if node.right != None and node.room >= self.weights[node.heap_depth]:
+            return node.discrepancies + 1
+        return node.discrepancies
+
+    def push(self, node):
+        self.count += 1
+        heapq.heappush(self.nodes, (self.discrepancies(node), -node.heap_depth, -self.count, node))
+
+    def pop(self):
+        return heapq.heappop(self.nodes)[3]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def bound(self, best_value):
+        """ Upper bound of the nodes not expanded yet: their best estimate, but not less than best_value. """
+        return max(max((entry[3].estimate for entry in self.nodes), default=best_value), best_value)
+
+    def dump(self):
+        """ The nodes, their insertion counters, and the state of the frontier. Used by save_checkpoint. """
+        return [entry[3] for entry in self.nodes], [-entry[2] for entry in self.nodes], {'count': self.count}
+
+    def load(self, nodes, counters, state):
+        """ Restore the frontier saved by :meth:`dump`. The heap keeps the same order. """
+        self.nodes = [(self.discrepancies(node), -node.heap_depth, -counter, node) for node, counter in zip(nodes, counters)]
+        self.count = state['count']
+
+
+def make_frontier(order):
+    """ Create the frontier used to select the next node to be expanded.
+
+    Args:
+        order (str): 'dfs' for depth first, 'best' for best first, or 'lds' for limited discrepancy search.
+
+    Returns:
+        The frontier object, with push, pop, len, bound, dump, and load.
+    """
+    if order == 'dfs':
+        return Stack_Frontier()
+    elif order == 'best':
+        return Best_First_Frontier(max_frontier_nodes)
+    elif order == 'lds':
+        return Discrepancy_Frontier()
+    else:
+        raise ValueError("unsupported search order '%s'" % order)
+
+
+class Stop_Policy:
+    def __init__(self, max_time=5*60, min_time=1*60, target_utilization=0.995, max_nodes=None, gap=None, 
+            check_period=0.01):
+        """ Stop criteria of the search. None disables a criteria.
+
+        The search stops before the frontier is empty, and the result is not proven optimal, when:
+
+        * it has run for more than max_time seconds;
+        * it has run for more than min_time seconds and the best solution fills more than
+          target_utilization of the knapsack;
+        * it has expanded max_nodes nodes;
+        * the best estimate of the frontier minus the best value is at most gap.
+
+        The clock is read about every check_period seconds. The number of expansions between
+        two checks is computed from the expansions per second measured in the previous check,
+        so slow expansions do not overshoot the time budget.
+
+        Args:
+            max_time (float): Max execution time (s).
+            min_time (float): The utilization criteria is not used before this time (s).
+            target_utilization (float): Fraction of the knapsack filled by the best solution.
+            max_nodes (int): Max number of expansions.
+            gap (int): Max difference between the upper bound and the best value.
+            check_period (float): Time between the checks (s).
+        """
+        self.max_time = max_time
+        self.min_time = min_time
+        self.target_utilization = target_utilization
+        self.max_nodes = max_nodes
+        self.gap = gap
+        self.check_period = check_period
+
+    def check(self, tree, iter, elapsed):
+        """ Check the stop criteria.
+
+        Args:
+            tree (Heap): The search tree.
+            iter (int): Number of expansions so far, plus one.
+            elapsed (float): Execution time so far (s).
+
+        Returns:
+            str: The reason to stop: 'time', 'utilization', 'nodes', or 'gap'. None to continue the search.
+        """
+        if self.max_time is not None and elapsed > self.max_time:
+            return 'time'
+        if self.target_utilization is not None and elapsed > (self.min_time or 0) and \
+                tree.utilization > self.target_utilization:
+            return 'utilization'
+        if self.max_nodes is not None and iter > self.max_nodes:
+            return 'nodes'
+        if self.gap is not None and tree.frontier.bound(tree.best_value) - tree.best_value <= self.gap:
+            return 'gap'
+        return None
+
+    def next_check(self, iter, speed, elapsed):
+        """ Iteration of the next check.
+
+        Args:
+            iter (int): Number of expansions so far, plus one.
+            speed (float): Measured expansions per second.
+            elapsed (float): Execution time so far (s).
+
+        Returns:
+            int: About check_period seconds ahead, but not after the time or the node budgets.
+        """
+        period = self.check_period
+        if self.max_time is not None:
+            period = min(period, max(self.max_time - elapsed, 0.0))
+        step = max(int(speed * period), 1)
+        if self.max_nodes is not None:
+            step = min(step, max(self.max_nodes + 1 - iter, 1))
+        return iter + step
 
 
 class Heap:
     #def __init__(self, items, sort_items_function, capacity):
-    def __init__(self, items, capacity):
-        # use lifo.insert(0,) to push and lifo.pop(0) to pop from it in LIFO order
-        self.lifo = []
+    def __init__(self, items, capacity, frontier=None, bound=None):
+        # nodes not fully expanded yet. by default, a stack for depth first search
+        if frontier is None:
+            frontier = Stack_Frontier()
+        if isinstance(frontier, Discrepancy_Frontier):
+            frontier.weights = [i.weight for i in items]
+        self.frontier = frontier
         # a sorted list of items 
         self.items = items
         self.item_len = len(items)
@@ -98,93 +389,230 @@ class Heap:
         # best value so far
         self.best_value = 0
         # holds a list with selected item indexes 
-        self.solution = [0]*len(items)
+        self.solution = []
         # the node index of the best value. used only to paint this node with a diff color
         self.solution_idx = 0
         # expansion size
         self.iters = 0
-
-
-    def relaxation(self, items, cur_estimate, slack_idx, slack_used, ritem_idx):
-        """ Fractional item relaxation heuristic. This function is NOT WORKING !!!
+        # number of feasible nodes discarded by the bound
+        self.pruned = 0
+        # prefix sums of the sorted weights and values. prefix_weight[i] is the weight of items[0:i]
+        self.prefix_weight = [0]*(len(items)+1)
+        self.prefix_value = [0]*(len(items)+1)
+        for i in range(len(items)):
+            self.prefix_weight[i+1] = self.prefix_weight[i] + items[i].weight
+            self.prefix_value[i+1] = self.prefix_value[i] + items[i].value
+        # bound computed when an item is left out
+        if bound is None:
+            bound = bound_strategy
+        self.bound = bound
+        if bound == 'incremental':
+            self.left_bound = self.relaxation
+        elif bound == 'scan':
+            self.left_bound = self.scan_relaxation
+        elif bound == 'mt':
+            self.left_bound = self.relax_martello_and_toth
+        elif bound == 'enum':
+            self.left_bound = self.relax_enumerative
+        else:
+            raise ValueError("unsupported bound strategy '%s'" % bound)
+        # time spent in the search (s). used to report expansions per second
+        self.exec_time = 0.0
+        # % of knapsack filled by the best solution. this is used as a stop criteria
+        self.utilization = 0.0
+        # the stop criteria
+        self.policy = Stop_Policy()
+        # why the search stopped before the frontier was empty. None if the result is optimal
+        self.stop_reason = None
+        # number of expansions between the debug messages and the calls to on_housekeeping
+        self.housekeeping_interval = 0x80000
+        # optional functions called with this object when a new best solution is found
+        # and at every housekeeping check. Used to share the best value between processes
+        self.on_incumbent = None
+        self.on_housekeeping = None
+        # trace of the search tree, while the search runs. The checkpoints save its number of records
+        self.trace = None
+        self.trace_records = None
+        # counters and timers of the last search, when stats_file is set. See search_stats.py
+        self.stats = None
+
+
+    def relaxation(self, value, room, first_idx, slack_idx):
+        """ Incremental fractional item relaxation (Dantzig's bound) of a node.
 
         The explanation of the Fractional item relaxation heuristic in the video 'Knapsack 5 - relaxation, branch and bound',
         SUCK ... a big time !!!!
         In `this post <https://www.coursera.org/learn/discrete-optimization/discussions/weeks/2/threads/M30RzDnzEeew7Q7A7m3f-g/replies/OnqPNTqYEeerRhI_jX3yNA/comments/KrEW5z0xEee7bwpYS6iFWg>_` 
         has a descent explanation about the 77 estimate in the Coursera video.
         Also, the fractional heuristic is better explained in this `video <https://youtu.be/vb0juybGIKY?list=PL6KMWPQP_DM8t5pQmuLlarpmVc47DVXWd&t=264>_`.
-        According to this video, it's possible to reduce the average execution time of the relaxation function.
 
-        The idea of this optimization is that relaxation could be calculated incremently in a given path. 
-        The estimate value of the next not taken item uses the prior node estimate. The worst case complexity is still O(n),
-        but in average is O(1). However, this is quite complex for the data structure i have selected and it's full of corner cases that eventually 
-        break the code. This optimization is mentioned in this `video <https://youtu.be/jxGwFWeZB0U?list=PL6KMWPQP_DM8t5pQmuLlarpmVc47DVXWd&t=3099>_`.
+        The idea of this optimization is that relaxation could be calculated incremently in a given path.
+        This optimization is mentioned in this `video <https://youtu.be/jxGwFWeZB0U?list=PL6KMWPQP_DM8t5pQmuLlarpmVc47DVXWd&t=3099>_`.
+        Instead of walking the items after the branching item, the prefix sums of the sorted weights
+        and values are used to find the new critical item with a binary search, so each bound is O(log n).
+        Leaving an item out only frees room, so the new critical item is never before the 
+        critical item of the parent. Then, the search starts from the parent's 'slack_idx'.
 
         Args:
-            items ([Input_Item]): List of input items.
-            cur_estimate (int): Current estimate.
-            slack_idx (int): Slack item index.
-            slack_used (int): The used slack.
-            ritem_idx (int): The item to be excluded from the list.
+            value (int): Value of the taken items so far.
+            room (int): Room left in the knapsack.
+            first_idx (int): Index of the first item not decided yet.
+            slack_idx (int): Critical item index of the parent node. Used as a hint for the search.
 
         Returns:
             int, int, int: The new estimate, the new critical item index, the used part of the critical item (residual capacity).
         """
-        room = 0
-        estimate = 0
-        item = 0
-        removed_item = items[ritem_idx]
-        if ritem_idx == slack_idx:
-            # if the item to be deleted is the current critical item, then it's necessary
-            # to be aware that this item was not entirely taken
-            estimate = cur_estimate - math.trunc(slack_used * removed_item.value / removed_item.weight)
-            room = slack_used
+        prefix_weight = self.prefix_weight
+        base_weight = prefix_weight[first_idx]
+        target = base_weight + room
+        # items in [first_idx, item) fit entirely in the room
+        item = bisect.bisect_right(prefix_weight, target, max(slack_idx, first_idx), self.item_len+1) - 1
+        estimate = value + self.prefix_value[item] - self.prefix_value[first_idx]
+        slack_used = target - prefix_weight[item]
+        if item < self.item_len and slack_used > 0:
+            critical = self.items[item]
+            # trunc is applied because the estimate because the solution must be integer.
+            estimate += math.trunc(slack_used / float(critical.weight) * critical.value)
         else:
-            # the item to be deleted was entire taken
-            estimate = cur_estimate - removed_item.value
-            room = removed_item.weight
-        # defining the initial item to search the new critical item is the hardst part.
-        # not fully understood yet 
-        item = min(slack_idx + 1,len(items))
-        # so that it will start searching from 'slack_idx' instead of from the beginning
-        # reducing drastically the relaxation search time
-        fractional = False
-        # keep reducing the room until the next fraction item or the end of the list is found 
-        while room > 0 and item < len(items):
-            if room-items[item].weight >= 0:
-                room -= items[item].weight
-                slack_used = items[item].weight
-                estimate += items[item].value
-                item +=1
+            # there is no fractioned item. point to the last item entirely taken
+            item -= 1
+            slack_used = self.items[item].weight if item >= 0 else 0
+        return estimate, item, slack_used
+
+    def scan_relaxation(self, value, room, first_idx, slack_idx):
+        """ Fractional item relaxation of a node, walking the items after the branching item.
+
+        It gives the same estimate as :meth:`relaxation`, but it is O(n) per node. 
+        Kept as the reference bound strategy.
+
+        Args:
+            value (int): Value of the taken items so far.
+            room (int): Room left in the knapsack.
+            first_idx (int): Index of the first item not decided yet.
+            slack_idx (int): Not used. Kept for compatibility with :meth:`relaxation`.
+
+        Returns:
+            int, int, int: The new estimate, the new critical item index, the used part of the critical item (residual capacity).
+        """
+        idx = first_idx
+        slack_used = 0
+        estimate = value
+        while room > 0 and idx < self.item_len:
+            item = self.items[idx]
+            if room-item.weight >= 0:
+                room -= item.weight
+                slack_used = item.weight
+                estimate += item.value
+                idx +=1
             else:
                 slack_used = room
-                room = room / float(items[item].weight)
-                estimate += math.trunc(room * items[item].value)
-                item -= 1
-                fractional = True
+                used_fraction = slack_used / float(item.weight)
+                # trunc is applied because the estimate because the solution must be integer.
+                # this might prune the search tree in some cases, but it increases execution time
+                estimate += math.trunc(used_fraction * item.value)
                 break
-        if not fractional:
-            item -= 1        
-
-        return estimate, item, slack_used        
+        return estimate, idx, slack_used
 
-
-    def relax_martello_and_toth(self):
-        """ A better upper bound compared to 'Dantzig's bound'. TO BE DONE!
+    def relax_martello_and_toth(self, value, room, first_idx, slack_idx):
+        """ A better upper bound compared to 'Dantzig's bound'.
 
         Bound taken from "Martello, S. & Toth, P. Knapsack problems: algorithms and 
         computer implementations. John Wiley & Sons, 1990", Section 2.3.1, eq 2.14 to 2.16.
-        In the same section, eq 2.19 and 2.20, there is a even better bound. However, this 
-        was not implemented. Left for future work.
+        U_0 leaves the critical item s out and fills the residual capacity with the next item.
+        U_1 forces the critical item in and removes the needed room from the previous item.
+        If there is no free item before the critical item, it cannot be forced in and U_1 is not valid.
 
         .. math::
 
             U_0 = \sum_{j=1}^{s-1} p_j + \left \lfloor \bar{c}\frac{p_{s+1}}{w_{s+1}} \right \rfloor
             U_1 = \sum_{j=1}^{s-1} p_j + \left \lfloor p_s - (w_s - \bar{c}) \frac{p_{s-1}}{w_{s-1}} \right \rfloor
-            U_2 = \textsl{max}(U_0 \cdot U_1)
+            U_2 = \textsl{max}(U_0, U_1)
+
+        Args:
+            value (int): Value of the taken items so far.
+            room (int): Room left in the knapsack.
+            first_idx (int): Index of the first item not decided yet.
+            slack_idx (int): Critical item index of the parent node. Used as a hint for the search.
 
+        Returns:
+            int, int, int: The new estimate, the new critical item index, the used part of the critical item (residual capacity).
         """
-        pass
+        prefix_weight = self.prefix_weight
+        target = prefix_weight[first_idx] + room
+        item = bisect.bisect_right(prefix_weight, target, max(slack_idx, first_idx), self.item_len+1) - 1
+        estimate = value + self.prefix_value[item] - self.prefix_value[first_idx]
+        slack_used = target - prefix_weight[item]
+        if item < self.item_len and slack_used > 0:
+            critical = self.items[item]
+            u0 = estimate
+            if item+1 < self.item_len:
+                nxt = self.items[item+1]
+                u0 += slack_used * nxt.value // nxt.weight
+            u1 = u0
+            if item > first_idx:
+                prev = self.items[item-1]
+                # floor(p_s - x) = p_s - ceil(x)
+                u1 = estimate + critical.value + ((slack_used - critical.weight) * prev.value) // prev.weight
+            estimate = max(u0, u1)
+        else:
+            # there is no fractioned item, so the greedy solution is optimal for this node
+            item -= 1
+            slack_used = self.items[item].weight if item >= 0 else 0
+        return estimate, item, slack_used
+
+    def relax_enumerative(self, value, room, first_idx, slack_idx):
+        """ Upper bound obtained by branching on the critical item.
+
+        See eq 2.19 and 2.20 of Martello and Toth, 1990, Section 2.3.1. Instead of using only the
+        items next to the critical item, as in :meth:`relax_martello_and_toth`, the Dantzig's bound
+        of both subproblems is used: with the critical item left out, the residual capacity is filled 
+        with the items after it; with the critical item forced in, the needed room is removed from the 
+        items before it, in reverse order. It is never worse than U_2.
+
+        .. math::
+
+            \bar{U}^0 = \sum_{j=1}^{s-1} p_j + \textsl{Dantzig}(\{s+1, \dots, n\}, \bar{c})
+            \bar{U}^1 = p_s + \textsl{Dantzig}(\{1, \dots, s-1\}, c - w_s)
+            U = \textsl{max}(\bar{U}^0, \bar{U}^1)
+
+        Args:
+            value (int): Value of the taken items so far.
+            room (int): Room left in the knapsack.
+            first_idx (int): Index of the first item not decided yet.
+            slack_idx (int): Critical item index of the parent node. Used as a hint for the search.
+
+        Returns:
+            int, int, int: The new estimate, the new critical item index, the used part of the critical item (residual capacity).
+        """
+        prefix_weight = self.prefix_weight
+        prefix_value = self.prefix_value
+        items = self.items
+        target = prefix_weight[first_idx] + room
+        item = bisect.bisect_right(prefix_weight, target, max(slack_idx, first_idx), self.item_len+1) - 1
+        estimate = value + prefix_value[item] - prefix_value[first_idx]
+        slack_used = target - prefix_weight[item]
+        if item < self.item_len and slack_used > 0:
+            critical = items[item]
+            # critical item left out: fill the residual capacity with the items after it
+            target0 = prefix_weight[item+1] + slack_used
+            item0 = bisect.bisect_right(prefix_weight, target0, item+1, self.item_len+1) - 1
+            u0 = estimate + prefix_value[item0] - prefix_value[item+1]
+            if item0 < self.item_len:
+                u0 += (target0 - prefix_weight[item0]) * items[item0].value // items[item0].weight
+            # critical item forced in: the items in [first_idx, item1) are kept and item1 is fractioned
+            u1 = u0
+            target1 = prefix_weight[item] + slack_used - critical.weight
+            if target1 >= prefix_weight[first_idx]:
+                item1 = bisect.bisect_right(prefix_weight, target1, first_idx, item+1) - 1
+                u1 = value + prefix_value[item1] - prefix_value[first_idx] + critical.value
+                if item1 < item:
+                    u1 += (target1 - prefix_weight[item1]) * items[item1].value // items[item1].weight
+            estimate = max(u0, u1)
+        else:
+            # there is no fractioned item, so the greedy solution is optimal for this node
+            item -= 1
+            slack_used = items[item].weight if item >= 0 else 0
+        return estimate, item, slack_used
 
     def linear_relaxation(self, items, capacity):
         """ Compute an upper bound for the cost. 
@@ -233,242 +661,257 @@ class Heap:
             item -= 1
         return estimate,item,slack_used
     
-    def transverse(self, estimate, slack_idx, slack_used):
+    def taken_items(self, node):
+        """ Rebuild the list of taken items following the parent of each node up to the root.
+
+        It costs O(depth), but it is only called when a new best solution is found.
+
+        Args:
+            node (Heap_Node): The last node of the path.
+
+        Returns:
+            [Input_Item]: The taken items, in the order of self.items.
+        """
+        taken = []
+        while node.parent is not None:
+            if node.taken:
+                taken.append(self.items[node.heap_depth-1])
+            node = node.parent
+        return taken[::-1]
+
+    def use_kernel(self):
+        """ True if the search can run in the compiled kernel of bb_kernel.py. See jit_kernel. """
+        return jit_kernel and not build_tree and stats_file is None and checkpoint_file is None and \
+            self.bound == 'incremental' and isinstance(self.frontier, Stack_Frontier) and len(self.frontier) == 0 and \
+            load_kernel().available
+
+    def transverse(self, estimate, slack_idx, slack_used, initial=None, resume=False):
         """ Main search function for the 0-1 knapsack problem.
 
         Args:
             estimate (int): The initial relaxation estimate.
             slack_idx (int): The index to the critical item.
             slack_used (int): The residual capacity.
+            initial (Heap_Node): The node where the search starts. By default, the root of the tree
+                is created with the other arguments. A node deeper in the tree searches only its subtree.
+            resume (bool): Continue the search from the frontier and counters restored by load_checkpoint.
 
         Returns:
             bool: False if the procedure was not aborted, meaning that the result is optimal.
         """
+        if not resume and self.use_kernel():
+            return bb_kernel.transverse(self, estimate, slack_idx, slack_used, debug, initial)
         # set the initial node for heap searching
-        initial = Heap_Node()
-        initial.heap_depth = 0
-        initial.index = 0
-        initial.value = 0
-        initial.room = self.capacity
-        initial.estimate = estimate
-        initial.slack_idx = slack_idx
-        initial.slack_used = slack_used
-        initial.taken_itens = self.items[:]
-        # initialize the lifo
-        self.lifo.append(initial)
+        if initial is None and not resume:
+            initial = Heap_Node()
+            initial.heap_depth = 0
+            initial.index = 0
+            initial.value = 0
+            initial.room = self.capacity
+            initial.estimate = estimate
+            initial.slack_idx = slack_idx
+            initial.slack_used = slack_used
+        # initialize the frontier
+        if not resume:
+            self.frontier.push(initial)
         # points to the current input item of the input list
         input_idx = 0
         # to avoid calling len multiple times inside the main loop
         items_lenght = len(self.items)
-        # extract the max heap size. Used as a kind of memory used indicator
-        #max_heap = 0
+        # to avoid the attribute lookup inside the main loop
+        left_bound = self.left_bound
+        housekeeping_interval = self.housekeeping_interval
         # used as a kind of performance metric. number of expansions in the search
-        iter = 1
-        # % of knapsack filled. this is used as a stop criteria
-        knapsack_utilization = 0.0
-        # profiling vars
-        #time_left_prep = 0
-        #time_left_relax = 0
-        #time_left_relax2 = 0
-        # starting the execution timer
-        start_time = time.time()
+        iter = self.iters if resume else 1
+        # counters and timers. When they are disabled, the loop only checks that stats is None
+        stats = None
+        if stats_file is not None:
+            stats = Search_Stats(items_lenght, self.best_value)
+            self.stats = stats
+            left_bound = stats.timed(left_bound)
+        # starting the execution timer. a resumed search continues the time of the checkpoint
+        start_time = time.time() - (self.exec_time if resume else 0.0)
         abort = False
+        policy = self.policy
+        self.stop_reason = None
+        # iteration of the next check of the stop criteria. the first check measures the speed
+        next_check = iter + 0x100
+        last_iter, last_time = iter, time.time()
         # used only to save the tree
-        G = None
+        trace = None
         if build_tree:
-            G = nx.DiGraph()
-            G.add_node(0)
-            G.nodes[0]['value'] = initial.value
-            G.nodes[0]['estimate'] = initial.estimate
-            G.nodes[0]['room'] = initial.room
-            G.nodes[0]['color'] = 'gray'
-
-
-        # THE STOP CRITERIA:
-        # If program has run for at least MIM_EXEC_TIME and got at least
-        # KNAP_TARGET_UTILIZATION knapsack utilization, then it can be stoped.
-        # Morever, if the execution time is more than MAX_EXEC_TIME, no matter the 
-        # KNAP_TARGET_UTILIZATION, it must also be stoped.
-
-        # stop when the knapsack reaches 99.5% of utilization
-        KNAP_TARGET_UTILIZATION = 0.995
-        # minimum execution time. the execution cannot be aborted before this time (s)
-        MIN_EXEC_TIME = 1 * 60
-        # max execution time. the execution cannot run for more than this time (s)
-        MAX_EXEC_TIME = 5 * 60
-
-        # repeat until the stack is empty
-        while (len(self.lifo) > 0 and not abort):
-            input_idx = self.lifo[0].heap_depth
+            trace = Trace_Writer(tree_file, trace_sample, trace_max_depth, self.trace_records if resume else None)
+            self.trace = trace
+            if not resume:
+                trace.node(initial.iter, -1, initial.value, initial.estimate, initial.room, initial.heap_depth, STATUS_OPEN)
+
+
+        # a child that is not pushed into the frontier is not referenced by any other node,
+        # so it is reused by the next expansion instead of allocating a new node
+        spare = None
+
+        # repeat until the frontier is empty
+        frontier = self.frontier
+        while (len(frontier) > 0 and not abort):
+            # every node produces two children, one per iteration. the node is pushed back
+            # after its right child is created, so the left child is only computed when the 
+            # frontier gets back to it, with an updated best_value
+            node = frontier.pop()
+            # the best value may have improved since the node was pushed
+            if node.estimate <= self.best_value:
+                if stats is not None:
+                    stats.discard(node.heap_depth)
+                continue
+            input_idx = node.heap_depth
             # add another branch to the search based on the next item of the input list
             iitem = self.items[input_idx]
-            titem = Heap_Node()
+            if spare is None:
+                titem = Heap_Node()
+            else:
+                titem = spare
+                spare = None
+                titem.left = None
+                titem.right = None
+                titem.taken = False
             titem.index = iitem.index
-            # this can potentially leak the input list, but this is fixed with the 'min' few line below
             titem.heap_depth = input_idx+1
-            # measure the time to execute this list copy 
-            #tstart = time.time()
-            titem.taken_itens = self.lifo[0].taken_itens[:]
-            #time_copy += time.time() - tstart
+            # the child only points to its parent. the taken items are recovered from 
+            # this chain of nodes when a new best solution is found
+            titem.parent = node
             # since the right side is checked 1st in this if, it will have priority over the left side
-            if self.lifo[0].right == None:
-                titem.value = self.lifo[0].value+iitem.value
-                titem.room = self.lifo[0].room-iitem.weight
-                titem.estimate = self.lifo[0].estimate
-                titem.slack_idx  = self.lifo[0].slack_idx
-                titem.slack_used = self.lifo[0].slack_used
-                self.lifo[0].right = 1
+            if node.right == None:
+                titem.taken = True
+                titem.value = node.value+iitem.value
+                titem.room = node.room-iitem.weight
+                titem.estimate = node.estimate
+                titem.slack_idx  = node.slack_idx
+                titem.slack_used = node.slack_used
+                titem.discrepancies = node.discrepancies
+                node.right = 1
+                # the left side is still to be expanded
+                frontier.push(node)
             else:
-                #tstart = time.time()
-                titem.value = self.lifo[0].value
-                titem.room = self.lifo[0].room
-                deleted_idx = 0
-                idx = 0
-                room = self.capacity
-                slack_used = 0
-                estimate = 0                        
-                for item in titem.taken_itens:
-                    # when taking the left side, the item 'iitem' must be removed.
-                    # Then, find the item and delete it
-                    if item.index == iitem.index:
-                        deleted_idx = idx
-                    else:
-                        if room-item.weight >= 0:
-                            room -= item.weight
-                            slack_used = item.weight
-                            estimate += item.value
-                            idx +=1
-                        elif room > 0:
-                            # print ("\n\nINTEGRAL PART:")
-                            # print (" - prev estimate:",self.lifo[0].estimate)
-                            # print (" - prev slack used:",self.lifo[0].slack_used)
-                            # print (" - int estimate:", estimate)
-                            # print (" - room:", room)
-                            # print (" - used capacity:", self.capacity-room)
-                            # print (str([str(i) for i in titem.taken_itens]))
-
-                            slack_used = room
-                            room = 0
-                            used_fraction = slack_used / float(item.weight)
-                            # trunc is applied because the estimate because the solution must be integer.
-                            # this might prune the search tree in some cases, but it increases execution time
-                            estimate += math.trunc(used_fraction * item.value)
-
-                            # print ("FRACTIONAL PART:")
-                            # print (" - deleted item idx:", deleted_idx)
-                            # print (" - deleted item:", str(titem.taken_itens[deleted_idx]))
-                            # print (" - critical item idx:", idx)
-                            # print (" - critical item", str(item))
-                            # print (" - frac estimate:", math.trunc(used_fraction * item.value))
-                            # print (" - used slack:", slack_used)
-                            # print (" - total estimate:", estimate)
-                            #print (" - int+frac capacity:", self.capacity-slack_used)
-                            break
-                del (titem.taken_itens[deleted_idx]) 
-                # print (str([str(i) for i in titem.taken_itens]))                  
-                #time_left_prep += time.time()-tstart
-
-                # ALTERNATE RELAXATION !!! This one works, but it is slower than the current code
-                #tstart = time.time()
-                #titem.estimate, titem.slack_idx, titem.slack_used =  self.linear_relaxation(titem.taken_itens,self.capacity)
-                #time_left_relax += time.time()-tstart
-
-                # ALTERNATE RELAXATION !!! This one DOES NOT WORK. It should be even faster than the current code
-                # tstart = time.time()
-                #estimate2, slack_idx2, slack_used2 =  self.relaxation(self.lifo[0].taken_itens, self.lifo[0].estimate, self.lifo[0].slack_idx, self.lifo[0].slack_used, deleted_idx)
-                #estimate2, slack_idx2, slack_used2 =  estimate, idx, slack_used
-                titem.estimate, titem.slack_idx, titem.slack_used =  estimate, idx, slack_used
-                # time_left_relax2 += time.time()-tstart
-
-                # UNCOMMENT THIS BLOCK TO TEST ALTERNATE RELAXATIONS STRATEGIES
-                # if estimate2 != titem.estimate or slack_idx2 != titem.slack_idx and slack_used2 != titem.slack_used:
-                #     print ("BUUUUUUUG !!!!! new relaxation is buggy !")
-                #     print ('EXPECTED:', titem.estimate, titem.slack_idx, titem.slack_used)
-                #     print ('PARENT:')
-                #     taken = [0]*items_lenght
-                #     for i in self.lifo[0].taken_itens:
-                #         taken[i.index] = 1
-                #     print (taken)
-                #     print (self.lifo[0].estimate,self.lifo[0].value, self.lifo[0].room, self.lifo[0].slack_idx, self.lifo[0].slack_used)
-                #     print ('GOT:')
-                #     taken = [0]*items_lenght
-                #     for i in titem.taken_itens:
-                #         taken[i.index] = 1
-                #     print (taken)
-                #     print (self.lifo[0].estimate, self.lifo[0].slack_idx, self.lifo[0].slack_used, input_idx-1)
-                #     print (estimate2, slack_idx2, slack_used2)
-                self.lifo[0].left = 1
+                titem.value = node.value
+                titem.room = node.room
+                # leaving out an item that does not fit is not a discrepancy
+                titem.discrepancies = node.discrepancies + (1 if node.room >= iitem.weight else 0)
+                # the items before 'iitem' are decided and all the taken ones fit in the knapsack.
+                # Thus, the relaxation is the value so far plus the relaxation of the remaining 
+                # room with the items after 'iitem'
+                titem.estimate, titem.slack_idx, titem.slack_used = left_bound(node.value, node.room, input_idx+1, node.slack_idx)
+                node.left = 1
             
             # used only to save the tree format
             titem.iter  = iter
-            if build_tree:
-                G.add_node(titem.iter)
-                G.add_edge(self.lifo[0].iter, titem.iter)
-                G.nodes[titem.iter]['value'] = titem.value
-                G.nodes[titem.iter]['estimate'] = titem.estimate
-                G.nodes[titem.iter]['room'] = titem.room
-                G.nodes[titem.iter]['color'] = 'gray'
+            status = STATUS_OPEN
 
             # if the estimate is better than the best value found so far,
             # then it is necessary to continue the search. 
             # if the new item fits in the bag, then it can be included into the tree
             if titem.estimate > self.best_value and titem.room >=0:
-                # the correct would be to put the min after
-                # titem.heap_depth = input_idx+1. However, most titem are ignored.
-                # here is the place where titem is not ignored and it is saved.
-                # then, it is safe to put the min here incurring in less overhead
-                titem.heap_depth = min(titem.heap_depth,items_lenght-1)
-                # a solution is only found at the 'leaf' of the fake tree
-                # Is the newly accepted node has a better value than the best value found so far ?
-                if input_idx == items_lenght-1 and titem.value > self.best_value:
-                    self.solution = titem.taken_itens[:]
-                    self.best_value = titem.value
-                    # used only to save the tree
-                    self.solution_idx = iter
-                    knapsack_utilization = sum([i.weight for i in self.solution]) / self.capacity
-                    if build_tree:
-                        G.nodes[titem.iter]['color'] = 'yellow'
-                    if debug:
-                        taken = [0]*items_lenght
-                        for i in self.solution:
-                            taken[i.index] = 1
-                        print (" - BEST VALUE:", iter, self.best_value, taken)
+                # a solution is only found at the 'leaf' of the fake tree.
+                # leaves are never pushed into the frontier since there is no item left to branch on
+                if input_idx == items_lenght-1:
+                    status = STATUS_PRUNED
+                    # Is the newly accepted node has a better value than the best value found so far ?
+                    if titem.value > self.best_value:
+                        self.solution = self.taken_items(titem)
+                        self.best_value = titem.value
+                        # used only to save the tree
+                        self.solution_idx = iter
+                        self.utilization = sum([i.weight for i in self.solution]) / self.capacity
+                        status = STATUS_INCUMBENT
+                        if self.on_incumbent is not None:
+                            self.on_incumbent(self)
+                        if stats is not None:
+                            stats.incumbent(iter, self.best_value)
+                        if debug:
+                            # the items may be a reduced list, so the input indexes can be larger than items_lenght
+                            taken = [0]*(max(i.index for i in self.items)+1)
+                            for i in self.solution:
+                                taken[i.index] = 1
+                            print (" - BEST VALUE:", iter, self.best_value, taken)
                 else:
-                    # insert the new item into in front of the LIFO
-                    self.lifo.insert(0,titem)
+                    # insert the new item into the frontier
+                    frontier.push(titem)
             # if the estimate is worst than the best value found so far,
             # then there is no need to continue searching this branch. 
             else:
-                if build_tree:
-                    G.nodes[titem.iter]['color'] = 'aquamarine'
+                if titem.room >= 0:
+                    self.pruned += 1
+                    status = STATUS_PRUNED
+                else:
+                    status = STATUS_INFEASIBLE
                 # if the left is still None, then the current node was assigned to the right
-                if self.lifo[0].left == None:
+                if node.left == None:
                     # it means end of the search via the right side, but the left side was not searched yet
-                    self.lifo[0].right = -1
+                    node.right = -1
                 else:
-                    self.lifo[0].left = -1
+                    node.left = -1
+            if trace is not None:
+                trace.node(titem.iter, node.iter, titem.value, titem.estimate, titem.room, titem.heap_depth, status)
+            if stats is not None:
+                stats.node(titem.heap_depth, status, titem.estimate <= self.best_value, len(frontier))
+            if status != STATUS_OPEN:
+                spare = titem
 
-            # this node has been visited in both sides. drop it until there is a node with a path not visited
-            while len(self.lifo) > 0 and self.lifo[0].left != None and self.lifo[0].right != None:
-                self.lifo.pop(0)
             iter += 1
-            # print the # of iterations every 2^19 and check the abortion criteria
-            if iter % 0x80000 == 0:
-                if debug:
-                    print (' - iteration:',iter, ', best value:', self.best_value)
+            # check the stop criteria (see Stop_Policy). The housekeeping iterations are always checked
+            if iter >= next_check:
                 cur_time = time.time()
-                if (cur_time - start_time) > MIN_EXEC_TIME and knapsack_utilization > KNAP_TARGET_UTILIZATION:
-                    abort = True
-                if (cur_time - start_time) > MAX_EXEC_TIME:
-                    abort = True
-
+                # print the # of iterations every housekeeping_interval (2^19 by default)
+                if iter % housekeeping_interval == 0:
+                    if debug:
+                        print (' - iteration:',iter, ', best value:', self.best_value)
+                    if self.on_housekeeping is not None:
+                        # the counters are up to date for the checkpoints
+                        self.iters = iter
+                        self.exec_time = cur_time - start_time
+                        self.on_housekeeping(self)
+                self.stop_reason = policy.check(self, iter, cur_time - start_time)
+                abort = self.stop_reason is not None
+                speed = (iter - last_iter) / max(cur_time - last_time, 1e-6)
+                last_iter, last_time = iter, cur_time
+                next_check = min(policy.next_check(iter, speed, cur_time - start_time), 
+                    (iter // housekeeping_interval + 1) * housekeeping_interval)
+
+        if abort and self.on_housekeeping is not None:
+            # a search stopped by the policy is saved once more, so a checkpoint continues from
+            # where it stopped instead of the last housekeeping check
+            self.iters = iter
+            self.exec_time = time.time() - start_time
+            self.on_housekeeping(self)
         if build_tree:
-            G.nodes[self.solution_idx]['color'] = 'red'
-            nx.write_gpickle(G,'tree.pickle')
-            print ("tree has", G.number_of_nodes(), "nodes")
+            trace.close()
+            self.trace = None
+            print ("tree has", trace.records, "nodes in", tree_file)
         self.iters = iter
+        self.exec_time = time.time() - start_time
+        if stats is not None:
+            stats.close(iter)
+            stats.save(stats_file)
         return abort
 
+def load_kernel():
+    """ Import bb_kernel.py the first time it is needed.
+
+    numba's cache of the kernel saves the name of its module, and fails to load under another name.
+    So the kernel is always imported as solutions.bb_kernel, also when this file runs as a script.
+
+    Returns:
+        module: bb_kernel.py.
+    """
+    global bb_kernel
+    if bb_kernel is None:
+        try:
+            import solutions.bb_kernel as kernel
+        except ImportError:
+            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            import solutions.bb_kernel as kernel
+        bb_kernel = kernel
+    return bb_kernel
+
+
 def max_tree_size(N):
     """ Calculate the max size of a tree.
 
@@ -498,79 +941,603 @@ def print_table(solution):
     return sum_weight
 
 
-def solve_it(input_data):
-    """ Depth first Branch & Bound using stack (LIFO) search.
+def parse_items(input_data, sort=False):
+    """ Parse the input, dropping the items that cannot improve the solution.
+
+    Args:
+        input_data (str): The instance in the course format.
+        sort (bool): Return the items in reverse order of value/weight ratio instead of the input order.
 
+    Returns:
+        int, int, [Input_Item]: The original number of items, the capacity, and the kept items.
     """
-    # parse the input
-    lines = input_data.split('\n')
+    item_count, capacity, values, weights, order = load_items(input_data)
+    # drop the single items that are bigger than the capacity, no need to insert these items in the search.
+    # there are a couple of items with value zero. remove them because they dont help to improve the value metric
+    keep = (weights <= capacity) & (values > 0)
+    if (weights[keep] <= 0).any():
+        print ("WOOHHH ! the list has a item with no weight !!!! it defies the laws of physics!!! ")
+        sys.exit(0)
+    positions = order[keep[order]] if sort else np.flatnonzero(keep)
+    items = [Input_Item(i, v, w) for i, v, w in zip(positions.tolist(), values[positions].tolist(), 
+        weights[positions].tolist())]
+    return item_count, capacity, items
+
+
+def greedy_solution(items, capacity):
+    """ Take the items in order while they fit, skipping the ones that do not fit.
 
-    firstLine = lines[0].split()
-    item_count = int(firstLine[0])
-    capacity = int(firstLine[1])
+    Args:
+        items ([Input_Item]): Items sorted in reverse order of value/weight ratio.
+        capacity (int): Knapsack capacity.
 
-    items = []
-    items_removed = 0
-    taken = [0]*item_count
+    Returns:
+        int, [Input_Item]: The value and the taken items.
+    """
+    value = 0
+    room = capacity
+    taken = []
+    for item in items:
+        if item.weight <= room:
+            room -= item.weight
+            value += item.value
+            taken.append(item)
+    return value, taken
+
+
+def reduce_items(items, capacity, incumbent=None):
+    """ Fix items to 0 or 1 before the search, using the Dantzig's bound and an incumbent.
+
+    This is the reduction procedure of Ingargiola and Korsh, see sec 2.7 of Martello and Toth, 1990.
+    The incumbent is the greedy solution, or the one given, with value z. An item j before the critical item is fixed to 1 
+    if the bound with x_j = 0 is not better than z. An item after the critical item is fixed to 0 if the 
+    bound with x_j = 1 is not better than z. No solution better than z has these items flipped, 
+    so the optimal value is the best of z and the optimal value of the reduced problem.
+    If the items fixed to 1 do not fit together, then z is optimal.
+
+    Args:
+        items ([Input_Item]): Items sorted in reverse order of value/weight ratio.
+        capacity (int): Knapsack capacity.
+        incumbent ([Input_Item]): The items of a feasible solution. By default, the greedy solution.
 
-    fake_solution = []
-    for i in range(item_count):
-        line = lines[i+1]
-        parts = line.split()
-        # drop the single items that are bigger than the capacity
-        # no need to insert these items in the search
-        if int(parts[1]) <= capacity:
-            # there are a couple of items with value zero. remove them because they dont 
-            # help to improve the value metric
-            if int(parts[0]) > 0:
-                if int(parts[1]) <= 0:
-                    print ("WOOHHH ! the list has a item with no weight !!!! it defies the laws of physics!!! ")
-                    sys.exit(0)
-                items.append(Input_Item(i, int(parts[0]), int(parts[1])))
-            # if some weight is zero, then assign a very small value to avoid zero div exception
+    Returns:
+        [Input_Item], [Input_Item], [Input_Item], int, [Input_Item]: The items fixed to 1, the free items,
+            the items fixed to 0, the incumbent value and the incumbent items.
+    """
+    n = len(items)
+    prefix_weight = [0]*(n+1)
+    prefix_value = [0]*(n+1)
+    for i in range(n):
+        prefix_weight[i+1] = prefix_weight[i] + items[i].weight
+        prefix_value[i+1] = prefix_value[i] + items[i].value
+    if incumbent is None:
+        incumbent_value, incumbent = greedy_solution(items, capacity)
+    else:
+        incumbent_value = sum(i.value for i in incumbent)
+    # first item that does not fit
+    critical = bisect.bisect_right(prefix_weight, capacity) - 1
+
+    def dantzig(room, first_value, skip_weight):
+        # bound of the items up to the critical item of 'room', where the skipped item 
+        # adds 'skip_weight' to the room and 'first_value' is the value already fixed
+        item = bisect.bisect_right(prefix_weight, room + skip_weight) - 1
+        bound = first_value + prefix_value[item]
+        if item < n:
+            bound += (room + skip_weight - prefix_weight[item]) * items[item].value // items[item].weight
+        return bound
+
+    fixed_one, free, fixed_zero = [], [], []
+    for j in range(n):
+        item = items[j]
+        if j <= critical:
+            # x_j = 0. the new critical item is after j, so j is removed from the prefix sums
+            if dantzig(capacity, -item.value, item.weight) <= incumbent_value:
+                fixed_one.append(item)
+                continue
+        if j >= critical:
+            # x_j = 1. the new critical item is before j
+            if capacity < item.weight or dantzig(capacity - item.weight, item.value, 0) <= incumbent_value:
+                fixed_zero.append(item)
+                continue
+        free.append(item)
+    return fixed_one, free, fixed_zero, incumbent_value, incumbent
+
+
+def check_relaxation(file_names, dives=5, checks_per_dive=200):
+    """ Differential test of the incremental relaxation against :meth:`Heap.linear_relaxation`.
+
+    For every instance, random dives from the root to a leaf are done, taking or leaving out
+    each item. Along the dive, the bound of leaving out the next item is computed by
+    :meth:`Heap.relaxation`, using the critical item of the parent as in :meth:`Heap.transverse`,
+    and compared with the linear relaxation of the remaining items.
+
+    Args:
+        file_names ([str]): The instance files.
+        dives (int): Number of dives per instance.
+        checks_per_dive (int): Max number of depths checked in each dive.
+
+    Returns:
+        int: The number of mismatches found.
+    """
+    rnd = random.Random(0)
+    errors = 0
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            _, capacity, items = parse_items(input_data_file.read(), sort=True)
+        if len(items) == 0:
+            continue
+        tree = Heap(items, capacity)
+        _, root_slack_idx, _ = tree.linear_relaxation(items, capacity)
+        step = max(1, len(items) // checks_per_dive)
+        checks = 0
+        for _ in range(dives):
+            value, room, slack_idx = 0, capacity, root_slack_idx
+            for depth in range(len(items)):
+                estimate, critical, _ = tree.relaxation(value, room, depth+1, slack_idx)
+                if depth % step == 0:
+                    expected, _, _ = tree.linear_relaxation(items[depth+1:], room)
+                    checks += 1
+                    if estimate != value + expected:
+                        errors += 1
+                        print ("MISMATCH:", file_name, "depth", depth, "room", room, 
+                            "got", estimate, "expected", value + expected)
+                if items[depth].weight <= room and rnd.random() < 0.5:
+                    value += items[depth].value
+                    room -= items[depth].weight
+                else:
+                    slack_idx = critical
+        print ("%-30s %8d checks" % (file_name, checks))
+    return errors
+
+
+def compare_bounds(file_names, strategies=('incremental', 'mt', 'enum')):
+    """ Run the search with every bound strategy and report the nodes explored and the pruning ratio.
+
+    Args:
+        file_names ([str]): The instance files.
+        strategies ([str]): The bound strategies to be compared. See bound_strategy.
+    """
+    global bound_strategy
+    default_strategy = bound_strategy
+    print (' {:30s} {:>12s} {:>12s} {:>12s} {:>8s} {:>10s} {:>8s}'.format("Instance","Bound","Value","#Nodes","Pruned","Time (s)","Optimal"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            _, capacity, items = parse_items(input_data_file.read(), sort=True)
+        for strategy in strategies:
+            bound_strategy = strategy
+            tree = Heap(items, capacity, make_frontier(search_order))
+            estimate, slack_idx, slack_used = tree.linear_relaxation(items, capacity)
+            aborted = False
+            if len(items) > 0 and slack_used != items[slack_idx].weight:
+                estimate, slack_idx, slack_used = tree.left_bound(0, capacity, 0, slack_idx)
+                aborted = tree.transverse(estimate, slack_idx, slack_used)
+            print (' {:30s} {:>12s} {:12d} {:12d} {:7.2f}% {:10.3f} {:>8s}'.format(os.path.basename(file_name), strategy, 
+                int(tree.best_value), tree.iters, 100.0 * tree.pruned / max(tree.iters, 1), tree.exec_time, 'n' if aborted else 'y'))
+    bound_strategy = default_strategy
+
+
+def compare_heuristics(file_names):
+    """ Run the search with and without the primal heuristics and report the nodes saved by them.
+
+    Args:
+        file_names ([str]): The instance files.
+    """
+    global primal_heuristics
+    default_heuristics = primal_heuristics
+    print (' {:30s} {:>12s} {:>12s} {:>12s} {:>12s} {:>10s} {:>8s}'.format("Instance","Incumbent","Value","#Nodes","Saved","Time (s)","Optimal"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            _, capacity, items = parse_items(input_data_file.read(), sort=True)
+        nodes = []
+        for heuristics in (False, True):
+            primal_heuristics = heuristics
+            start_time = time.time()
+            incumbent_value = initial_incumbent(items, capacity)[0] if heuristics else greedy_solution(items, capacity)[0]
+            value, solution, aborted, tree = solve_items(items, capacity)
+            nodes.append(tree.iters)
+            print (' {:30s} {:12d} {:12d} {:12d} {:>12s} {:10.3f} {:>8s}'.format(os.path.basename(file_name) + 
+                (' (heuristics)' if heuristics else ''), incumbent_value, int(value), tree.iters, 
+                str(nodes[0] - tree.iters) if heuristics else '', time.time() - start_time, 'n' if aborted else 'y'))
+    primal_heuristics = default_heuristics
+
+
+def node_memory(file_names, orders=('dfs', 'best')):
+    """ Report the number of nodes allocated and the peak memory of the search, measured with tracemalloc.
+
+    Args:
+        file_names ([str]): The instance files.
+        orders ([str]): The search orders. See search_order.
+    """
+    import tracemalloc
+    global search_order, Heap_Node, debug, build_tree
+    default_order, default_node, default_debug, default_build = search_order, Heap_Node, debug, build_tree
+
+    class Counted_Node(Heap_Node):
+        __slots__ = ()
+        count = 0
+
+        def __init__(self):
+            Counted_Node.count += 1
+            default_node.__init__(self)
+
+    print (' {:30s} {:>6s} {:>12s} {:>12s} {:>12s} {:>10s} {:>10s}'.format("Instance","Order","#Nodes","Allocated",
+        "Peak (MB)","Time (s)","Optimal"))
+    # the debug messages and the trace buffers are not part of the search memory
+    Heap_Node, debug, build_tree = Counted_Node, False, False
+    try:
+        for file_name in file_names:
+            with open(file_name, 'r') as input_data_file:
+                _, capacity, items = parse_items(input_data_file.read(), sort=True)
+            for order in orders:
+                search_order = order
+                Counted_Node.count = 0
+                tracemalloc.start()
+                start_time = time.time()
+                value, solution, aborted, tree = solve_items(items, capacity)
+                elapsed = time.time() - start_time
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print (' {:30s} {:>6s} {:12d} {:12d} {:12.1f} {:10.3f} {:>10s}'.format(os.path.basename(file_name), order,
+                    tree.iters, Counted_Node.count, peak / 2.0**20, elapsed, 'n' if aborted else 'y'))
+    finally:
+        search_order, Heap_Node, debug, build_tree = default_order, default_node, default_debug, default_build
+
+
+def benchmark(file_names, orders=('list', 'dfs', 'best', 'lds'), strategies=('incremental', 'scan', 'mt', 'enum'),
+        max_nodes=200000, repeat=3):
+    """ Report the expansions per second of the Python search with every frontier and bound strategy.
+
+    The 'list' order is the depth first frontier used before Stack_Frontier, a list pushed and popped at
+    its head with insert(0) and pop(0). It expands the same nodes as 'dfs', so the difference is the cost
+    of the frontier. The searches stop after max_nodes expansions, so the slow combinations end as well.
+    Each search runs repeat times and the fastest is reported. The compiled kernel is not used, see
+    bb_kernel.py for its speed.
+
+    Args:
+        file_names ([str]): The instance files.
+        orders ([str]): The search orders, see search_order, plus 'list'.
+        strategies ([str]): The bound strategies, see bound_strategy.
+        max_nodes (int): Max number of expansions of each search.
+        repeat (int): Number of runs of each search.
+    """
+    global bound_strategy, debug, build_tree, jit_kernel
+    defaults = bound_strategy, debug, build_tree, jit_kernel
+
+    class List_Frontier(Stack_Frontier):
+        def push(self, node):
+            self.nodes.insert(0, node)
+
+        def pop(self):
+            return self.nodes.pop(0)
+
+    print (' {:30s} {:>6s} {:>12s} {:>12s} {:>10s} {:>14s} {:>8s}'.format("Instance","Order","Bound","#Nodes",
+        "Time (s)","Expansions/s","Optimal"))
+    debug, build_tree, jit_kernel = False, False, False
+    try:
+        for file_name in file_names:
+            with open(file_name, 'r') as input_data_file:
+                _, capacity, items = parse_items(input_data_file.read(), sort=True)
+            for order in orders:
+                for strategy in strategies:
+                    bound_strategy = strategy
+                    best_time = None
+                    for _ in range(repeat):
+                        tree = Heap(items, capacity, List_Frontier() if order == 'list' else make_frontier(order))
+                        tree.policy = Stop_Policy(max_time=None, min_time=None, target_utilization=None,
+                            max_nodes=max_nodes)
+                        estimate, slack_idx, slack_used = tree.linear_relaxation(items, capacity)
+                        aborted = False
+                        if len(items) > 0 and slack_used != items[slack_idx].weight:
+                            estimate, slack_idx, slack_used = tree.left_bound(0, capacity, 0, slack_idx)
+                            aborted = tree.transverse(estimate, slack_idx, slack_used)
+                        if best_time is None or tree.exec_time < best_time:
+                            best_time = tree.exec_time
+                    print (' {:30s} {:>6s} {:>12s} {:12d} {:10.3f} {:14.0f} {:>8s}'.format(os.path.basename(file_name),
+                        order, strategy, tree.iters, best_time, tree.iters / max(best_time, 1e-6),
+                        'n' if aborted else 'y'))
+    finally:
+        bound_strategy, debug, build_tree, jit_kernel = defaults
+
+
+def initial_incumbent(items, capacity):
+    """ Run the primal heuristics to find the initial best solution.
+
+    Args:
+        items ([Input_Item]): Items sorted in reverse order of value/weight ratio.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [Input_Item]: The value and the taken items.
+    """
+    value, taken = primal_solution([i.value for i in items], [i.weight for i in items], capacity)
+    return value, [items[i] for i in taken]
+
+
+def merge_solution(tree, fixed_one, incumbent_value, incumbent):
+    """ Combine the search result with the items fixed to 1 and the incumbent.
+
+    Args:
+        tree (Heap): The search tree.
+        fixed_one ([Input_Item]): Items fixed to 1 by the reduction.
+        incumbent_value (int): Value of the incumbent.
+        incumbent ([Input_Item]): The items of the incumbent.
+
+    Returns:
+        int, [Input_Item]: The best value and the taken items.
+    """
+    solution = fixed_one + tree.solution
+    value = sum(i.value for i in fixed_one) + tree.best_value
+    # the search only finds solutions better than the incumbent
+    if incumbent_value >= value:
+        solution, value = incumbent, incumbent_value
+    return value, solution
+
+
+# fields of Heap_Node saved as they are in the checkpoints
+NODE_FIELDS = ['heap_depth', 'index', 'iter', 'value', 'room', 'estimate', 'slack_idx', 'slack_used', 'discrepancies']
+
+
+def item_array(items):
+    """ The index, value, and weight of the items, as a n x 3 array. """
+    return np.array([(i.index, i.value, i.weight) for i in items], dtype=np.int64).reshape(-1, 3)
+
+
+def save_checkpoint(file_name, tree, context):
+    """ Save the state of the search, so that it can continue later with :func:`resume_it`.
+
+    The file has the frontier nodes and their ancestors, one NumPy array per node field, the
+    best solution, the counters, and the items of the problem. It is written into a temporary
+    file first, so a run killed while saving keeps the previous checkpoint. The trace of the tree,
+    when saved, continues after the nodes written until the checkpoint.
+
+    Args:
+        file_name (str): The checkpoint file.
+        tree (Heap): The search tree, with the counters updated.
+        context (dict): item_count, fixed_one, incumbent_value, and incumbent of the problem.
+    """
+    nodes, counters, state = tree.frontier.dump()
+    trace_records = None
+    if tree.trace is not None:
+        # the nodes expanded until now are in the file
+        tree.trace.flush()
+        trace_records = tree.trace.records
+    # the frontier nodes and their ancestors, the parents before the children
+    ids = {}
+    saved = []
+    for node in nodes:
+        chain = []
+        while node is not None and id(node) not in ids:
+            chain.append(node)
+            node = node.parent
+        for n in reversed(chain):
+            ids[id(n)] = len(saved)
+            saved.append(n)
+    arrays = {'node_' + f: np.array([getattr(n, f) for n in saved], dtype=np.int64) for f in NODE_FIELDS}
+    arrays['node_parent'] = np.array([ids[id(n.parent)] if n.parent is not None else -1 for n in saved], dtype=np.int64)
+    arrays['node_taken'] = np.array([n.taken for n in saved], dtype=bool)
+    # left and right are None, -1, or 1. None is saved as 0
+    arrays['node_left'] = np.array([n.left or 0 for n in saved], dtype=np.int8)
+    arrays['node_right'] = np.array([n.right or 0 for n in saved], dtype=np.int8)
+    arrays['frontier'] = np.array([ids[id(n)] for n in nodes], dtype=np.int64)
+    arrays['counters'] = np.array(counters, dtype=np.int64)
+    arrays['items'] = item_array(tree.items)
+    arrays['fixed_one'] = item_array(context['fixed_one'])
+    arrays['incumbent'] = item_array(context['incumbent'])
+    arrays['solution'] = item_array(tree.solution)
+    meta = {'item_count': context['item_count'], 'capacity': tree.capacity, 'incumbent_value': context['incumbent_value'],
+        'best_value': tree.best_value, 'iters': tree.iters, 'pruned': tree.pruned, 'utilization': tree.utilization,
+        'exec_time': tree.exec_time, 'trace_records': trace_records, 'search_order': tree.frontier.order,
+        'bound_strategy': tree.bound, 'frontier_state': state}
+    arrays['meta'] = np.array(json.dumps(meta))
+    with open(file_name + '.tmp', 'wb') as checkpoint:
+        np.savez_compressed(checkpoint, **arrays)
+    os.replace(file_name + '.tmp', file_name)
+
+
+def load_checkpoint(file_name):
+    """ Load a checkpoint saved by :func:`save_checkpoint`.
+
+    Args:
+        file_name (str): The checkpoint file.
+
+    Returns:
+        Heap, dict: The search tree, ready to continue with transverse(resume=True), and the context of the problem.
+    """
+    with np.load(file_name) as checkpoint:
+        arrays = {k: checkpoint[k] for k in checkpoint.files}
+    meta = json.loads(str(arrays['meta']))
+
+    def to_items(array):
+        return [Input_Item(index, value, weight) for index, value, weight in array.tolist()]
+
+    items = to_items(arrays['items'])
+    by_index = {i.index: i for i in items}
+    tree = Heap(items, meta['capacity'], make_frontier(meta['search_order']), meta['bound_strategy'])
+    columns = {f: arrays['node_' + f].tolist() for f in NODE_FIELDS + ['parent', 'taken', 'left', 'right']}
+    saved = []
+    for k in range(len(columns['parent'])):
+        node = Heap_Node()
+        for f in NODE_FIELDS:
+            setattr(node, f, columns[f][k])
+        node.parent = saved[columns['parent'][k]] if columns['parent'][k] >= 0 else None
+        node.taken = columns['taken'][k]
+        node.left = columns['left'][k] or None
+        node.right = columns['right'][k] or None
+        saved.append(node)
+    tree.frontier.load([saved[k] for k in arrays['frontier'].tolist()], arrays['counters'].tolist(), meta['frontier_state'])
+    tree.best_value = meta['best_value']
+    tree.solution = [by_index[i] for i in arrays['solution'][:, 0].tolist()]
+    tree.iters = meta['iters']
+    tree.pruned = meta['pruned']
+    tree.utilization = meta['utilization']
+    tree.exec_time = meta['exec_time']
+    tree.trace_records = meta['trace_records']
+    context = {'item_count': meta['item_count'], 'fixed_one': to_items(arrays['fixed_one']),
+        'incumbent_value': meta['incumbent_value'], 'incumbent': to_items(arrays['incumbent'])}
+    return tree, context
+
+
+def solve_items(items, capacity, item_count=0, policy=None):
+    """ Search the best solution, after the primal heuristics and the reduction.
+
+    The search only looks for solutions better than the incumbent found before it.
+
+    Args:
+        items ([Input_Item]): Items sorted in reverse order of value/weight ratio.
+        capacity (int): Knapsack capacity.
+        item_count (int): Number of items in the input. Only saved in the checkpoints.
+        policy (Stop_Policy): The stop criteria of the search. None uses the default criteria.
+
+    Returns:
+        int, [Input_Item], bool, Heap: The best value, the taken items, True if the search was aborted, and the search tree.
+    """
+    fixed_one = []
+    incumbent_value, incumbent = 0, []
+    if primal_heuristics and len(items) > 0:
+        incumbent_value, incumbent = initial_incumbent(items, capacity)
+    search_items = items
+    search_capacity = capacity
+    if reduce_variables and len(items) > 0:
+        fixed_one, search_items, fixed_zero, incumbent_value, incumbent = reduce_items(items, capacity, 
+            incumbent if primal_heuristics else None)
+        search_capacity = capacity - sum(i.weight for i in fixed_one)
+        if search_capacity < 0:
+            # the items fixed to 1 do not fit together, so no solution is better than the incumbent
+            fixed_one, search_items, search_capacity = [], [], 0
+        if debug:
+            print ("Reduction: %d items fixed to 1, %d items fixed to 0, %d of %d items eliminated" % (len(fixed_one), 
+                len(fixed_zero), len(fixed_one)+len(fixed_zero), len(items)))
+
+    tree = Heap(search_items, search_capacity, make_frontier(search_order))
+    if policy is not None:
+        tree.policy = policy
+    if primal_heuristics:
+        # the items fixed to 1 are in every solution better than the incumbent
+        tree.best_value = incumbent_value - sum(i.value for i in fixed_one)
+        if search_capacity > 0:
+            tree.utilization = (sum(i.weight for i in incumbent) - sum(i.weight for i in fixed_one)) / search_capacity
+    aborted = False
+    if len(search_items) > 0:
+        # apply the linear_relaxation to get the inital BB estimate
+        estimate, slack_idx, slack_used = tree.linear_relaxation(search_items, search_capacity)
+        if debug:
+            print ("Capacity: %d, #items: %d, estimated value: %d, incumbent: %d" % (search_capacity, len(search_items), 
+                estimate, incumbent_value))
+
+        if slack_used == search_items[slack_idx].weight:
+            # this means that there is no fractioned item, so this is the optimal solution
+            tree.solution = search_items[:slack_idx+1]
+            tree.best_value = estimate
         else:
-            items_removed += 1
+            # the root estimate also uses the selected bound
+            estimate, slack_idx, slack_used = tree.left_bound(0, search_capacity, 0, slack_idx)
+            if debug:
+                print ("\nSearching ...")
+            if checkpoint_file is not None:
+                context = {'item_count': item_count, 'fixed_one': fixed_one, 'incumbent_value': incumbent_value,
+                    'incumbent': incumbent}
+                tree.on_housekeeping = lambda tree: save_checkpoint(checkpoint_file, tree, context)
+            aborted = tree.transverse(estimate, slack_idx, slack_used)
+    else:
+        tree.solution = []
+
+    value, solution = merge_solution(tree, fixed_one, incumbent_value, incumbent)
+    return value, solution, aborted, tree
+
+
+def resume_it(file_name, policy=None):
+    """ Continue the search saved in a checkpoint. The checkpoint keeps being updated while the search runs.
+
+    Args:
+        file_name (str): The checkpoint file.
+        policy (Stop_Policy): The stop criteria of the search. The execution time includes the time before
+            the checkpoint. None uses the default criteria.
+
+    Returns:
+        str: The solution, in the same format of solve_it.
+    """
+    tree, context = load_checkpoint(file_name)
+    if policy is not None:
+        tree.policy = policy
+    if debug:
+        print ("Resuming %s at iteration %d, best value: %d, frontier: %d nodes" % (file_name, tree.iters,
+            tree.best_value, len(tree.frontier)))
+    tree.on_housekeeping = lambda tree: save_checkpoint(file_name, tree, context)
+    aborted = tree.transverse(0, 0, 0, resume=True)
+    value, solution = merge_solution(tree, context['fixed_one'], context['incumbent_value'], context['incumbent'])
+    if debug:
+        print ("Performance metrics:")
+        print (" - best value: ", value)
+        print (" - #iterations: ", tree.iters)
+    return format_solution(value, solution, aborted, context['item_count'])
+
+
+def format_solution(value, solution, aborted, item_count):
+    """ Prepare the solution in the specified output format.
+
+    Args:
+        value (int): The best value.
+        solution ([Input_Item]): The taken items.
+        aborted (bool): True if the search was aborted.
+        item_count (int): Number of items in the input.
+
+    Returns:
+        str: The value, the optimality flag, and the taken flag of each item.
+    """
+    taken = [0]*item_count
+    for i in solution:
+        taken[i.index] = 1
+    # say if the solution is optimal or not. If it is abborted, then there is no 
+    # garantee that this is an optimal solution
+    optimal = 0 if aborted else 1
+    output_data = str(int(value)) + ' ' + str(optimal) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+def solve_it(input_data, policy=None):
+    """ Depth first Branch & Bound using stack (LIFO) search.
 
-    item_count -= items_removed
+    Args:
+        input_data (str): The problem in the input format.
+        policy (Stop_Policy): The stop criteria of the search, e.g. the time given to this instance.
+            None uses the default criteria.
+    """
+    # parse the input. items sorted in reverse order of value/weight ratio
+    item_count, capacity, items = parse_items(input_data, sort=True)
+    taken = [0]*item_count
+    item_count = len(items)
 
     if debug:
         print ("")
         print ("Input:")
-        print_table(items)
-
-    # items sorted in reverse order of value/weight ratio
-    items = sorted(items, key=lambda x: float(x.value/float(x.weight)))[::-1]
+        print_table(sorted(items, key=lambda x: x.index))
 
     if debug:
         print ("")
         print ("Sorted:")
         print_table(items)
 
-    tree = Heap(items, capacity)
-    # apply the linear_relaxation to get the inital BB estimate
-    estimate, slack_idx, slack_used = tree.linear_relaxation(items,capacity)
-    if debug:
-        print ("Capacity: %d, #items: %d, estimated value: %d" % (capacity, item_count, estimate))
-
-    aborted = False
-    if slack_used == items[slack_idx].weight:
-        # this means that there is no fractioned item, so this is the optimal solution
-        pass
-    else:
-        if debug:
-            print ("\nSearching ...")
-        aborted = tree.transverse(estimate, slack_idx, slack_used)
+    value, solution, aborted, tree = solve_items(items, capacity, len(taken), policy)
 
     if debug:
         print ("Performance metrics:")
-        print (" - best value: ", tree.best_value)
+        print (" - best value: ", value)
         print (" - #iterations: ", tree.iters)
+        if tree.stop_reason is not None:
+            print (" - stopped by the %s criteria after %.3f s" % (tree.stop_reason, tree.exec_time))
+        print (" - bound strategy: %s, #pruned: %d (%.2f%% of the expansions)" % (bound_strategy, tree.pruned, 
+            100.0 * tree.pruned / max(tree.iters, 1)))
+        if tree.exec_time > 0:
+            print (" - expansions/s: %.0f" % (tree.iters / tree.exec_time))
+        if isinstance(tree.frontier, Best_First_Frontier):
+            print (" - depth first dives with the full heap: ", tree.frontier.dives)
         print ("Solution:")
-        sum_weight = print_table(tree.solution)
+        sum_weight = print_table(solution)
         print ("Knapsack with %.6f%% of occupation\n" % (sum_weight/capacity*100.0))
         weight_slack = capacity - sum_weight
         # create a list of indexes of all non selected items
-        selected_idx = [i.index for i in tree.solution] 
+        selected_idx = [i.index for i in solution] 
         # search for excluded items with lower weight than the weight_slack
         for j in items:
             # ks_500_0, item 51 has weight 1 and value == 0!
@@ -578,29 +1545,52 @@ def solve_it(input_data):
                 if j.index not in selected_idx:
                     print ("OOOOPS: With weight slack of", weight_slack, ", item", j.index, "with weight", j.weight, "should have been selected. check your algorithm!!!")
 
-    # copy data to the expected output variables
-    for i in tree.solution:
-        taken[i.index] = 1
-    value = tree.best_value
-
-    # say if the solution is optimal or not. If it is abborted, then there is no 
-    # garantee that this is an optimal solution
-    if aborted:
-        optimal = 0
-    else:
-        optimal = 1
-    # prepare the solution in the specified output format
-    output_data = str(int(value)) + ' ' + str(optimal) + '\n'
-    output_data += ' '.join(map(str, taken))
-    return output_data
+    return format_solution(value, solution, aborted, len(taken))
 
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) > 1:
-        file_location = sys.argv[1].strip()
-        with open(file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
-        print(solve_it(input_data))
+    if len(sys.argv) > 1 and sys.argv[1] == '--check-relaxation':
+        # differential test of the relaxation with every instance of the data directory
+        data_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+        file_names = sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir))
+        errors = check_relaxation(file_names)
+        print ("relaxation mismatches:", errors)
+        sys.exit(1 if errors else 0)
+    elif len(sys.argv) > 2 and sys.argv[1] == '--compare-bounds':
+        # run every bound strategy with the given instances
+        compare_bounds(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--compare-heuristics':
+        # run the search with and without the primal heuristics
+        compare_heuristics(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--node-memory':
+        # count the nodes allocated and measure the peak memory of the search
+        node_memory(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--benchmark':
+        # expansions per second of every frontier and bound strategy
+        benchmark(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        # optional stop criteria: [--max-time S] [--max-nodes N] [--gap G] [--target-utilization U]
+        # checkpoints: [--checkpoint <file>] <input file>, or --resume <file>
+        # and the counters and timers of the search: [--stats <file>]
+        args = sys.argv[1:]
+        options = {'--max-time': (float, 5*60), '--max-nodes': (int, None), '--gap': (int, None),
+            '--target-utilization': (float, 0.995), '--checkpoint': (str, None), '--resume': (str, None),
+            '--stats': (str, None)}
+        settings = {k: default for k, (_, default) in options.items()}
+        while len(args) > 1 and args[0] in options:
+            settings[args[0]] = options[args[0]][0](args[1])
+            args = args[2:]
+        policy = Stop_Policy(max_time=settings['--max-time'], max_nodes=settings['--max-nodes'], gap=settings['--gap'],
+            target_utilization=settings['--target-utilization'])
+        checkpoint_file = settings['--checkpoint']
+        stats_file = settings['--stats']
+        if settings['--resume'] is not None:
+            # continue the search saved in a checkpoint
+            print(resume_it(settings['--resume'], policy))
+        else:
+            file_location = args[0].strip()
+            with open(file_location, 'r') as input_data_file:
+                input_data = input_data_file.read()
+            print(solve_it(input_data, policy))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/ks_4_0)')
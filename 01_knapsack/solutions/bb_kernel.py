@@ -0,0 +1,283 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Compiled kernel of the depth first Branch & Bound of bb_heap.py.
+
+    It is the same search of Heap.transverse with the depth first frontier and the incremental
+    Dantzig's bound, but the items are contiguous weight and value arrays (sorted by efficiency)
+    and the frontier is a 2D array with one row per node. The kernel is compiled with Numba when
+    it is installed. Otherwise, bb_heap.py keeps using the Python search.
+
+    The nodes are expanded in the same order of the Python search, so the number of nodes,
+    the pruned nodes, and the solution are the same. The taken items are not saved per node.
+    In a depth first search, the decisions of the path to the popped node are still in
+    the 'path' array, since only the nodes deeper than it were expanded after it was pushed.
+
+    The kernel runs for a given number of expansions and returns. The stop criteria and the
+    debug messages are checked in Python between the calls, so the kernel never reads the clock.
+
+    The compiled functions are cached in __pycache__. The cache saves the name of the module, so the
+    kernel must be imported only as solutions.bb_kernel, like bb_heap.load_kernel does, and never as bb_kernel.
+"""
+
+import time # used for performance measurements
+import os
+import numpy as np
+
+try:
+    from numba import njit
+    available = True
+except ImportError:
+    available = False
+
+    def njit(*args, **kwargs):
+        """ Without Numba, the kernel runs as plain Python. Only used to check the kernel. """
+        return lambda function: function
+
+# columns of the frontier array. RIGHT is 1 when the right child (item taken) was already created
+DEPTH, VALUE, ROOM, ESTIMATE, SLACK_IDX, SLACK_USED, RIGHT = range(7)
+
+
+@njit(cache=True)
+def relaxation(weights, values, prefix_weight, prefix_value, value, room, first_idx, slack_idx):
+    """ Incremental Dantzig's bound. The same as Heap.relaxation, with the bisect written as a loop.
+
+    Returns:
+        int, int, int: The new estimate, the new critical item index, the used part of the critical item.
+    """
+    n = weights.shape[0]
+    target = prefix_weight[first_idx] + room
+    lo = max(slack_idx, first_idx)
+    hi = n + 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if target < prefix_weight[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    item = lo - 1
+    estimate = value + prefix_value[item] - prefix_value[first_idx]
+    slack_used = target - prefix_weight[item]
+    if item < n and slack_used > 0:
+        # trunc, like Heap.relaxation. The division is done in float as well, so the estimates are the same
+        estimate += int(slack_used / float(weights[item]) * values[item])
+    else:
+        item -= 1
+        slack_used = weights[item] if item >= 0 else 0
+    return estimate, item, slack_used
+
+
+@njit(cache=True)
+def search(weights, values, prefix_weight, prefix_value, frontier, top, path, best_path, best_value, iter, pruned,
+        solution_idx, stop_iter):
+    """ Expand the nodes of the frontier until it is empty or until iteration stop_iter.
+
+    Args:
+        weights, values (:class:`numpy.ndarray`): The items, sorted in reverse order of value/weight ratio.
+        prefix_weight, prefix_value (:class:`numpy.ndarray`): Prefix sums of the weights and values.
+        frontier (:class:`numpy.ndarray`): The nodes. frontier[:top] is the stack.
+        top (int): Number of nodes in the stack.
+        path (:class:`numpy.ndarray`): path[d] is 1 if item d is taken in the path of the current node.
+        best_path (:class:`numpy.ndarray`): The taken flags of the best solution. Updated in place.
+        best_value (int): Best value so far.
+        iter (int): Number of expansions so far, plus one.
+        pruned (int): Number of feasible nodes discarded by the bound so far.
+        solution_idx (int): Iteration of the best solution.
+        stop_iter (int): Return when this iteration is reached.
+
+    Returns:
+        int, int, int, int, int: top, best_value, iter, pruned, and solution_idx.
+    """
+    n = weights.shape[0]
+    while top > 0 and iter < stop_iter:
+        top -= 1
+        depth = frontier[top, DEPTH]
+        value = frontier[top, VALUE]
+        room = frontier[top, ROOM]
+        estimate = frontier[top, ESTIMATE]
+        # the best value may have improved since the node was pushed
+        if estimate <= best_value:
+            continue
+        slack_idx = frontier[top, SLACK_IDX]
+        slack_used = frontier[top, SLACK_USED]
+        if frontier[top, RIGHT] == 0:
+            value += values[depth]
+            room -= weights[depth]
+            path[depth] = 1
+            # the node is pushed back, the left side is still to be expanded
+            frontier[top, RIGHT] = 1
+            top += 1
+        else:
+            path[depth] = 0
+            estimate, slack_idx, slack_used = relaxation(weights, values, prefix_weight, prefix_value, value, room,
+                depth+1, slack_idx)
+        if estimate > best_value and room >= 0:
+            if depth == n-1:
+                if value > best_value:
+                    best_value = value
+                    best_path[:] = path
+                    solution_idx = iter
+            else:
+                frontier[top, DEPTH] = depth+1
+                frontier[top, VALUE] = value
+                frontier[top, ROOM] = room
+                frontier[top, ESTIMATE] = estimate
+                frontier[top, SLACK_IDX] = slack_idx
+                frontier[top, SLACK_USED] = slack_used
+                frontier[top, RIGHT] = 0
+                top += 1
+        elif room >= 0:
+            pruned += 1
+        iter += 1
+    return top, best_value, iter, pruned, solution_idx
+
+
+class Array_Frontier:
+    def __init__(self, frontier):
+        """ The frontier array seen as the frontier of Heap. Used by the stop criteria.
+
+        Args:
+            frontier (:class:`numpy.ndarray`): The nodes of the kernel.
+        """
+        self.order = 'dfs'
+        self.nodes = frontier
+        self.top = 0
+
+    def __len__(self):
+        return self.top
+
+    def bound(self, best_value):
+        """ Upper bound of the nodes not expanded yet: their best estimate, but not less than best_value. """
+        if self.top == 0:
+            return best_value
+        return max(int(self.nodes[:self.top, ESTIMATE].max()), best_value)
+
+
+def transverse(tree, estimate, slack_idx, slack_used, debug=False, initial=None):
+    """ Search the tree with the kernel. The same as tree.transverse(estimate, slack_idx, slack_used, initial).
+
+    Only the depth first search with the incremental bound, without saving the tree, is supported.
+    The results are saved in the tree: best_value, solution, iters, pruned, exec_time, and stop_reason.
+    tree.on_incumbent is called after each call of the kernel that improved the best value, and
+    tree.on_housekeeping at every housekeeping check, where the best value may be raised by it.
+
+    Args:
+        tree (Heap): The search tree.
+        estimate (int): The initial relaxation estimate.
+        slack_idx (int): The index to the critical item.
+        slack_used (int): The residual capacity.
+        debug (bool): Print the iterations and the new best values.
+        initial (Heap_Node): The node where the search starts, with its parents up to the root. By default, the root.
+
+    Returns:
+        bool: False if the procedure was not aborted, meaning that the result is optimal.
+    """
+    items = tree.items
+    n = len(items)
+    weights = np.array([i.weight for i in items], dtype=np.int64)
+    values = np.array([i.value for i in items], dtype=np.int64)
+    prefix_weight = np.array(tree.prefix_weight, dtype=np.int64)
+    prefix_value = np.array(tree.prefix_value, dtype=np.int64)
+    # there is at most one node per depth in the stack, plus the root
+    frontier = Array_Frontier(np.zeros((n+2, 7), dtype=np.int64))
+    path = np.zeros(n, dtype=np.int8)
+    if initial is None:
+        frontier.nodes[0] = (0, 0, tree.capacity, estimate, slack_idx, slack_used, 0)
+    else:
+        frontier.nodes[0] = (initial.heap_depth, initial.value, initial.room, initial.estimate, initial.slack_idx,
+            initial.slack_used, 0)
+        # the decisions above the initial node are never changed by the kernel
+        node = initial
+        while node.parent is not None:
+            path[node.heap_depth-1] = 1 if node.taken else 0
+            node = node.parent
+    frontier.top = 1
+    tree.frontier = frontier
+    best_path = np.zeros(n, dtype=np.int8)
+    best_value = tree.best_value
+    pruned = tree.pruned
+    solution_idx = tree.solution_idx
+    housekeeping_interval = tree.housekeeping_interval
+    policy = tree.policy
+    tree.stop_reason = None
+    iter = 1
+    start_time = time.time()
+    # the first call measures the speed (and compiles the kernel, when it is not cached)
+    next_check = iter + 0x100
+    last_iter, last_time = iter, time.time()
+    abort = False
+    while frontier.top > 0 and not abort:
+        frontier.top, new_value, iter, pruned, solution_idx = search(weights, values, prefix_weight, prefix_value,
+            frontier.nodes, frontier.top, path, best_path, best_value, iter, pruned, solution_idx, next_check)
+        if new_value > best_value:
+            best_value = new_value
+            tree.best_value = best_value
+            tree.solution = [items[k] for k in np.flatnonzero(best_path)]
+            tree.solution_idx = solution_idx
+            tree.utilization = sum([i.weight for i in tree.solution]) / tree.capacity
+            if tree.on_incumbent is not None:
+                tree.on_incumbent(tree)
+            if debug:
+                print (" - BEST VALUE:", solution_idx, best_value)
+        if iter >= next_check:
+            cur_time = time.time()
+            if iter % housekeeping_interval == 0:
+                if debug:
+                    print (' - iteration:',iter, ', best value:', best_value)
+                if tree.on_housekeeping is not None:
+                    tree.iters = iter
+                    tree.exec_time = cur_time - start_time
+                    tree.on_housekeeping(tree)
+                    # e.g. the best value of the other processes of bb_parallel.py
+                    best_value = tree.best_value
+            tree.iters = iter
+            tree.stop_reason = policy.check(tree, iter, cur_time - start_time)
+            abort = tree.stop_reason is not None
+            speed = (iter - last_iter) / max(cur_time - last_time, 1e-6)
+            last_iter, last_time = iter, cur_time
+            next_check = min(policy.next_check(iter, speed, cur_time - start_time),
+                (iter // housekeeping_interval + 1) * housekeeping_interval)
+    tree.iters = iter
+    tree.pruned = pruned
+    tree.exec_time = time.time() - start_time
+    return abort
+
+
+def compare_kernel(file_names):
+    """ Run the Python search and the kernel and report the nodes and the expansions per second of each.
+
+    Args:
+        file_names ([str]): The instance files.
+    """
+    try:
+        import solutions.bb_heap as bb_heap
+    except ImportError:
+        import bb_heap
+    default_kernel, default_debug, default_build = bb_heap.jit_kernel, bb_heap.debug, bb_heap.build_tree
+    bb_heap.debug, bb_heap.build_tree = False, False
+    print (' {:20s} {:>8s} {:>12s} {:>12s} {:>10s} {:>14s} {:>8s} {:>8s}'.format("Instance","Kernel","Value","#Nodes",
+        "Time (s)","Expansions/s","Speedup","Optimal"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            _, capacity, items = bb_heap.parse_items(input_data_file.read(), sort=True)
+        reference = None
+        for kernel in (False, True):
+            bb_heap.jit_kernel = kernel
+            value, solution, aborted, tree = bb_heap.solve_items(items, capacity)
+            speed = tree.iters / max(tree.exec_time, 1e-6)
+            if reference is None:
+                reference = speed
+            print (' {:20s} {:>8s} {:12d} {:12d} {:10.3f} {:14.0f} {:8.2f} {:>8s}'.format(os.path.basename(file_name),
+                'numba' if kernel else 'python', int(value), tree.iters, tree.exec_time, speed, speed / reference,
+                'n' if aborted else 'y'))
+    bb_heap.jit_kernel, bb_heap.debug, bb_heap.build_tree = default_kernel, default_debug, default_build
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        if not available:
+            print ("numba is not installed. Both searches run in Python")
+        compare_kernel(sys.argv[1:])
+    else:
+        print('This test requires input files. (i.e. python bb_kernel.py ./data/ks_40_0 ./data/ks_1000_0)')
@@ -0,0 +1,373 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Parallel version of the depth first Branch & Bound of bb_heap.py.
+
+    The search tree is split at a given depth into subproblems, one per feasible path from the
+    root to this depth, in the same order the depth first search would visit them. A pool of
+    processes takes one subproblem at a time, so the idle processes get the next subproblem
+    as soon as they finish. The subproblems are generated lazily, while the pool takes them, and the
+    ones that cannot beat the best value found so far are skipped before being sent to the pool.
+    The depth is selected by counting the subproblems of each depth, without generating them.
+
+    The best value is shared by all processes through shared memory, so every process prunes
+    with the best value found by any process. The shared memory also keeps the index of the
+    subproblem that found it. A subproblem only prunes the solutions with the same value
+    of a subproblem visited before it by the serial search. This way, the result is the same
+    solution found by the serial search, not only the same value.
+
+    The processes search their subtrees with the compiled kernel of bb_kernel.py when numba is installed,
+    starting from the node of the subproblem and reading the shared best value at every housekeeping check.
+    Without the kernel, a process expands about 35 times fewer nodes per second than the serial bb_heap.py
+    with it (e.g. ks_200_0: 62 s with the Python search in one process, 2.1 s with the kernel, 1.8 s serial).
+
+    Limits: each process imports numba and loads the kernel, about 0.7 s, so the pool only pays off on the
+    instances that take much longer than that. The scaling with the number of processes was only checked on
+    a single core, where it shows the overhead of the pool: 2 processes take 1.6 to 2 times longer than 1.
+    It was not measured on a multi-core machine yet (see scaling), so no speedup is claimed, and dispatch.py
+    never selects this search.
+"""
+
+import time # used for performance measurements
+import os
+import multiprocessing as mp
+
+try:
+    import solutions.bb_heap as bb_heap
+except ImportError:
+    import bb_heap
+
+# assign False to submit the solution
+debug = False
+
+# number of processes. None uses all cores
+workers = None
+
+# depth of the subproblems. None selects the smallest depth with at least
+# tasks_per_worker subproblems for each process
+split_depth = None
+tasks_per_worker = 16
+
+# max execution time (s). The subproblems not started before it are skipped and the result is not optimal
+max_exec_time = 5 * 60
+
+# shared state of each process of the pool
+_worker = {}
+
+
+def subproblems(tree, depth):
+    """ Generate the feasible nodes at a given depth, in depth first order.
+
+    The estimates are the same computed by :meth:`bb_heap.Heap.transverse`: the right child
+    (item taken) keeps the estimate of its parent and the left child gets the bound of the heap.
+
+    Args:
+        tree (:class:`bb_heap.Heap`): The search tree.
+        depth (int): Depth of the subproblems.
+
+    Yields:
+        (tuple, int, int, int, int, int): The path of decisions, value, room, estimate, critical item, and residual capacity.
+    """
+    estimate, slack_idx, slack_used = tree.linear_relaxation(tree.items, tree.capacity)
+    estimate, slack_idx, slack_used = tree.left_bound(0, tree.capacity, 0, slack_idx)
+    # explicit stack of (path, value, room, estimate, slack_idx, slack_used). the left child is pushed
+    # first, so the right child is visited first as in the serial search
+    stack = [((), 0, tree.capacity, estimate, slack_idx, slack_used)]
+    while stack:
+        path, value, room, estimate, slack_idx, slack_used = stack.pop()
+        if len(path) == depth:
+            yield path, value, room, estimate, slack_idx, slack_used
+            continue
+        item = tree.items[len(path)]
+        left = tree.left_bound(value, room, len(path)+1, slack_idx)
+        stack.append((path + (0,), value, room) + left)
+        if item.weight <= room:
+            stack.append((path + (1,), value + item.value, room - item.weight, estimate, slack_idx, slack_used))
+
+
+def count_subproblems(tree, max_depth, target):
+    """ Count the subproblems of each depth, without generating them.
+
+    A subproblem is feasible if its items fit, so only its room matters. The paths with the same
+    room are counted together, so the work is at most the number of different rooms of each depth.
+
+    Args:
+        tree (:class:`bb_heap.Heap`): The search tree.
+        max_depth (int): The last depth counted.
+        target (int): Stop at the first depth with at least this number of subproblems.
+
+    Returns:
+        [int]: The number of subproblems of depth 0, 1, ...
+    """
+    rooms = {tree.capacity: 1}
+    counts = [1]
+    for depth in range(max_depth):
+        weight = tree.items[depth].weight
+        next_rooms = {}
+        for room, count in rooms.items():
+            next_rooms[room] = next_rooms.get(room, 0) + count
+            if weight <= room:
+                next_rooms[room - weight] = next_rooms.get(room - weight, 0) + count
+        rooms = next_rooms
+        counts.append(sum(rooms.values()))
+        if counts[-1] >= target:
+            break
+    return counts
+
+
+def select_depth(tree, processes):
+    """ Select the smallest depth with enough subproblems for the processes.
+
+    Args:
+        tree (:class:`bb_heap.Heap`): The search tree.
+        processes (int): Number of processes.
+
+    Returns:
+        int: The depth.
+    """
+    target = tasks_per_worker * processes
+    max_depth = min(len(tree.items) - 1, 20)
+    counts = count_subproblems(tree, max_depth, target)
+    depth = 1
+    while depth < max_depth and counts[depth] < target:
+        depth += 1
+    return depth
+
+
+def threshold(index):
+    """ Best value that the subproblem 'index' must beat.
+
+    A solution of a subproblem visited before by the serial search wins the ties.
+
+    Args:
+        index (int): The subproblem index.
+
+    Returns:
+        int: The shared best value, or one less if it was found by a later subproblem.
+    """
+    best = _worker['best']
+    with best.get_lock():
+        value, owner = best[0], best[1]
+    return value if owner <= index else value - 1
+
+
+def share_incumbent(tree):
+    """ Called by :meth:`bb_heap.Heap.transverse` when the process finds a new best solution. """
+    index = _worker['index']
+    _worker['value'] = tree.best_value
+    _worker['solution'] = [i.index for i in tree.solution]
+    best = _worker['best']
+    with best.get_lock():
+        if tree.best_value > best[0] or (tree.best_value == best[0] and index < best[1]):
+            best[0] = tree.best_value
+            best[1] = index
+
+
+def read_incumbent(tree):
+    """ Called by :meth:`bb_heap.Heap.transverse` at every housekeeping check. """
+    value = threshold(_worker['index'])
+    if value > tree.best_value:
+        tree.best_value = value
+
+
+def init_worker(items, capacity, best, deadline, settings):
+    """ Initialize the process of the pool. """
+    _worker['items'] = items
+    _worker['capacity'] = capacity
+    _worker['best'] = best
+    _worker['deadline'] = deadline
+    bb_heap.debug = False
+    bb_heap.build_tree = False
+    # the subproblems would overwrite the same file
+    bb_heap.stats_file = None
+    bb_heap.search_order, bb_heap.bound_strategy = settings
+
+
+def solve_subproblem(task):
+    """ Search the subtree of a subproblem.
+
+    Args:
+        task (tuple): The subproblem index and the values returned by :func:`subproblems`.
+
+    Returns:
+        int, int, [int], int, bool: The subproblem index, the best value found by it, the input index of its items,
+            the number of expansions, and True if it was aborted.
+    """
+    index, (path, value, room, estimate, slack_idx, slack_used) = task
+    if time.time() > _worker['deadline']:
+        return index, -1, [], 0, True
+    items = _worker['items']
+    tree = bb_heap.Heap(items, _worker['capacity'], bb_heap.make_frontier(bb_heap.search_order))
+    # a chain of nodes with the decisions of the path, so that Heap.taken_items finds the taken items
+    node = bb_heap.Heap_Node()
+    for depth, taken in enumerate(path):
+        child = bb_heap.Heap_Node()
+        child.parent = node
+        child.taken = bool(taken)
+        child.heap_depth = depth + 1
+        child.index = items[depth].index
+        node = child
+    node.value = value
+    node.room = room
+    node.estimate = estimate
+    node.slack_idx = slack_idx
+    node.slack_used = slack_used
+    _worker['index'] = index
+    _worker['value'] = -1
+    _worker['solution'] = []
+    tree.best_value = max(threshold(index), 0)
+    tree.on_incumbent = share_incumbent
+    tree.on_housekeeping = read_incumbent
+    tree.housekeeping_interval = 0x1000
+    # the subproblem stops at the deadline of the whole search
+    tree.policy = bb_heap.Stop_Policy(max_time=max(_worker['deadline'] - time.time(), 0.0))
+    aborted = tree.transverse(estimate, slack_idx, slack_used, node)
+    return index, _worker['value'], _worker['solution'], tree.iters, aborted
+
+
+def solve_parallel(items, capacity, processes=None, depth=None, best_value=0):
+    """ Search the tree with a pool of processes.
+
+    Args:
+        items ([Input_Item]): Items sorted in reverse order of value/weight ratio.
+        capacity (int): Knapsack capacity.
+        processes (int): Number of processes. None uses all cores.
+        depth (int): Depth of the subproblems. None selects it automatically.
+        best_value (int): Value of the incumbent. Only better solutions are searched.
+
+    Returns:
+        int, [int], bool, dict: The best value, the input index of the taken items (empty if the incumbent was not
+            improved), True if it was aborted, and the performance metrics.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    tree = bb_heap.Heap(items, capacity)
+    if depth is None:
+        depth = select_depth(tree, processes)
+    # the subproblems are not leaves
+    depth = max(min(depth, len(items) - 1), 0)
+    # (value, index of the subproblem that found it). The incumbent is found before all subproblems
+    best = mp.Array('q', [best_value, -1])
+    deadline = time.time() + max_exec_time
+    stats = {'processes': processes, 'depth': depth, 'subproblems': 0, 'skipped': 0, 'iters': 0}
+
+    def generate():
+        # the subproblems are generated while the pool takes them. The ones that cannot beat the shared
+        # best value are not even sent to the pool
+        for index, task in enumerate(subproblems(tree, depth)):
+            stats['subproblems'] += 1
+            with best.get_lock():
+                value, owner = best[0], best[1]
+            if task[3] <= (value if owner <= index else value - 1):
+                stats['skipped'] += 1
+                continue
+            yield index, task
+
+    # after every subproblem, so any subproblem wins the ties with the incumbent
+    best_index, solution = float('inf'), []
+    aborted = False
+    settings = (bb_heap.search_order, bb_heap.bound_strategy)
+    with mp.Pool(processes, init_worker, (items, capacity, best, deadline, settings)) as pool:
+        for index, value, taken, iters, sub_aborted in pool.imap_unordered(solve_subproblem, generate(), chunksize=1):
+            stats['iters'] += iters
+            aborted = aborted or sub_aborted
+            # the first subproblem in the depth first order wins the ties
+            if value > best_value or (value == best_value and index < best_index):
+                best_value, best_index, solution = value, index, taken
+    return best_value, solution, aborted, stats
+
+
+def solve_it(input_data):
+    """ Parallel depth first Branch & Bound.
+
+    """
+    # parse the input
+    # items sorted in reverse order of value/weight ratio
+    item_count, capacity, items = bb_heap.parse_items(input_data, sort=True)
+    taken = [0]*item_count
+
+    fixed_one = []
+    incumbent_value, incumbent = 0, []
+    if bb_heap.primal_heuristics and len(items) > 0:
+        incumbent_value, incumbent = bb_heap.initial_incumbent(items, capacity)
+    search_items = items
+    search_capacity = capacity
+    if bb_heap.reduce_variables and len(items) > 0:
+        fixed_one, search_items, fixed_zero, incumbent_value, incumbent = bb_heap.reduce_items(items, capacity,
+            incumbent if bb_heap.primal_heuristics else None)
+        search_capacity = capacity - sum(i.weight for i in fixed_one)
+        if search_capacity < 0:
+            # the items fixed to 1 do not fit together, so no solution is better than the incumbent
+            fixed_one, search_items, search_capacity = [], [], 0
+
+    start_time = time.time()
+    value, solution, aborted = 0, [], False
+    if bb_heap.primal_heuristics:
+        # the items fixed to 1 are in every solution better than the incumbent
+        value = incumbent_value - sum(i.value for i in fixed_one)
+    if len(search_items) > 0:
+        tree = bb_heap.Heap(search_items, search_capacity)
+        estimate, slack_idx, slack_used = tree.linear_relaxation(search_items, search_capacity)
+        if slack_used == search_items[slack_idx].weight:
+            # this means that there is no fractioned item, so this is the optimal solution
+            value, solution = estimate, [i.index for i in search_items[:slack_idx+1]]
+        else:
+            value, solution, aborted, stats = solve_parallel(search_items, search_capacity, workers, split_depth, value)
+            if debug:
+                print ("Performance metrics:")
+                print (" - processes: %d, split depth: %d, subproblems: %d, skipped: %d" % (stats['processes'],
+                    stats['depth'], stats['subproblems'], stats['skipped']))
+                print (" - #iterations: ", stats['iters'])
+                print (" - time: %.3f s" % (time.time() - start_time))
+
+    value += sum(i.value for i in fixed_one)
+    solution += [i.index for i in fixed_one]
+    # the search only finds solutions better than the incumbent
+    if incumbent_value >= value:
+        value, solution = incumbent_value, [i.index for i in incumbent]
+
+    for i in solution:
+        taken[i] = 1
+    # prepare the solution in the specified output format
+    output_data = str(int(value)) + ' ' + str(0 if aborted else 1) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+def scaling(file_names, processes=(1, 2, 4, 8)):
+    """ Report the execution time with different numbers of processes.
+
+    Args:
+        file_names ([str]): The instance files.
+        processes ([int]): The numbers of processes.
+    """
+    global workers
+    default_workers = workers
+    print (' {:20s} {:>10s} {:>12s} {:>10s} {:>8s}'.format("Instance","Processes","Value","Time (s)","Speedup"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        reference = None
+        for p in processes:
+            workers = p
+            start_time = time.time()
+            value = solve_it(input_data).split()[0]
+            elapsed = time.time() - start_time
+            if reference is None:
+                reference = elapsed
+            print (' {:20s} {:10d} {:>12s} {:10.3f} {:8.2f}'.format(os.path.basename(file_name), p, value,
+                elapsed, reference / elapsed))
+    workers = default_workers
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == '--scaling':
+        scaling(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python bb_parallel.py ./data/ks_4_0)')
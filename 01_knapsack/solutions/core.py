@@ -0,0 +1,242 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Solution to the 0-1 knapsack problem using an expanding core.
+
+    In the optimal solution, most items with high efficiency (value/weight) are taken and
+    most items with low efficiency are left out. Only a small 'core' of items around the
+    critical item found by the linear relaxation needs to be searched.
+    The items before the core are fixed to 1, the items after the core are fixed to 0, and
+    the core is solved exactly with dynamic programming or branch and bound.
+
+    The core solution is a lower bound z. Then, every item outside the core is checked with
+    a reduction test: the Dantzig's bound with the item flipped (a fixed 1 left out or a fixed 0
+    forced in). If this bound is not better than z, no better solution flips this item. If all items
+    pass the test, z is optimal. Otherwise, the core is solved again with the items that failed.
+    While z improves, only the failed items closest to the critical item are added, at most doubling the core.
+
+    This is in the spirit of the expanding core of "Pisinger, D. An expanding-core algorithm for the
+    exact 0-1 knapsack problem. European Journal of Operational Research 87.1 (1995): 175-187".
+    See also sec 2.9 of "Martello, S. & Toth, P. Knapsack problems: algorithms and
+    computer implementations. John Wiley & Sons, 1990".
+"""
+
+import time # used for performance measurements
+import numpy as np
+
+try:
+    from solutions.dp_numpy import solve_dp
+    from solutions.loader import load_items, efficiency_order
+except ImportError:
+    from dp_numpy import solve_dp
+    from loader import load_items, efficiency_order
+
+# assign False to submit the solution
+debug = False
+
+# number of items in the first core, centered in the critical item
+initial_core_size = 50
+
+# algorithm used to solve the core: 'dp', 'bb', or 'auto'. 'auto' uses dynamic programming
+# when the DP table of the core has at most max_dp_cells cells, otherwise branch and bound
+core_solver = 'auto'
+max_dp_cells = 10**9
+
+
+def critical_item(weights, capacity):
+    """ Find the critical item of items sorted by efficiency.
+
+    Args:
+        weights (:class:`numpy.ndarray`): Item weights, sorted by decreasing efficiency.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int: Index of the first item that does not fit. len(weights) if all items fit.
+    """
+    prefix_weight = np.cumsum(weights)
+    return int(np.searchsorted(prefix_weight, capacity, side='right'))
+
+
+def reduction_bounds(values, weights, capacity, critical):
+    """ Dantzig's bound of the problem with each item flipped.
+
+    The items before the critical item are left out and the items after it are forced in.
+    Items that cannot be forced in get a bound of -1.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values, sorted by decreasing efficiency.
+        weights (:class:`numpy.ndarray`): Item weights, sorted by decreasing efficiency.
+        capacity (int): Knapsack capacity.
+        critical (int): Index of the critical item.
+
+    Returns:
+        :class:`numpy.ndarray`: The upper bound of each item flipped.
+    """
+    n = len(values)
+    prefix_weight = np.zeros(n+1, dtype=np.int64)
+    prefix_value = np.zeros(n+1, dtype=np.int64)
+    np.cumsum(weights, out=prefix_weight[1:])
+    np.cumsum(values, out=prefix_value[1:])
+    # safe divisors for the fractional part. the item n does not exist
+    frac_value = np.append(values, 0)
+    frac_weight = np.append(weights, 1)
+
+    bounds = np.full(n, -1, dtype=np.int64)
+    # items before the critical item left out: the items up to the new critical item k fit,
+    # k is never before the critical item and the item j is never after it
+    left = np.arange(critical)
+    room = capacity + weights[left]
+    k = np.searchsorted(prefix_weight, room, side='right') - 1
+    bounds[left] = prefix_value[k] - values[left] + (room - prefix_weight[k]) * frac_value[k] // frac_weight[k]
+    # items after the critical item forced in: the new critical item k is never after the critical item
+    right = np.arange(critical+1, n)
+    room = capacity - weights[right]
+    fits = room >= 0
+    right = right[fits]
+    room = room[fits]
+    k = np.searchsorted(prefix_weight, room, side='right') - 1
+    bounds[right] = values[right] + prefix_value[k] + (room - prefix_weight[k]) * frac_value[k] // frac_weight[k]
+    return bounds
+
+
+def solve_subproblem(values, weights, capacity):
+    """ Solve the core problem exactly.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [int], bool: The best value, the position of the taken items, and False if the search was aborted.
+    """
+    solver = core_solver
+    if solver == 'auto':
+        solver = 'dp' if len(values) * (capacity + 1) <= max_dp_cells else 'bb'
+    if solver == 'bb':
+        try:
+            import solutions.bb_heap as bb_heap
+        except ImportError:
+            import bb_heap
+        # items sorted in reverse order of value/weight ratio
+        items = [bb_heap.Input_Item(i, int(values[i]), int(weights[i])) for i in efficiency_order(values, weights).tolist()
+            if weights[i] <= capacity]
+        if len(items) == 0:
+            return 0, [], True
+        # without the messages and the trace file of bb_heap.py, which would corrupt the output
+        default_debug, default_build = bb_heap.debug, bb_heap.build_tree
+        bb_heap.debug, bb_heap.build_tree = False, False
+        try:
+            tree = bb_heap.Heap(items, capacity)
+            estimate, slack_idx, slack_used = tree.linear_relaxation(items, capacity)
+            if slack_used == items[slack_idx].weight:
+                # no fractioned item: the greedy solution is optimal
+                taken = [i.index for i in items[:slack_idx+1]]
+                return sum(int(values[i]) for i in taken), taken, True
+            aborted = tree.transverse(estimate, slack_idx, slack_used)
+        finally:
+            bb_heap.debug, bb_heap.build_tree = default_debug, default_build
+        return int(tree.best_value), [i.index for i in tree.solution], not aborted
+    value, taken = solve_dp(values, weights, capacity)
+    return value, taken, True
+
+
+def solve_core(values, weights, capacity):
+    """ Solve the 0-1 knapsack problem with an expanding core.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [int], bool: The best value, the position of the taken items, and True if it is proven optimal.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    n = len(values)
+    # sort by decreasing efficiency
+    order = efficiency_order(values, weights)
+    values = values[order]
+    weights = weights[order]
+
+    critical = critical_item(weights, capacity)
+    if critical == n:
+        # all items fit
+        return int(values.sum()), sorted(order.tolist()), True
+
+    bounds = reduction_bounds(values, weights, capacity, critical)
+    # the items in the core
+    in_core = np.zeros(n, dtype=bool)
+    half = max(1, initial_core_size // 2)
+    in_core[max(0, critical - half):min(n, critical + half)] = True
+    in_core[critical] = True
+    position = np.arange(n)
+    previous_value = None
+    iteration = 0
+    while True:
+        iteration += 1
+        core = np.flatnonzero(in_core)
+        # outside the core, the items before the critical item are taken
+        ones = (~in_core) & (position < critical)
+        core_capacity = capacity - int(weights[ones].sum())
+        core_value, core_taken, core_optimal = solve_subproblem(values[core], weights[core], core_capacity)
+        best_value = int(values[ones].sum()) + core_value
+        # the reduction test. an item outside the core passes when flipping it cannot beat best_value
+        failed = (~in_core) & (bounds > best_value)
+        if debug:
+            print (" - iteration %d: core size %d, capacity %d, value %d, items failing the reduction %d" % (iteration,
+                len(core), core_capacity, best_value, int(failed.sum())))
+        if not failed.any() or not core_optimal:
+            break
+        failed = np.flatnonzero(failed)
+        if previous_value is None or best_value > previous_value:
+            # expand the core gradually, at most doubling it with the failed items closest to the
+            # critical item. a better core solution makes more items pass the reduction test
+            failed = failed[np.argsort(np.abs(failed - critical), kind='stable')[:len(core)]]
+        # otherwise, the bound is too weak for the items that failed and they all go into the core
+        in_core[failed] = True
+        previous_value = best_value
+
+    taken = np.flatnonzero(ones).tolist() + [int(core[i]) for i in core_taken]
+    return best_value, sorted(order[taken].tolist()), core_optimal
+
+
+def solve_it(input_data):
+    """ Expanding core solved with dynamic programming or branch and bound.
+
+    """
+    # parse the input
+    item_count, capacity, values, weights, _ = load_items(input_data)
+
+    # drop the items that do not fit or do not add value. the items with no weight are always taken
+    keep = np.flatnonzero((weights <= capacity) & (values > 0) & (weights > 0))
+    free = np.flatnonzero((weights == 0) & (values > 0))
+
+    start_time = time.time()
+    value, taken_keep, optimal = solve_core(values[keep], weights[keep], capacity)
+    value += int(values[free].sum())
+    if debug:
+        print ("Solved in %.3f s" % (time.time() - start_time))
+
+    taken = [0]*item_count
+    for i in taken_keep:
+        taken[int(keep[i])] = 1
+    for i in free:
+        taken[int(i)] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(int(optimal)) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python core.py ./data/ks_4_0)')
@@ -0,0 +1,325 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Selects the engine that solves each knapsack instance.
+
+    The decision uses the features of the instance, in this order:
+
+    * all items fit: the greedy solution is optimal;
+    * few items (up to 'max_mitm_items') and the subsets of both halves fit in the memory budget of mitm.py:
+      meet in the middle, whose time depends only on the number of items;
+    * the DP table (items x capacity) is small and its choices fit in the memory budget of dp_numpy.py: DP;
+    * otherwise, dp_pareto.py runs with a small state budget. The number of non-dominated states does
+      not depend on the capacity, so it solves most instances, including the ones with a large capacity;
+    * when it exceeds the budget and the values and weights are strongly correlated (e.g. ks_82_0), the
+      bounds are weak and the states are not dominated. DP (with the O(capacity) memory reconstruction)
+      and the branch and bound race in parallel, if the DP row fits in memory. The first optimal
+      result wins; at the deadline, the best result so far;
+    * otherwise, the expanding core of core.py.
+
+    The decision, the features, the time of each engine, and the number of nodes of the selected engine
+    are kept in 'last_decision' and, when 'decision_log' is a file name, appended to it as a JSON line.
+    The nodes are the expansions of the branch and bound, the cells of the DP table, the states of
+    dp_pareto.py, or the subsets of mitm.py (0 for greedy, None for core.py, which does not count them).
+"""
+
+import time # used for performance measurements
+import os
+import json
+import queue
+import multiprocessing as mp
+import numpy as np
+
+try:
+    import solutions.dp_numpy as dp_numpy
+    import solutions.dp_pareto as dp_pareto
+    import solutions.core as core
+    import solutions.mitm as mitm
+    from solutions.heuristics import primal_solution
+    from solutions.loader import load_items, efficiency_order
+except ImportError:
+    import dp_numpy
+    import dp_pareto
+    import core
+    import mitm
+    from heuristics import primal_solution
+    from loader import load_items, efficiency_order
+
+# assign False to submit the solution
+debug = False
+
+# max number of items solved by the meet in the middle
+max_mitm_items = 64
+
+# max number of cells (items x capacity) solved directly by the DP
+max_dp_cells = 2 * 10**7
+
+# max number of states of the dp_pareto.py probe
+probe_states = 2**20
+
+# min correlation of the values and weights to race DP and branch and bound
+min_race_correlation = 0.9999
+
+# max memory (in bytes) of the DP row in the race. See dp_numpy.estimate_memory
+max_race_memory = 4 * 2**30
+
+# max execution time of the race (s). At the deadline, the best result so far is returned as not optimal
+max_race_time = 5 * 60
+
+# file where the decisions are appended as JSON lines. None does not save them
+decision_log = None
+
+# decision of the last instance. See select_engine and solve_items
+last_decision = None
+
+
+def features(values, weights, capacity):
+    """ The features of the instance used to select the engine.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        dict: items, capacity, cells of the DP table, memory of the DP choices and of the meet in the middle subsets
+        (None when a half has too many items), and correlation of the values and weights.
+    """
+    n = len(values)
+    correlation = 1.0
+    if n > 1 and values.std() > 0 and weights.std() > 0:
+        correlation = float(np.corrcoef(values, weights)[0, 1])
+    return {'items': n, 'capacity': capacity, 'cells': n * (capacity + 1), 'dp_memory': dp_numpy.estimate_memory(n, capacity),
+        'mitm_memory': mitm.estimate_memory(n, capacity), 'correlation': correlation, 'total_weight': int(weights.sum())}
+
+
+def select_engine(feature):
+    """ The engines tried for an instance, in order. See the module documentation.
+
+    Args:
+        feature (dict): The features of the instance.
+
+    Returns:
+        [str or tuple]: The engines. A tuple of engines runs them in parallel.
+    """
+    if feature['total_weight'] <= feature['capacity']:
+        return ['greedy']
+    if feature['items'] <= max_mitm_items and feature['mitm_memory'] is not None and \
+            feature['mitm_memory'] <= mitm.memory_budget:
+        return ['mitm']
+    if feature['cells'] <= max_dp_cells and feature['dp_memory'] <= dp_numpy.memory_budget:
+        return ['dp']
+    if feature['correlation'] >= min_race_correlation and dp_numpy.estimate_memory(0, feature['capacity']) <= max_race_memory:
+        return ['pareto', ('dp', 'bb')]
+    return ['pareto', 'core']
+
+
+# the engines return the best value, the position of the taken items, True if it is proven optimal,
+# and the number of nodes (see the module documentation)
+
+def solve_greedy(values, weights, capacity):
+    """ The greedy solution improved by the primal heuristics. Optimal only when all items fit. """
+    order = efficiency_order(values, weights)
+    value, taken = primal_solution(values[order], weights[order], capacity)
+    return value, sorted(order[taken].tolist()), int(weights.sum()) <= capacity, 0
+
+
+def solve_dp(values, weights, capacity):
+    value, taken = dp_numpy.solve_dp(values, weights, capacity)
+    return value, taken, True, len(values) * (capacity + 1)
+
+
+def solve_mitm(values, weights, capacity):
+    value, taken = mitm.solve_mitm(values, weights, capacity)
+    return value, taken, True, sum(mitm.last_subsets)
+
+
+def solve_pareto(values, weights, capacity):
+    value, taken, optimal, profile = dp_pareto.solve_pareto(values, weights, capacity, budget=probe_states)
+    return value, taken, optimal, int(profile.sum())
+
+
+def solve_core(values, weights, capacity):
+    return core.solve_core(values, weights, capacity) + (None,)
+
+
+def solve_bb(values, weights, capacity):
+    """ The branch and bound of bb_heap.py, without saving the tree. """
+    # imported here, since most instances do not need the branch and bound and it imports numba
+    try:
+        import solutions.bb_heap as bb_heap
+    except ImportError:
+        import bb_heap
+    default_debug, default_build = bb_heap.debug, bb_heap.build_tree
+    bb_heap.debug, bb_heap.build_tree = False, False
+    try:
+        # items sorted in reverse order of value/weight ratio
+        items = [bb_heap.Input_Item(i, int(values[i]), int(weights[i])) for i in efficiency_order(values, weights).tolist()]
+        value, solution, aborted, tree = bb_heap.solve_items(items, capacity)
+    finally:
+        bb_heap.debug, bb_heap.build_tree = default_debug, default_build
+    return int(value), sorted(i.index for i in solution), not aborted, tree.iters
+
+
+engines = {'greedy': solve_greedy, 'mitm': solve_mitm, 'dp': solve_dp, 'pareto': solve_pareto, 'core': solve_core,
+    'bb': solve_bb}
+
+
+def run_engine(name, values, weights, capacity, results):
+    """ Run an engine in a process of the race and send its result through the results queue. """
+    start_time = time.time()
+    value, taken, optimal, nodes = engines[name](values, weights, capacity)
+    results.put((name, value, taken, optimal, nodes, time.time() - start_time))
+
+
+def race(names, values, weights, capacity):
+    """ Run the engines in parallel processes. The first optimal result stops the others.
+
+    Args:
+        names ([str]): The engines.
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        str, int, [int], bool, int, dict: The engine of the result, the best value, the position of the taken items,
+        True if it is proven optimal, its number of nodes, and the time of each engine (None if it did not finish).
+    """
+    results = mp.Queue()
+    processes = [mp.Process(target=run_engine, args=(name, values, weights, capacity, results)) for name in names]
+    for p in processes:
+        p.start()
+    deadline = time.time() + max_race_time
+    timings = {name: None for name in names}
+    best = (None, -1, [], False, None)
+    pending = len(names)
+    try:
+        while pending > 0 and time.time() < deadline:
+            try:
+                name, value, taken, optimal, nodes, elapsed = results.get(timeout=0.1)
+            except queue.Empty:
+                # an engine that crashed (e.g. out of memory) sends no result
+                if not any(p.is_alive() for p in processes) and results.empty():
+                    break
+                continue
+            pending -= 1
+            timings[name] = elapsed
+            if optimal or value > best[1]:
+                best = (name, value, taken, optimal, nodes)
+            if optimal:
+                break
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+    return best + (timings,)
+
+
+def solve_items(values, weights, capacity):
+    """ Solve the instance with the engines selected by select_engine. The decision is saved in last_decision.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values. All items must fit in the knapsack and have a positive weight.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [int], bool: The best value, the position of the taken items, and True if it is proven optimal.
+    """
+    global last_decision
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    feature = features(values, weights, capacity)
+    route = select_engine(feature)
+    decision = {'features': feature, 'route': [list(r) if isinstance(r, tuple) else r for r in route], 'engine': None,
+        'timings': {}, 'nodes': None}
+    value, taken, optimal = 0, [], False
+    for step in route:
+        start_time = time.time()
+        if isinstance(step, tuple):
+            name, step_value, step_taken, step_optimal, step_nodes, timings = race(step, values, weights, capacity)
+            decision['timings'].update(timings)
+        else:
+            name = step
+            step_value, step_taken, step_optimal, step_nodes = engines[name](values, weights, capacity)
+            decision['timings'][name] = time.time() - start_time
+        if debug:
+            print ("Engine %s: value %d, optimal %s, %.3f s" % (name, step_value, step_optimal, time.time() - start_time))
+        if name is not None and (step_optimal or step_value > value):
+            value, taken, optimal = step_value, step_taken, step_optimal
+            decision['engine'] = name
+            decision['nodes'] = step_nodes
+        if optimal:
+            break
+    decision['value'] = value
+    decision['optimal'] = optimal
+    last_decision = decision
+    if decision_log is not None:
+        with open(decision_log, 'a') as log_file:
+            log_file.write(json.dumps(decision) + '\n')
+    return value, taken, optimal
+
+
+def solve_it(input_data):
+    """ Solve the instance with the engine selected for it.
+
+    """
+    # parse the input
+    item_count, capacity, values, weights, _ = load_items(input_data)
+
+    # drop the items that do not fit or do not add value. the items with no weight are always taken
+    keep = np.flatnonzero((weights <= capacity) & (values > 0) & (weights > 0))
+    free = np.flatnonzero((weights == 0) & (values > 0))
+
+    start_time = time.time()
+    value, taken_keep, optimal = solve_items(values[keep], weights[keep], capacity)
+    value += int(values[free].sum())
+    if debug:
+        print ("Solved in %.3f s" % (time.time() - start_time))
+
+    taken = [0]*item_count
+    for i in taken_keep:
+        taken[int(keep[i])] = 1
+    for i in free:
+        taken[int(i)] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(int(optimal)) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+def report(file_names):
+    """ Solve the instances and report the engine selected for each one and its time.
+
+    Args:
+        file_names ([str]): The instance files.
+    """
+    print (' {:20s} {:>7s} {:>10s} {:>9s} {:>22s} {:>8s} {:>12s} {:>10s} {:>8s}'.format("Instance","#Items","Capacity",
+        "Corr","Route","Engine","Value","Time (s)","Optimal"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        start_time = time.time()
+        output_data = solve_it(input_data)
+        elapsed = time.time() - start_time
+        feature = last_decision['features']
+        route = ','.join('|'.join(r) if isinstance(r, list) else r for r in last_decision['route'])
+        print (' {:20s} {:7d} {:10d} {:9.6f} {:>22s} {:>8s} {:>12s} {:10.3f} {:>8s}'.format(os.path.basename(file_name),
+            feature['items'], feature['capacity'], feature['correlation'], route, str(last_decision['engine']),
+            output_data.split()[0], elapsed, 'y' if last_decision['optimal'] else 'n'))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == '--report':
+        # the engine selected for each instance
+        report(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python dispatch.py ./data/ks_4_0)')
@@ -0,0 +1,203 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Solution to the 0-1 knapsack problem using dynamic programming with NumPy.
+
+    Only the current row of the DP table is kept in memory. row[c] is the best value
+    using at most c of capacity. Each item is applied to the whole row at once, as a
+    shifted np.maximum over the capacity axis.
+
+    The choice of each item (taken or not, for every capacity) is saved as packed bits,
+    i.e. 1 bit per cell instead of the 8 bytes of the value. When even the bits do not fit
+    in the memory budget (e.g. ks_10000_0 would need 10^10 bits), the solution is rebuilt
+    with a divide and conquer strategy similar to Hirschberg's algorithm, which needs only O(capacity) memory:
+    the items are split in two halves, the best capacity split between the halves is found
+    with one row of each half, and each half is solved recursively with its own capacity.
+
+    See sec 2.6 of "Martello, S. & Toth, P. Knapsack problems: algorithms and
+    computer implementations. John Wiley & Sons, 1990" for more details about dynamic programming.
+"""
+
+import time # used for performance measurements
+import numpy as np
+
+try:
+    from solutions.loader import load_items
+except ImportError:
+    from loader import load_items
+
+# assign False to submit the solution
+debug = False
+
+# max memory (in bytes) used to save the choices of the items.
+# Above it, the divide and conquer reconstruction is used
+memory_budget = 512 * 2**20
+
+
+def estimate_memory(item_count, capacity):
+    """ Estimate the memory used to solve the problem saving the choices of all items.
+
+    Args:
+        item_count (int): Number of items.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int: Bytes required by the packed bits plus the DP row.
+    """
+    return item_count * ((capacity + 8) // 8) + 16 * (capacity + 1)
+
+
+def dp_row(values, weights, capacity, choices=None):
+    """ Compute the last row of the DP table.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+        choices (list): If not None, the packed bits of each item are appended to it.
+            Bit j of item i is set when item i is taken with capacity weights[i]+j.
+
+    Returns:
+        :class:`numpy.ndarray`: row[c] is the best value with at most c of capacity.
+    """
+    row = np.zeros(capacity + 1, dtype=np.int64)
+    for i in range(len(values)):
+        w = int(weights[i])
+        if w > capacity:
+            if choices is not None:
+                choices.append(None)
+            continue
+        # the value of taking the item, for every capacity >= w
+        candidate = row[:capacity + 1 - w] + values[i]
+        if choices is not None:
+            choices.append(np.packbits(candidate > row[w:]))
+        np.maximum(row[w:], candidate, out=row[w:])
+    return row
+
+
+def solve_table(values, weights, capacity):
+    """ Solve the problem saving the choices of every item as packed bits.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [int]: The best value and the position of the taken items.
+    """
+    choices = []
+    row = dp_row(values, weights, capacity, choices)
+    value = int(row[capacity])
+    taken = []
+    room = capacity
+    # follow the choices backwards
+    for i in range(len(values)-1, -1, -1):
+        bits = choices[i]
+        j = room - int(weights[i])
+        if bits is not None and j >= 0 and (bits[j >> 3] >> (7 - (j & 7))) & 1:
+            taken.append(i)
+            room -= int(weights[i])
+    return value, taken[::-1]
+
+
+def solve_divide_and_conquer(values, weights, capacity, budget, offset=0):
+    """ Solve the problem using O(capacity) memory.
+
+    The items are split in two halves and the DP row of each half is computed. The best
+    capacity split is the c that maximizes first[c] + second[capacity-c]. Then, each half
+    is solved with its own capacity, until the subproblem fits in the memory budget.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+        budget (int): Memory budget in bytes.
+        offset (int): Position of the first item in the original arrays.
+
+    Returns:
+        int, [int]: The best value and the position of the taken items in the original arrays.
+    """
+    # no need to use more capacity than the weight of all items
+    capacity = min(capacity, int(weights.sum()))
+    if len(values) == 0 or capacity <= 0:
+        return 0, []
+    if len(values) == 1 or estimate_memory(len(values), capacity) <= budget:
+        value, taken = solve_table(values, weights, capacity)
+        return value, [offset + i for i in taken]
+    mid = len(values) // 2
+    first = dp_row(values[:mid], weights[:mid], capacity)
+    second = dp_row(values[mid:], weights[mid:], capacity)
+    first += second[::-1]
+    del second
+    split = int(np.argmax(first))
+    del first
+    value1, taken1 = solve_divide_and_conquer(values[:mid], weights[:mid], split, budget, offset)
+    value2, taken2 = solve_divide_and_conquer(values[mid:], weights[mid:], capacity - split, budget, offset + mid)
+    return value1 + value2, taken1 + taken2
+
+
+def solve_dp(values, weights, capacity, budget=None):
+    """ Solve the 0-1 knapsack problem with dynamic programming.
+
+    The memory is estimated up front. The choices are saved as packed bits when they fit
+    in the budget. Otherwise, the divide and conquer reconstruction is used.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+        budget (int): Memory budget in bytes. Defaults to memory_budget.
+
+    Returns:
+        int, [int]: The best value and the position of the taken items.
+    """
+    if budget is None:
+        budget = memory_budget
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    required = estimate_memory(len(values), capacity)
+    if debug:
+        print ("Capacity: %d, #items: %d, memory for the choices: %.1f MB, budget: %.1f MB" % (capacity,
+            len(values), required / 2.0**20, budget / 2.0**20))
+    if required <= budget:
+        return solve_table(values, weights, capacity)
+    if debug:
+        print ("Using divide and conquer reconstruction")
+    return solve_divide_and_conquer(values, weights, capacity, budget)
+
+
+def solve_it(input_data):
+    """ Dynamic programming keeping only the current row of the table.
+
+    """
+    # parse the input
+    item_count, capacity, values, weights, _ = load_items(input_data)
+
+    # drop the items that do not fit or do not add value
+    keep = np.flatnonzero((weights <= capacity) & (values > 0))
+
+    start_time = time.time()
+    value, taken_keep = solve_dp(values[keep], weights[keep], capacity)
+    if debug:
+        print ("Solved in %.3f s" % (time.time() - start_time))
+
+    taken = [0]*item_count
+    for i in taken_keep:
+        taken[int(keep[i])] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(1) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python dp_numpy.py ./data/ks_4_0)')
@@ -0,0 +1,211 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Solution to the 0-1 knapsack problem using the Nemhauser-Ullmann dynamic programming.
+
+    Instead of one DP cell per capacity, as in dp_numpy.py, each stage keeps only the
+    non-dominated states: the (weight, value) pairs of the subsets of the items seen so far such
+    that no other subset has less or the same weight and more or the same value. The states are
+    sorted NumPy arrays, with increasing weight and value. The states of the next item are the
+    states of this stage plus the same states with the item taken, merged with a sort and a
+    running maximum of the values. So the work does not depend on the capacity, only on the
+    number of states.
+
+    The items are processed in decreasing order of efficiency, and a state is discarded when
+    its Dantzig's bound, computed over the items not processed yet, cannot beat the best value known:
+    the incumbent of the primal heuristics or the best state. Each stage saves the parent and the
+    decision of its states, so the solution is rebuilt backwards from the best state.
+
+    The number of states of each stage (the state profile) is returned with the solution. It
+    tells if the instance is easy for this engine, e.g. to select the engine of an instance.
+
+    See sec 2.6 of "Martello, S. & Toth, P. Knapsack problems: algorithms and
+    computer implementations. John Wiley & Sons, 1990" for more details about the dominance of states.
+"""
+
+import time # used for performance measurements
+import os
+import numpy as np
+
+try:
+    from solutions.heuristics import primal_solution
+    from solutions.loader import load_items, efficiency_order
+except ImportError:
+    from heuristics import primal_solution
+    from loader import load_items, efficiency_order
+
+# assign False to submit the solution
+debug = False
+
+# max number of states saved by all stages. Above it, the search stops and returns the incumbent
+max_states = 2**26
+
+
+def dantzig_bounds(room, first, prefix_weight, prefix_value, values, weights):
+    """ Dantzig's bound of the items first, first+1, ... for every residual capacity in room.
+
+    Args:
+        room (:class:`numpy.ndarray`): Residual capacities.
+        first (int): The first item not processed yet.
+        prefix_weight, prefix_value (:class:`numpy.ndarray`): Prefix sums of the weights and values, sorted by efficiency.
+        values, weights (:class:`numpy.ndarray`): Item values and weights, sorted by efficiency.
+
+    Returns:
+        :class:`numpy.ndarray`: The value that can still be added to each state, rounded down.
+    """
+    n = len(values)
+    target = prefix_weight[first] + room
+    # items in [first, critical) fit entirely in the room
+    critical = np.searchsorted(prefix_weight, target, side='right') - 1
+    bound = prefix_value[critical] - prefix_value[first]
+    fractional = critical < n
+    k = critical[fractional]
+    bound[fractional] += (target[fractional] - prefix_weight[k]) * values[k] // weights[k]
+    return bound
+
+
+def solve_pareto(values, weights, capacity, incumbent=None, budget=None):
+    """ Solve the 0-1 knapsack problem keeping only the non-dominated states.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights. All of them must fit in the knapsack.
+        capacity (int): Knapsack capacity.
+        incumbent ((int, [int])): Value and position of the taken items of a known solution.
+            None runs the primal heuristics.
+        budget (int): Max number of states saved by all stages. Defaults to max_states.
+
+    Returns:
+        int, [int], bool, :class:`numpy.ndarray`: The best value, the position of the taken items, True if it
+        is proven optimal (False when the budget was exceeded), and the number of states after each item.
+    """
+    if budget is None:
+        budget = max_states
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    n = len(values)
+    # sort by decreasing efficiency
+    order = efficiency_order(values, weights)
+    values = values[order]
+    weights = weights[order]
+    if incumbent is None:
+        incumbent_value, taken = primal_solution(values, weights, capacity)
+        incumbent = (incumbent_value, sorted(order[taken].tolist()))
+    incumbent_value = incumbent[0]
+    prefix_weight = np.concatenate(([0], np.cumsum(weights)))
+    prefix_value = np.concatenate(([0], np.cumsum(values)))
+
+    profile = np.zeros(n, dtype=np.int64)
+    state_weight = np.zeros(1, dtype=np.int64)
+    state_value = np.zeros(1, dtype=np.int64)
+    # parent of each state in the previous stage and if the item was taken, for each stage
+    parents = []
+    decisions = []
+    saved = 0
+    for i in range(n):
+        fits = np.flatnonzero(state_weight + weights[i] <= capacity)
+        weight = np.concatenate((state_weight, state_weight[fits] + weights[i]))
+        value = np.concatenate((state_value, state_value[fits] + values[i]))
+        parent = np.concatenate((np.arange(len(state_weight)), fits))
+        taken = np.concatenate((np.zeros(len(state_weight), dtype=bool), np.ones(len(fits), dtype=bool)))
+        # increasing weight, and decreasing value for the same weight. A state is dominated when a
+        # state before it has the same or more value
+        sort = np.lexsort((-value, weight))
+        weight, value, parent, taken = weight[sort], value[sort], parent[sort], taken[sort]
+        best_before = np.maximum.accumulate(value)
+        keep = np.ones(len(value), dtype=bool)
+        keep[1:] = value[1:] > best_before[:-1]
+        # a state must beat the incumbent. The best state itself is a solution, so only the states
+        # that cannot reach it are discarded
+        bound = value + dantzig_bounds(capacity - weight, i+1, prefix_weight, prefix_value, values, weights)
+        keep &= (bound > incumbent_value) & (bound >= best_before[-1])
+        state_weight, state_value = weight[keep], value[keep]
+        parents.append(parent[keep])
+        decisions.append(taken[keep])
+        profile[i] = len(state_weight)
+        saved += len(state_weight)
+        if saved > budget:
+            if debug:
+                print ("State budget exceeded at item %d of %d: %d states" % (i+1, n, saved))
+            return incumbent_value, incumbent[1], False, profile[:i+1]
+        if len(state_weight) == 0:
+            # no state can beat the incumbent
+            break
+
+    if debug:
+        print ("States: max %d, total %d, incumbent %d" % (profile.max() if n > 0 else 0, saved, incumbent_value))
+    if len(state_value) == 0 or int(state_value.max()) <= incumbent_value:
+        return incumbent_value, incumbent[1], True, profile
+    # follow the parents backwards
+    state = int(np.argmax(state_value))
+    best_value = int(state_value[state])
+    taken = []
+    for i in range(len(parents)-1, -1, -1):
+        if decisions[i][state]:
+            taken.append(int(order[i]))
+        state = int(parents[i][state])
+    return best_value, sorted(taken), True, profile
+
+
+def solve_it(input_data):
+    """ Nemhauser-Ullmann dynamic programming with dominance and bound pruning.
+
+    """
+    # parse the input
+    item_count, capacity, values, weights, _ = load_items(input_data)
+
+    # drop the items that do not fit or do not add value. the items with no weight are always taken
+    keep = np.flatnonzero((weights <= capacity) & (values > 0) & (weights > 0))
+    free = np.flatnonzero((weights == 0) & (values > 0))
+
+    start_time = time.time()
+    value, taken_keep, optimal, profile = solve_pareto(values[keep], weights[keep], capacity)
+    value += int(values[free].sum())
+    if debug:
+        print ("Solved in %.3f s" % (time.time() - start_time))
+
+    taken = [0]*item_count
+    for i in taken_keep:
+        taken[int(keep[i])] = 1
+    for i in free:
+        taken[int(i)] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(int(optimal)) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+def state_profiles(file_names):
+    """ Solve the instances and report their state profile: the max and total number of states and
+    the item with the max number of states.
+
+    Args:
+        file_names ([str]): The instance files.
+    """
+    print (' {:20s} {:>7s} {:>10s} {:>12s} {:>10s} {:>12s} {:>10s} {:>10s} {:>8s}'.format("Instance","#Items",
+        "Capacity","Value","Max states","Total states","At item","Time (s)","Optimal"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            item_count, capacity, values, weights, _ = load_items(input_data_file.read())
+        keep = (weights <= capacity) & (values > 0) & (weights > 0)
+        start_time = time.time()
+        value, taken, optimal, profile = solve_pareto(values[keep], weights[keep], capacity)
+        elapsed = time.time() - start_time
+        print (' {:20s} {:7d} {:10d} {:12d} {:10d} {:12d} {:10d} {:10.3f} {:>8s}'.format(os.path.basename(file_name),
+            item_count, capacity, value, int(profile.max()) if len(profile) else 0, int(profile.sum()),
+            int(np.argmax(profile)) if len(profile) else 0, elapsed, 'y' if optimal else 'n'))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == '--profile':
+        # the state profile of each instance
+        state_profiles(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python dp_pareto.py ./data/ks_4_0)')
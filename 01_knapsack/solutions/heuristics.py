@@ -0,0 +1,172 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Primal heuristics for the 0-1 knapsack problem.
+
+    They find a good feasible solution quickly, to be used as the initial best value
+    (incumbent) of an exact search such as the Branch & Bound of bb_heap.py.
+
+    * greedy: the items are taken in reverse order of value/weight ratio while they fit, as in sorted_value_per_weight.py;
+    * best single item: the most valuable item alone, which is better than the greedy solution when
+      a valuable item is skipped by the greedy because of its low ratio;
+    * local search: the best move that exchanges up to two taken items by up to two items left out
+      is applied while it improves the solution. Only the taken items closest to the critical item and
+      the items left out closest to the critical item are considered, so each move is cheap.
+
+    See sec 2.4 of "Martello, S. & Toth, P. Knapsack problems: algorithms and
+    computer implementations. John Wiley & Sons, 1990" for the greedy algorithm.
+"""
+
+import time # used for performance measurements
+import numpy as np
+
+# assign False to submit the solution
+debug = False
+
+# number of taken items and of items left out considered by the local search
+neighborhood_size = 64
+
+# max number of improving moves applied by the local search
+max_moves = 50
+
+
+def greedy(values, weights, capacity):
+    """ Take the items in order while they fit, skipping the ones that do not fit.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values, sorted by decreasing efficiency.
+        weights (:class:`numpy.ndarray`): Item weights, sorted by decreasing efficiency.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        :class:`numpy.ndarray`: True for the taken items.
+    """
+    taken = np.zeros(len(values), dtype=bool)
+    # the items before the critical item all fit
+    critical = int(np.searchsorted(np.cumsum(weights), capacity, side='right'))
+    taken[:critical] = True
+    room = capacity - int(weights[:critical].sum())
+    # after it, stop as soon as no remaining item fits
+    min_weight = np.minimum.accumulate(weights[::-1])[::-1]
+    for i in range(critical, len(values)):
+        if min_weight[i] > room:
+            break
+        if weights[i] <= room:
+            taken[i] = True
+            room -= int(weights[i])
+    return taken
+
+
+def best_single_item(values, weights, capacity):
+    """ Take only the most valuable item that fits.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        :class:`numpy.ndarray`: True for the taken item.
+    """
+    taken = np.zeros(len(values), dtype=bool)
+    fits = np.flatnonzero(weights <= capacity)
+    if len(fits) > 0:
+        taken[fits[np.argmax(values[fits])]] = True
+    return taken
+
+
+def subsets(positions, values, weights):
+    """ Enumerate the subsets with up to two items.
+
+    Args:
+        positions (:class:`numpy.ndarray`): Position of the items.
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+
+    Returns:
+        :class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`: The value
+            and the weight of each subset, and the position of its two items (-1 when absent).
+    """
+    first, second = np.triu_indices(len(positions), 1)
+    empty = np.array([-1], dtype=np.int64)
+    a = np.concatenate((empty, positions, positions[first]))
+    b = np.concatenate((empty, np.full(len(positions), -1, dtype=np.int64), positions[second]))
+    # position -1 is a sentinel item with no value and no weight
+    sum_values = np.where(a >= 0, values[a], 0) + np.where(b >= 0, values[b], 0)
+    sum_weights = np.where(a >= 0, weights[a], 0) + np.where(b >= 0, weights[b], 0)
+    return sum_values, sum_weights, a, b
+
+
+def local_search(values, weights, capacity, taken):
+    """ Improve a solution exchanging up to two taken items by up to two items left out.
+
+    For every subset of taken items, the best subset of items left out that fits in the released room
+    is found with a binary search in the subsets sorted by weight. The best improving move is applied.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values, sorted by decreasing efficiency.
+        weights (:class:`numpy.ndarray`): Item weights, sorted by decreasing efficiency.
+        capacity (int): Knapsack capacity.
+        taken (:class:`numpy.ndarray`): True for the taken items. It is updated.
+
+    Returns:
+        int: The number of moves applied.
+    """
+    moves = 0
+    while moves < max_moves:
+        room = capacity - int(weights[taken].sum())
+        # the last taken items and the first items left out are the closest to the critical item
+        inside = np.flatnonzero(taken)[-neighborhood_size:]
+        outside = np.flatnonzero(~taken)[:neighborhood_size]
+        if len(outside) == 0:
+            break
+        out_values, out_weights, out_a, out_b = subsets(inside, values, weights)
+        in_values, in_weights, in_a, in_b = subsets(outside, values, weights)
+        # best subset to add with at most a given weight: prefix max of the values sorted by weight
+        order = np.argsort(in_weights, kind='stable')
+        in_weights = in_weights[order]
+        best = np.maximum.accumulate(in_values[order])
+        best_idx = order[np.maximum.accumulate(np.where(in_values[order] == best, np.arange(len(order)), 0))]
+        k = np.searchsorted(in_weights, room + out_weights, side='right') - 1
+        gain = np.where(k >= 0, best[np.maximum(k, 0)], 0) - out_values
+        move = int(np.argmax(gain))
+        if gain[move] <= 0:
+            break
+        add = best_idx[k[move]]
+        for i in (out_a[move], out_b[move]):
+            if i >= 0:
+                taken[i] = False
+        for i in (in_a[add], in_b[add]):
+            if i >= 0:
+                taken[i] = True
+        moves += 1
+    return moves
+
+
+def primal_solution(values, weights, capacity):
+    """ Best solution of the greedy and the best single item, improved by the local search.
+
+    Args:
+        values ([int]): Item values, sorted by decreasing efficiency.
+        weights ([int]): Item weights, sorted by decreasing efficiency.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int, [int]: The best value and the position of the taken items.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    if len(values) == 0:
+        return 0, []
+    start_time = time.time()
+    taken = greedy(values, weights, capacity)
+    greedy_value = int(values[taken].sum())
+    single = best_single_item(values, weights, capacity)
+    if int(values[single].sum()) > greedy_value:
+        taken = single
+    moves = local_search(values, weights, capacity, taken)
+    value = int(values[taken].sum())
+    if debug:
+        print ("Primal heuristics: greedy %d, best single item %d, local search %d (%d moves) in %.3f s" % (greedy_value,
+            int(values[single].sum()), value, moves, time.time() - start_time))
+    return value, np.flatnonzero(taken).tolist()
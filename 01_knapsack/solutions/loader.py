@@ -0,0 +1,66 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Input loader shared by the knapsack solvers.
+
+    The whole input is parsed at once by NumPy into two int64 arrays, instead of splitting the
+    lines and calling int() for each field. This way, parsing an instance with 10^6 items takes
+    about 0.1s. The loader also returns the items sorted by efficiency, as a permutation, so the
+    solvers start from contiguous arrays.
+"""
+
+import time # used for performance measurements
+import numpy as np
+
+
+def efficiency_order(values, weights):
+    """ Permutation of the items in reverse order of value/weight ratio.
+
+    The items with the same ratio are in reverse input order, like sorted(items, key=ratio)[::-1],
+    so the branch and bound expands the same nodes as before the loader. Items with no weight come first.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+
+    Returns:
+        :class:`numpy.ndarray`: The positions of the items, by decreasing efficiency.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = values / weights.astype(np.float64)
+    return np.argsort(ratio, kind='stable')[::-1]
+
+
+def load_items(input_data):
+    """ Parse the instance in the course format.
+
+    Args:
+        input_data (str): The number of items and the capacity, followed by the value and the weight of each item.
+
+    Returns:
+        int, int, :class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`: The number of items,
+        the capacity, the values and the weights in input order, and the efficiency order (see efficiency_order).
+    """
+    numbers = np.fromstring(input_data, dtype=np.int64, sep=' ')
+    item_count, capacity = int(numbers[0]), int(numbers[1])
+    if len(numbers) < 2 + 2*item_count:
+        raise ValueError("the input has %d numbers for %d items" % (len(numbers) - 2, item_count))
+    items = numbers[2:2 + 2*item_count].reshape(item_count, 2)
+    values = np.ascontiguousarray(items[:, 0])
+    weights = np.ascontiguousarray(items[:, 1])
+    return item_count, capacity, values, weights, efficiency_order(values, weights)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        # parsing time of the given instances
+        for file_location in sys.argv[1:]:
+            with open(file_location, 'r') as input_data_file:
+                input_data = input_data_file.read()
+            start_time = time.time()
+            item_count, capacity, values, weights, order = load_items(input_data)
+            print ("%s: %d items, capacity %d, parsed in %.3f s" % (file_location, item_count, capacity,
+                time.time() - start_time))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python loader.py ./data/ks_4_0)')
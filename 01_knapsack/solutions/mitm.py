@@ -0,0 +1,220 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Solution to the 0-1 knapsack problem using the Horowitz-Sahni split enumeration (meet in the middle).
+
+    The items are split in two halves and the subsets of each half are enumerated, one item at
+    a time, into sorted NumPy arrays of (weight, value, taken items). The taken items of a subset are
+    the bits of an int64, so each half has at most 62 items. After each item, the subsets that do not fit
+    and the dominated ones (another subset has less or the same weight and more or the same value)
+    are discarded, as in dp_pareto.py. So the weights and the values of a half are both increasing,
+    and the best subset of the second half that fits with a subset of the first half is found with a
+    binary search of the room left.
+
+    The time and the memory depend only on the number of items, not on the bounds, so it is
+    predictable: at most min(2^(n/2), capacity+1) subsets per half. The memory is estimated before
+    the enumeration, and an instance above the budget is refused with a MemoryError.
+
+    See sec 2.5.1 of "Martello, S. & Toth, P. Knapsack problems: algorithms and
+    computer implementations. John Wiley & Sons, 1990" for more details.
+"""
+
+import time # used for performance measurements
+import os
+import numpy as np
+
+try:
+    from solutions.loader import load_items
+except ImportError:
+    from loader import load_items
+
+# assign False to submit the solution
+debug = False
+
+# max memory (in bytes) of the subsets of both halves. Above it, the instance is refused
+memory_budget = 1 * 2**30
+
+# max number of items of a half, since the taken items are the bits of an int64
+max_half_items = 62
+
+# number of subsets of the first and the second half of the last instance
+last_subsets = None
+
+# bytes per subset: weight, value and taken items of the first half, kept during the second half, plus
+# the two candidates per subset of the half being enumerated, each with the three arrays and the sort index
+bytes_per_subset = 24 + 2 * 32
+
+
+def estimate_memory(item_count, capacity):
+    """ Estimate the memory used to enumerate the two halves.
+
+    Args:
+        item_count (int): Number of items.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        int: Bytes required by the largest possible half. None if a half has more than max_half_items.
+    """
+    half = (item_count + 1) // 2
+    if half > max_half_items:
+        return None
+    # the non-dominated subsets have different weights
+    return bytes_per_subset * min(2**half, capacity + 1)
+
+
+def enumerate_half(values, weights, capacity):
+    """ Enumerate the non-dominated subsets of the items that fit in the knapsack.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+
+    Returns:
+        :class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`: The weights, the values, and the taken
+        items (bit i for item i) of the subsets, by increasing weight and value.
+    """
+    subset_weight = np.zeros(1, dtype=np.int64)
+    subset_value = np.zeros(1, dtype=np.int64)
+    subset_taken = np.zeros(1, dtype=np.int64)
+    for i in range(len(values)):
+        fits = np.flatnonzero(subset_weight + weights[i] <= capacity)
+        weight = np.concatenate((subset_weight, subset_weight[fits] + weights[i]))
+        value = np.concatenate((subset_value, subset_value[fits] + values[i]))
+        taken = np.concatenate((subset_taken, subset_taken[fits] | (1 << i)))
+        # increasing weight, and decreasing value for the same weight. A subset is dominated when a
+        # subset before it has the same or more value
+        sort = np.lexsort((-value, weight))
+        weight, value, taken = weight[sort], value[sort], taken[sort]
+        keep = np.ones(len(value), dtype=bool)
+        keep[1:] = value[1:] > np.maximum.accumulate(value)[:-1]
+        subset_weight, subset_value, subset_taken = weight[keep], value[keep], taken[keep]
+    return subset_weight, subset_value, subset_taken
+
+
+def solve_mitm(values, weights, capacity, budget=None):
+    """ Solve the 0-1 knapsack problem joining the subsets of two halves.
+
+    Args:
+        values (:class:`numpy.ndarray`): Item values.
+        weights (:class:`numpy.ndarray`): Item weights.
+        capacity (int): Knapsack capacity.
+        budget (int): Memory budget in bytes. Defaults to memory_budget.
+
+    Returns:
+        int, [int]: The best value and the position of the taken items.
+
+    Raises:
+        MemoryError: If the subsets may not fit in the budget.
+    """
+    global last_subsets
+    if budget is None:
+        budget = memory_budget
+    values = np.asarray(values, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    n = len(values)
+    required = estimate_memory(n, capacity)
+    if debug:
+        print ("Capacity: %d, #items: %d, memory for the subsets: %s, budget: %.1f MB" % (capacity, n,
+            "%.1f MB" % (required / 2.0**20) if required is not None else "too many items", budget / 2.0**20))
+    if required is None or required > budget:
+        raise MemoryError("the subsets of %d items with capacity %d do not fit in %d bytes" % (n, capacity, budget))
+    mid = (n + 1) // 2
+    first_weight, first_value, first_taken = enumerate_half(values[:mid], weights[:mid], capacity)
+    second_weight, second_value, second_taken = enumerate_half(values[mid:], weights[mid:], capacity)
+    last_subsets = (len(first_weight), len(second_weight))
+    if debug:
+        print ("Subsets: %d in the first half, %d in the second half" % (len(first_weight), len(second_weight)))
+    # the best subset of the second half that fits in the room left by each subset of the first half is the heaviest one.
+    # The empty subset always fits
+    match = np.searchsorted(second_weight, capacity - first_weight, side='right') - 1
+    total = first_value + second_value[match]
+    best = int(np.argmax(total))
+    taken = [i for i in range(mid) if (int(first_taken[best]) >> i) & 1]
+    taken += [mid + i for i in range(n - mid) if (int(second_taken[match[best]]) >> i) & 1]
+    return int(total[best]), taken
+
+
+def solve_it(input_data):
+    """ Meet in the middle: the subsets of each half of the items, joined by binary search.
+
+    """
+    # parse the input
+    item_count, capacity, values, weights, _ = load_items(input_data)
+
+    # drop the items that do not fit or do not add value
+    keep = np.flatnonzero((weights <= capacity) & (values > 0))
+
+    start_time = time.time()
+    value, taken_keep = solve_mitm(values[keep], weights[keep], capacity)
+    if debug:
+        print ("Solved in %.3f s" % (time.time() - start_time))
+
+    taken = [0]*item_count
+    for i in taken_keep:
+        taken[int(keep[i])] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(1) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+def compare_engines(file_names):
+    """ Solve the instances with the meet in the middle, the DP of dp_numpy.py, and the search of bb_heap.py.
+
+    Args:
+        file_names ([str]): The instance files.
+    """
+    try:
+        import solutions.dp_numpy as dp_numpy
+        import solutions.bb_heap as bb_heap
+    except ImportError:
+        import dp_numpy
+        import bb_heap
+    default_debug, default_build = bb_heap.debug, bb_heap.build_tree
+    bb_heap.debug, bb_heap.build_tree = False, False
+    print (' {:20s} {:>7s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}'.format("Instance","#Items","Capacity",
+        "Memory(MB)","Value","MITM (s)","DP (s)","B&B (s)"))
+    try:
+        for file_name in file_names:
+            with open(file_name, 'r') as input_data_file:
+                input_data = input_data_file.read()
+            item_count, capacity, values, weights, _ = load_items(input_data)
+            keep = (weights <= capacity) & (values > 0)
+            required = estimate_memory(int(keep.sum()), capacity)
+            timings = []
+            value = None
+            if required is not None and required <= memory_budget:
+                start_time = time.time()
+                value, taken = solve_mitm(values[keep], weights[keep], capacity)
+                timings.append(time.time() - start_time)
+            else:
+                timings.append(None)
+            start_time = time.time()
+            dp_value, taken = dp_numpy.solve_dp(values[keep], weights[keep], capacity)
+            timings.append(time.time() - start_time)
+            start_time = time.time()
+            bb_value = bb_heap.solve_it(input_data).split()[0]
+            timings.append(time.time() - start_time)
+            if value is not None and (value != dp_value or str(value) != bb_value):
+                print ("OOOOPS: %s: meet in the middle %d, DP %d, B&B %s" % (file_name, value, dp_value, bb_value))
+            print (' {:20s} {:7d} {:10d} {:>10s} {:10d} {:>10s} {:10.3f} {:10.3f}'.format(os.path.basename(file_name),
+                item_count, capacity, '%.1f' % (required / 2.0**20) if required is not None else '-', dp_value,
+                '%.3f' % timings[0] if timings[0] is not None else 'refused', timings[1], timings[2]))
+    finally:
+        bb_heap.debug, bb_heap.build_tree = default_debug, default_build
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == '--compare':
+        # the time of the meet in the middle, the DP and the branch and bound
+        compare_engines(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        with open(file_location, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python mitm.py ./data/ks_4_0)')
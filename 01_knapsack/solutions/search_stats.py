@@ -0,0 +1,133 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Counters and timers of the search of bb_heap.py.
+
+    Heap.transverse creates a Search_Stats only when bb_heap.stats_file is set. Otherwise, the
+    stats object is None and the main loop skips it, like the trace of tree_trace.py, so a search
+    without stats runs the same code as before. At the end of the search, the stats are saved as one
+    JSON object with:
+
+    ============== ==========================================================================
+    field          description
+    ============== ==========================================================================
+    iterations     number of expansions (the same as Heap.iters)
+    time           time of the search (s)
+    nodes          dict of lists indexed by depth: 'created' (children created), 'pruned'
+                   (discarded by the bound), 'infeasible', 'leaves' (children of the last item
+                   that did not improve the best value), and 'stale' (nodes popped from the
+                   frontier whose estimate no longer beats the best value)
+    bound          number of calls and total time (s) of the bound of the left children
+    max_frontier   high-water mark of the number of nodes in the frontier
+    incumbents     [time (s), iteration, value] of the initial best value and of each improvement
+    ============== ==========================================================================
+
+    The bound is timed by wrapping Heap.left_bound, so its time includes the cost of the wrapper, about
+    0.1 us per call. Compare the time with stats to the time without them before reading it as absolute.
+
+    The search in the compiled kernel of bb_kernel.py does not count nodes per depth, so it is not
+    used while the stats are enabled.
+"""
+
+import time # used for performance measurements
+import json
+
+try:
+    from solutions.tree_trace import STATUS_PRUNED, STATUS_INFEASIBLE
+except ImportError:
+    from tree_trace import STATUS_PRUNED, STATUS_INFEASIBLE
+
+
+class Search_Stats:
+    def __init__(self, depth, best_value=0):
+        """ Counters of one search.
+
+        Args:
+            depth (int): Max depth of the tree (the number of items).
+            best_value (int): The best value when the search starts, e.g. of the primal heuristics.
+        """
+        self.start_time = time.perf_counter()
+        # number of children created at each depth. The root is at depth 0
+        self.created = [0]*(depth+1)
+        self.pruned = [0]*(depth+1)
+        self.infeasible = [0]*(depth+1)
+        self.leaves = [0]*(depth+1)
+        self.stale = [0]*(depth+1)
+        self.bound_calls = 0
+        self.bound_time = 0.0
+        self.max_frontier = 0
+        self.incumbents = [[0.0, 0, int(best_value)]]
+        # set by close
+        self.iterations = 0
+        self.time = 0.0
+
+    def timed(self, bound):
+        """ Wrap a bound function to count its calls and time.
+
+        Args:
+            bound (function): The bound, e.g. Heap.left_bound.
+
+        Returns:
+            function: The same bound, timed.
+        """
+        clock = time.perf_counter
+
+        def timed_bound(*args):
+            start = clock()
+            result = bound(*args)
+            self.bound_time += clock() - start
+            self.bound_calls += 1
+            return result
+        return timed_bound
+
+    def node(self, depth, status, bounded, frontier_size):
+        """ Count a child created by the search.
+
+        Args:
+            depth (int): Depth of the child.
+            status (int): One of the STATUS_* constants of tree_trace.py.
+            bounded (bool): True if the estimate of the child does not beat the best value.
+            frontier_size (int): Number of nodes in the frontier after the child was handled.
+        """
+        self.created[depth] += 1
+        if status == STATUS_INFEASIBLE:
+            self.infeasible[depth] += 1
+        elif status == STATUS_PRUNED:
+            # a leaf that fits and passes the bound is pruned as well, since it has no children
+            if bounded:
+                self.pruned[depth] += 1
+            else:
+                self.leaves[depth] += 1
+        if frontier_size > self.max_frontier:
+            self.max_frontier = frontier_size
+
+    def discard(self, depth):
+        """ Count a node popped from the frontier that cannot beat the best value anymore. """
+        self.stale[depth] += 1
+
+    def incumbent(self, iteration, value):
+        """ Save a new best value. """
+        self.incumbents.append([time.perf_counter() - self.start_time, iteration, int(value)])
+
+    def close(self, iterations):
+        """ Stop the timer of the search.
+
+        Args:
+            iterations (int): Number of expansions of the search.
+        """
+        self.iterations = iterations
+        self.time = time.perf_counter() - self.start_time
+
+    def to_dict(self):
+        """ The stats as a JSON serializable dict. See the module documentation. """
+        return {'iterations': self.iterations, 'time': self.time,
+            'nodes': {'created': self.created, 'pruned': self.pruned, 'infeasible': self.infeasible,
+                'leaves': self.leaves, 'stale': self.stale},
+            'bound': {'calls': self.bound_calls, 'time': self.bound_time},
+            'max_frontier': self.max_frontier, 'incumbents': self.incumbents}
+
+    def save(self, file_name):
+        """ Write the stats as one JSON object. """
+        with open(file_name, 'w') as output_file:
+            json.dump(self.to_dict(), output_file)
+            output_file.write('\n')
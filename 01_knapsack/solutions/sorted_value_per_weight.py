@@ -2,6 +2,12 @@
 # -*- coding: utf-8 -*-
 
 from collections import namedtuple
+
+try:
+    from solutions.loader import load_items
+except ImportError:
+    from loader import load_items
+
 Item = namedtuple("Item", ['index', 'value', 'weight'])
 
 # assign False to submit the solution
@@ -48,18 +54,9 @@ def solve_it(input_data):
     """
 
     # parse the input
-    lines = input_data.split('\n')
-
-    firstLine = lines[0].split()
-    item_count = int(firstLine[0])
-    capacity = int(firstLine[1])
-
-    items = []
+    item_count, capacity, values, weights, order = load_items(input_data)
 
-    for i in range(1, item_count+1):
-        line = lines[i]
-        parts = line.split()
-        items.append(Item(i-1, int(parts[0]), int(parts[1])))
+    items = [Item(i, v, w) for i, (v, w) in enumerate(zip(values.tolist(), weights.tolist()))]
 
     # a trivial algorithm for filling the knapsack
     # it takes items in-order until the knapsack is full
@@ -75,7 +72,7 @@ def solve_it(input_data):
 
 
     # items sorted in reverse order of value/weight ratio
-    items = sorted(items, key=lambda x: float(x.value/float(x.weight)))[::-1]
+    items = [items[i] for i in order.tolist()]
 
     taken_debug = [0]*item_count
     idx = 0
@@ -1,31 +1,226 @@
 #!/usr/bin/python3.6
 # -*- coding: utf-8 -*-
 
-import networkx as nx
+""" Convert the search tree saved by bb_heap.py into other formats.
+
+    The input is the binary trace written by bb_heap.py (see tree_trace.py) or a Networkx graph in
+    Pickle format, as saved by the older versions. The trace is read in chunks of records and every
+    output is written chunk by chunk, so the memory used does not depend on the size of the tree.
+
+    Supported output formats:
+
+    * dot: graphviz, with the node attributes;
+    * adjlist: one line per edge, 'parent child', readable by networkx.read_adjlist;
+    * edgelist: one line per edge, with the attributes of the child, readable by networkx.read_edgelist;
+    * yaml: a 'nodes' sequence with one flow mapping per node (node, parent, value, estimate, room, depth,
+      color), readable by yaml.safe_load. The parent of the root is null. The older versions wrote the
+      Networkx graph with networkx.write_yaml, which needs the whole graph in memory;
+    * npz: one NumPy array per record field (node, parent, value, estimate, room, depth, status),
+      readable by numpy.load.
+"""
+
 import os, sys
+import time # used for performance measurements
+import pickle
+import zipfile
+import numpy as np
+
+try:
+    from solutions.tree_trace import MAGIC, RECORD, RECORD_DTYPE, STATUS_COLORS, STATUS_OPEN, STATUS_PRUNED, \
+        STATUS_INCUMBENT, read_records
+except ImportError:
+    from tree_trace import MAGIC, RECORD, RECORD_DTYPE, STATUS_COLORS, STATUS_OPEN, STATUS_PRUNED, \
+        STATUS_INCUMBENT, read_records
+
+# records per chunk of the text formats. The text of a chunk is built in memory before writing it
+text_chunk_records = 2**16
+
+# the fields saved by the npz format
+COLUMNS = ['node', 'parent', 'value', 'estimate', 'room', 'depth', 'status']
+
+# status of the colors of the Networkx graph
+COLOR_STATUS = {'gray': STATUS_OPEN, 'aquamarine': STATUS_PRUNED, 'yellow': STATUS_INCUMBENT, 'red': STATUS_INCUMBENT}
+
+
+def is_trace(file_name):
+    """ Check if a file is a binary trace.
+
+    Args:
+        file_name (str): The input file.
+
+    Returns:
+        bool: True if it starts with the trace MAGIC.
+    """
+    with open(file_name, 'rb') as input_file:
+        return input_file.read(len(MAGIC)) == MAGIC
+
+
+def read_pickle(file_name, chunk_records=2**20):
+    """ Read a Networkx graph in Pickle format as chunks of trace records.
+
+    The whole graph is loaded in memory, so this is only meant for the trees saved by older versions.
+
+    Args:
+        file_name (str): The pickle file.
+        chunk_records (int): Max number of records in each chunk.
+
+    Returns:
+        generator of :class:`numpy.ndarray`: The records, with dtype RECORD_DTYPE.
+    """
+    with open(file_name, 'rb') as input_file:
+        G = pickle.load(input_file)
+    # the node ids are the iterations that created them, so the parents come first
+    nodes = sorted(G.nodes)
+    for start in range(0, len(nodes), chunk_records):
+        chunk = nodes[start:start+chunk_records]
+        records = np.zeros(len(chunk), dtype=RECORD_DTYPE)
+        for i, node in enumerate(chunk):
+            attributes = G.nodes[node]
+            parents = list(G.predecessors(node))
+            records[i]['node'] = node
+            records[i]['parent'] = parents[0] if parents else -1
+            records[i]['value'] = attributes.get('value', 0)
+            records[i]['estimate'] = attributes.get('estimate', 0)
+            records[i]['room'] = attributes.get('room', 0)
+            records[i]['status'] = COLOR_STATUS.get(attributes.get('color'), STATUS_OPEN)
+            depth = 0
+            while parents:
+                depth += 1
+                parents = list(G.predecessors(parents[0]))
+            records[i]['depth'] = depth
+        yield records
+
+
+def count_records(file_name):
+    """ Number of records in the input file, without reading it. Only for binary traces.
+
+    Args:
+        file_name (str): The trace file.
+
+    Returns:
+        int: The number of complete records.
+    """
+    return (os.path.getsize(file_name) - len(MAGIC)) // RECORD.size
+
+
+def write_dot(chunks, output_file):
+    """ Write the tree in graphviz format. """
+    output_file.write('strict digraph  {\n')
+    for records in chunks:
+        lines = []
+        for node, parent, value, estimate, room, depth, status in zip(*(records[c].tolist() for c in COLUMNS)):
+            lines.append('%d [color=%s, depth=%d, estimate=%d, room=%d, value=%d];' % (node, STATUS_COLORS[status],
+                depth, estimate, room, value))
+            if parent >= 0:
+                lines.append('%d -> %d;' % (parent, node))
+        output_file.write('\n'.join(lines) + '\n')
+    output_file.write('}\n')
+
+
+def write_adjlist(chunks, output_file):
+    """ Write the tree as an adjacency list with one edge per line. """
+    for records in chunks:
+        lines = ['%d %d' % (parent, node) if parent >= 0 else '%d' % node
+            for node, parent in zip(records['node'].tolist(), records['parent'].tolist())]
+        output_file.write('\n'.join(lines) + '\n')
+
+
+def write_edgelist(chunks, output_file):
+    """ Write the tree as an edge list, with the attributes of the child node. """
+    for records in chunks:
+        lines = []
+        for node, parent, value, estimate, room, depth, status in zip(*(records[c].tolist() for c in COLUMNS)):
+            if parent >= 0:
+                lines.append("%d %d {'value': %d, 'estimate': %d, 'room': %d, 'depth': %d, 'color': '%s'}" % (parent,
+                    node, value, estimate, room, depth, STATUS_COLORS[status]))
+        if lines:
+            output_file.write('\n'.join(lines) + '\n')
+
+
+def write_yaml(chunks, output_file):
+    """ Write the tree in YAML, with one mapping per node. """
+    output_file.write('nodes:\n')
+    for records in chunks:
+        lines = ['- {node: %d, parent: %s, value: %d, estimate: %d, room: %d, depth: %d, color: %s}' % (node,
+            parent if parent >= 0 else 'null', value, estimate, room, depth, STATUS_COLORS[status])
+            for node, parent, value, estimate, room, depth, status in zip(*(records[c].tolist() for c in COLUMNS))]
+        output_file.write('\n'.join(lines) + '\n')
+
+
+def write_npz(input_name, read, output_name):
+    """ Write one NumPy array per record field into an uncompressed npz file.
+
+    Each array is streamed into the zip file, reading the input once per field.
+
+    Args:
+        input_name (str): The input file.
+        read (function): Returns the generator of records of a file.
+        output_name (str): The npz file.
+
+    Returns:
+        int: The number of records.
+    """
+    if read is read_records:
+        count = count_records(input_name)
+    else:
+        count = sum(len(records) for records in read(input_name))
+    with zipfile.ZipFile(output_name, 'w', zipfile.ZIP_STORED, allowZip64=True) as npz:
+        for column in COLUMNS:
+            with npz.open(column + '.npy', 'w', force_zip64=True) as npy:
+                dtype = RECORD_DTYPE[column]
+                np.lib.format.write_array_header_1_0(npy, {'descr': np.lib.format.dtype_to_descr(dtype),
+                    'fortran_order': False, 'shape': (count,)})
+                written = 0
+                for records in read(input_name):
+                    records = records[:count - written]
+                    npy.write(np.ascontiguousarray(records[column]).tobytes())
+                    written += len(records)
+    return count
+
+
+def convert(input_name, output_format, output_name):
+    """ Convert a tree file.
+
+    Args:
+        input_name (str): The binary trace or the pickle file.
+        output_format (str): dot, adjlist, edgelist, yaml, or npz.
+        output_name (str): The output file.
+
+    Returns:
+        int: The number of nodes converted.
+    """
+    read = read_records if is_trace(input_name) else read_pickle
+    if output_format == 'npz':
+        return write_npz(input_name, read, output_name)
+    writers = {'dot': write_dot, 'adjlist': write_adjlist, 'edgelist': write_edgelist, 'yaml': write_yaml}
+    if output_format not in writers:
+        raise ValueError("unsupported output format %s" % output_format)
+    count = 0
+
+    def counted(chunks):
+        nonlocal count
+        for records in chunks:
+            count += len(records)
+            yield records
+
+    with open(output_name, 'w', buffering=2**20) as output_file:
+        writers[output_format](counted(read(input_name, text_chunk_records)), output_file)
+    return count
+
 
 if __name__ == '__main__':
     if len(sys.argv) > 3:
         if not os.path.isfile(sys.argv[1]):
             print ("ERROR: file", sys.argv[1], "not found")
             sys.exit(1)
-
-        G = nx.read_gpickle(sys.argv[1])
-        print ("converting a tree of", G.number_of_nodes(), "nodes ...")
-        if G.number_of_nodes() > 1000:
-            print ("WARNING: the tree is very big. You will probably run out of memory!")
-            input("Press any to continue or CTRL+C to abort...")
-        if sys.argv[2] == 'dot':
-            nx.drawing.nx_pydot.write_dot(G, sys.argv[3])
-        elif sys.argv[2] == 'adjlist':
-            nx.write_adjlist(G, sys.argv[3])
-        elif sys.argv[2] == 'yaml':
-            nx.write_yaml(G, sys.argv[3])
-        elif sys.argv[2] == 'edgelist':
-            nx.write_edgelist(G, sys.argv[3], data=True)
-        else:
-            print ("ERROR: unsupported output format", sys.argv[2])
+        start_time = time.time()
+        try:
+            count = convert(sys.argv[1], sys.argv[2], sys.argv[3])
+        except ValueError as e:
+            print ("ERROR:", e)
+            sys.exit(1)
+        print ("converted a tree of", count, "nodes in %.2f s" % (time.time() - start_time))
     else:
         print("ERROR: The required arguments are:")
-        print (" $ ./tree_convert <input_pickle_file> <output_format> <ouput_filename>')")
-        print (" suported formats: dot, adjlist, edgelist, yaml")
+        print (" $ ./tree_convert <input_trace_or_pickle_file> <output_format> <ouput_filename>')")
+        print (" suported formats: dot, adjlist, edgelist, yaml, npz")
@@ -0,0 +1,239 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Tidy layout of the search tree, computed in linear time from the parent of each node.
+
+    This is the Reingold-Tilford algorithm, in the linear time version of Walker's algorithm by
+    "Buchheim, C., Junger, M. & Leipert, S. Improving Walker's algorithm to run in linear time.
+    Graph Drawing (2002): 344-353". The nodes of the same depth are at least one unit apart,
+    each parent is centered over its children, and identical subtrees are drawn identically.
+
+    Both traversals are iterative, so there is no recursion limit on the depth of the tree.
+"""
+
+import time # used for performance measurements
+import sys
+import random
+import numpy as np
+
+
+def children_lists(parent_row):
+    """ The children of each node, in the order of their positions.
+
+    A virtual root, at position n, is the parent of all the nodes without a parent.
+
+    Args:
+        parent_row (:class:`numpy.ndarray`): The position of the parent of each node. -1 for the roots.
+
+    Returns:
+        [int], [int]: The children of all the nodes, and the start of the children of each node (CSR format).
+    """
+    n = len(parent_row)
+    parent = np.where(parent_row >= 0, parent_row, n)
+    order = np.argsort(parent, kind='stable')
+    start = np.zeros(n + 2, dtype=np.int64)
+    np.cumsum(np.bincount(parent, minlength=n + 1), out=start[1:])
+    return order.tolist(), start.tolist()
+
+
+def tidy_layout(parent_row, distance=1.0):
+    """ Compute the tidy drawing of a tree (or forest).
+
+    Args:
+        parent_row (:class:`numpy.ndarray`): The position of the parent of each node. -1 for the roots.
+        distance (float): Min horizontal distance between nodes of the same depth.
+
+    Returns:
+        :class:`numpy.ndarray`, :class:`numpy.ndarray`: The x and y of each node. y is minus the depth.
+    """
+    parent_row = np.asarray(parent_row, dtype=np.int64)
+    n = len(parent_row)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    children, start = children_lists(parent_row)
+    root = n
+    parent = np.where(parent_row >= 0, parent_row, n).tolist() + [-1]
+    size = n + 1
+    # position of each node among its siblings
+    number = [0] * size
+    for v in range(size):
+        for k in range(start[v], start[v+1]):
+            number[children[k]] = k - start[v]
+    prelim = [0.0] * size
+    mod = [0.0] * size
+    shift = [0.0] * size
+    change = [0.0] * size
+    thread = [-1] * size
+    ancestor = list(range(size))
+    # default ancestor used by apportion, per parent
+    default_ancestor = [children[start[v]] if start[v] < start[v+1] else -1 for v in range(size)]
+
+    def next_left(v):
+        return children[start[v]] if start[v] < start[v+1] else thread[v]
+
+    def next_right(v):
+        return children[start[v+1]-1] if start[v] < start[v+1] else thread[v]
+
+    def apportion(v):
+        # v has a left sibling
+        p = parent[v]
+        first = start[p]
+        vir = vor = v
+        vil = children[first + number[v] - 1]
+        vol = children[first]
+        sir = sor = mod[vir]
+        sil = mod[vil]
+        sol = mod[vol]
+        vil, vir = next_right(vil), next_left(vir)
+        while vil >= 0 and vir >= 0:
+            vol = next_left(vol)
+            vor = next_right(vor)
+            ancestor[vor] = v
+            move = (prelim[vil] + sil) - (prelim[vir] + sir) + distance
+            if move > 0:
+                a = ancestor[vil]
+                if parent[a] != p:
+                    a = default_ancestor[p]
+                # move the subtree of v, spreading the move over the subtrees between a and v
+                subtrees = number[v] - number[a]
+                change[v] -= move / subtrees
+                shift[v] += move
+                change[a] += move / subtrees
+                prelim[v] += move
+                mod[v] += move
+                sir += move
+                sor += move
+            sil += mod[vil]
+            sir += mod[vir]
+            sol += mod[vol]
+            sor += mod[vor]
+            vil, vir = next_right(vil), next_left(vir)
+        if vil >= 0 and next_right(vor) < 0:
+            thread[vor] = vil
+            mod[vor] += sil - sor
+        if vir >= 0 and next_left(vol) < 0:
+            thread[vol] = vir
+            mod[vol] += sir - sol
+            default_ancestor[p] = v
+
+    # first walk, in post order: every subtree is placed before the next sibling
+    stack = [root]
+    visited = [False] * size
+    while stack:
+        v = stack[-1]
+        if not visited[v]:
+            visited[v] = True
+            stack.extend(reversed(children[start[v]:start[v+1]]))
+            continue
+        stack.pop()
+        left_sibling = children[start[parent[v]] + number[v] - 1] if v != root and number[v] > 0 else -1
+        if start[v] == start[v+1]:
+            prelim[v] = prelim[left_sibling] + distance if left_sibling >= 0 else 0.0
+        else:
+            # execute the shifts of the children
+            total_shift = 0.0
+            total_change = 0.0
+            for k in range(start[v+1]-1, start[v]-1, -1):
+                w = children[k]
+                prelim[w] += total_shift
+                mod[w] += total_shift
+                total_change += change[w]
+                total_shift += shift[w] + total_change
+            midpoint = (prelim[children[start[v]]] + prelim[children[start[v+1]-1]]) / 2.0
+            if left_sibling >= 0:
+                prelim[v] = prelim[left_sibling] + distance
+                mod[v] = prelim[v] - midpoint
+            else:
+                prelim[v] = midpoint
+        if left_sibling >= 0:
+            apportion(v)
+
+    # second walk: the x of each node is its prelim plus the mods of its ancestors, computed depth by depth
+    prelim = np.array(prelim)
+    mod = np.array(mod)
+    parent = np.array(parent[:n])
+    depth = np.zeros(n, dtype=np.int64)
+    offset = np.zeros(size)
+    offset[root] = mod[root]
+    rows = np.flatnonzero(parent == root)
+    level = 0
+    children = np.array(children)
+    start = np.array(start)
+    while len(rows) > 0:
+        depth[rows] = level
+        offset[rows] = offset[parent[rows]] + mod[rows]
+        # the next level: the children of the nodes in this level
+        counts = start[rows + 1] - start[rows]
+        index = np.repeat(start[rows] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        rows = children[index]
+        level += 1
+    x = prelim[:n] + offset[parent]
+    return x - x.min(), np.negative(depth).astype(float)
+
+
+def random_tree(n, seed=0):
+    """ Random binary tree with n nodes, grown like a depth first search.
+
+    Args:
+        n (int): Number of nodes.
+        seed (int): Random seed.
+
+    Returns:
+        :class:`numpy.ndarray`: The position of the parent of each node.
+    """
+    rnd = random.Random(seed)
+    parent_row = [-1] * n
+    # nodes with less than two children
+    open_nodes = [0]
+    degree = [0] * n
+    for v in range(1, n):
+        # most of the time the deepest node is expanded, as in the depth first search
+        k = len(open_nodes) - 1 if rnd.random() < 0.8 else rnd.randrange(len(open_nodes))
+        p = open_nodes[k]
+        parent_row[v] = p
+        degree[p] += 1
+        if degree[p] == 2:
+            open_nodes[k] = open_nodes[-1]
+            open_nodes.pop()
+        open_nodes.append(v)
+    return np.array(parent_row)
+
+
+def check_layout(parent_row, x, y, distance=1.0):
+    """ Check that the nodes of the same depth do not overlap and that each parent is centered over its children.
+
+    Returns:
+        bool: True if the layout is tidy.
+    """
+    parent_row = np.asarray(parent_row)
+    for d in np.unique(y):
+        level = np.sort(x[y == d])
+        if len(level) > 1 and np.diff(level).min() < distance - 1e-6:
+            return False
+    has_parent = np.flatnonzero(parent_row >= 0)
+    parents = parent_row[has_parent]
+    left = np.full(len(x), np.inf)
+    right = np.full(len(x), -np.inf)
+    np.minimum.at(left, parents, x[has_parent])
+    np.maximum.at(right, parents, x[has_parent])
+    internal = np.isfinite(left)
+    return bool(np.allclose(x[internal], (left[internal] + right[internal]) / 2.0))
+
+
+def benchmark(sizes=(10**4, 10**5, 10**6)):
+    """ Report the time of the layout of random trees. """
+    print (' {:>10s} {:>10s} {:>8s}'.format("#Nodes","Time (s)","Tidy"))
+    for n in sizes:
+        parent_row = random_tree(n)
+        start_time = time.time()
+        x, y = tidy_layout(parent_row)
+        elapsed = time.time() - start_time
+        print (' {:10d} {:10.3f} {:>8s}'.format(n, elapsed, 'y' if check_layout(parent_row, x, y) else 'n'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark([int(n) for n in sys.argv[2:]] or (10**4, 10**5, 10**6))
+    else:
+        print("ERROR: The required arguments are:")
+        print (" $ ./tree_layout --benchmark [number of nodes ...]")
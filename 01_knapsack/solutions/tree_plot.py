@@ -1,10 +1,25 @@
 import matplotlib.pyplot as plt
-import networkx as nx
 import os,sys
-from networkx.drawing.nx_pydot import graphviz_layout
 import plotly.graph_objs as go
+from plotly.subplots import make_subplots
+import numpy as np
 import time
 
+try:
+    from solutions.tree_trace import RECORD_DTYPE, STATUS_COLORS, STATUS_OPEN, STATUS_PRUNED, STATUS_INCUMBENT, STATUS_INFEASIBLE
+    from solutions.tree_convert import COLUMNS, count_records, is_trace, read_pickle, read_records
+    from solutions.tree_layout import tidy_layout
+except ImportError:
+    from tree_trace import RECORD_DTYPE, STATUS_COLORS, STATUS_OPEN, STATUS_PRUNED, STATUS_INCUMBENT, STATUS_INFEASIBLE
+    from tree_convert import COLUMNS, count_records, is_trace, read_pickle, read_records
+    from tree_layout import tidy_layout
+
+# above this number of nodes, plotly shows the level-of-detail view instead of every node
+max_plot_nodes = 20000
+
+# number of bins of the bound histograms of the level-of-detail view
+histogram_bins = 20
+
 ######################################
 # tree ploting with graphviz
 ######################################
@@ -39,109 +54,111 @@ import time
 #    https://nbviewer.jupyter.org/gist/msund/11349097
 
 
-def plotly_tree(G, layout, title = '', edge_legend='', node_legend='', 
-    edge_weight_attrib_name='weight', node_weight_attrib_name='weight',
-    edge_hover_template='', node_hover_template='',
-    edge_customdata=[], node_customdata=[]):
-    """ Plot the graph using `Plotly <https://plotly.com/>`_.
+def load_tree(file_name):
+    """ Load the tree as one NumPy array per field.
 
     Args:
-        G (:class:`networkx.DiGraph`): The directed graph.
-        layout (str): One of the graph layouts supported by networkx.
+        file_name (str): A binary trace, a npz file saved by tree_convert.py, or a Networkx graph in Pickle format.
 
     Returns:
-        :class:`plotly.graph_objects.Figure`: The graph figure by plotly.
+        dict: The arrays node, parent, value, estimate, room, depth, and status, plus 'parent_row', the position
+            of the parent of each node (-1 for the root or when the parent is not in the tree, e.g. sampled traces).
+    """
+    if file_name.endswith('.npz'):
+        with np.load(file_name) as npz:
+            tree = {c: npz[c] for c in COLUMNS}
+    elif is_trace(file_name):
+        # the columns are filled chunk by chunk, without a copy of the whole trace
+        count = count_records(file_name)
+        tree = {c: np.empty(count, dtype=RECORD_DTYPE[c]) for c in COLUMNS}
+        start = 0
+        for records in read_records(file_name):
+            for c in COLUMNS:
+                tree[c][start:start+len(records)] = records[c]
+            start += len(records)
+    else:
+        records = np.concatenate(list(read_pickle(file_name)))
+        tree = {c: np.ascontiguousarray(records[c]) for c in COLUMNS}
+    # the records are in creation order, so the node ids are sorted
+    row = np.searchsorted(tree['node'], tree['parent'])
+    row = np.minimum(row, max(len(row) - 1, 0))
+    found = (tree['parent'] >= 0) & (tree['node'][row] == tree['parent'])
+    tree['parent_row'] = np.where(found, row, -1)
+    return tree
+
+
+def node_colors(tree):
+    """ Colors of the nodes, as in the Networkx graph saved by the older versions. The best solution is red. """
+    colors = np.array(STATUS_COLORS, dtype=object)[tree['status']]
+    incumbents = np.flatnonzero(tree['status'] == STATUS_INCUMBENT)
+    if len(incumbents) > 0:
+        colors[incumbents[-1]] = 'red'
+    return colors
+
 
+def edge_trace(x, y, parent_row, rows=None):
+    """ All the edges in a single trace, separated by NaN.
 
+    Args:
+        x (:class:`numpy.ndarray`): The x of each node.
+        y (:class:`numpy.ndarray`): The y of each node.
+        parent_row (:class:`numpy.ndarray`): The position of the parent of each node.
+        rows (:class:`numpy.ndarray`): The nodes whose edge to the parent is drawn. By default, all of them.
+
+    Returns:
+        :class:`plotly.graph_objects.Scatter`: The edges.
     """
-    if layout == 'planar':
-        pos = nx.planar_layout(G)
-    elif layout == 'shell':
-        pos = nx.layout.shell_layout(G)
-    elif layout == 'spring':
-        pos = nx.layout.spring_layout(G)
-    elif layout == 'spectral':
-        pos = nx.layout.spectral_layout(G)
-    elif layout == 'spiral':
-        pos = nx.layout.spiral_layout(G)
-    elif layout == 'fruchterman_reingold':
-        pos = nx.layout.fruchterman_reingold_layout(G)
-    elif layout == 'dot':
-        pos = nx.nx_pydot.pydot_layout(G, prog="dot")
-    else:
-        print ("ERROR: unsupported graph layout", layout)
-        sys.exit(1)
+    if rows is None:
+        rows = np.arange(len(x))
+    rows = rows[parent_row[rows] >= 0]
+    parents = parent_row[rows]
+    nan = np.full(len(rows), np.nan)
+    return go.Scatter(x=np.column_stack((x[parents], x[rows], nan)).ravel(),
+                    y=np.column_stack((y[parents], y[rows], nan)).ravel(),
+                    mode='lines',
+                    line=dict(width=0.5, color='#888'),
+                    hoverinfo='skip')
 
-    # insert the posistion property into the nodes
-    for node in G.nodes:
-        G.nodes[node]['pos'] = list(pos[node])
 
-    # create the nodes
-    traceRecode = []
+def plotly_tree(tree, pos, title = '', node_hover_template='', node_customdata=None):
+    """ Plot the tree using `Plotly <https://plotly.com/>`_.
+
+    The edges are a single trace and the node attributes are NumPy arrays, so the cost grows
+    linearly with the number of nodes.
+
+    Args:
+        tree (dict): The arrays returned by :func:`load_tree`.
+        pos (tuple): The x and y arrays of the nodes.
+        title (str): The figure title.
+        node_hover_template (str): Plotly template of the node hover text.
+        node_customdata (:class:`numpy.ndarray`): One row of hover data per node.
+
+    Returns:
+        :class:`plotly.graph_objects.Figure`: The graph figure by plotly.
+    """
+    x, y = pos
     start_time = time.time()
-    node_trace = go.Scatter(x=[], y=[], text=[], 
-                            mode='markers+text', 
-                            textposition="bottom center",
-                            hoverinfo="text", 
+    node_trace = go.Scattergl(x=x, y=y,
+                            text=tree['node'],
+                            mode='markers',
+                            hovertemplate=node_hover_template,
+                            customdata=node_customdata,
                             marker=dict(
-                                showscale=True,
-                                # colorscale options
-                                #'Greys' | 'YlGnBu' | 'Greens' | 'YlOrRd' | 'Bluered' | 'RdBu' |
-                                #'Reds' | 'Blues' | 'Picnic' | 'Rainbow' | 'Portland' | 'Jet' |
-                                #'Hot' | 'Blackbody' | 'Earth' | 'Electric' | 'Viridis' |
-                                #colorscale='Reds',
-                                #reversescale=False,
-                                color=[],
-                                size=50,
-                                # colorbar=dict(
-                                #     thickness=15,
-                                #     title=node_legend,
-                                #     xanchor='left',
-                                #     titleside='right'
-                                # )
+                                color=node_colors(tree),
+                                size=10 if len(x) < 1000 else 4,
                             )
                         )
-
-    # populating the nodes
-    # zip split the tuple into 2 vectors
-    x, y = zip(*list(nx.get_node_attributes(G,'pos').values()))
-    node_trace['x'] = x
-    node_trace['y'] = y
-    node_trace['text'] = list(G.nodes())
-    node_trace['hovertemplate'] = node_hover_template
-    node_trace.marker.color = list(nx.get_node_attributes(G,'color').values())
-    node_trace['customdata'] = node_customdata
     node_time = time.time() - start_time
 
-    # creating the edges
     start_time = time.time()
-    for edge in G.edges:
-        x0, y0 = G.nodes[edge[0]]['pos']
-        x1, y1 = G.nodes[edge[1]]['pos']
-        #weight = float(G.edges[edge]['TransactionAmt']) / max(edge1['TransactionAmt']) * 10
-        trace = go.Scatter(x=tuple([x0, x1, None]), y=tuple([y0, y1, None]),
-                        mode='lines',
-                        line=dict(width=0.5, color='#888'),
-                        line_shape='spline'
-                        #marker=dict(color=colors[index]),
-                        #opacity=1
-                        )
-        # TODO add arrows 
-        # https://plotly.com/python/text-and-annotations/
-        #fig.add_annotation(x=x1, y=y1,
-        #    showarrow=True,
-        #    arrowhead=1)
-        traceRecode.append(trace)
+    edges = edge_trace(x, y, tree['parent_row'])
     edge_time = time.time() - start_time
-    
+
     start_time = time.time()
-    traceRecode.append(node_trace)
     fig = go.Figure(
-                #data=[edge_trace, middle_hover_trace, node_trace],
-                data=traceRecode,
+                data=[edges, node_trace],
                 layout=go.Layout(
                     title= title,
-                    titlefont_size=16,
                     showlegend=False,
                     hovermode='closest',
                     margin=dict(b=20,l=5,r=5,t=40),
@@ -155,12 +172,120 @@ def plotly_tree(G, layout, title = '', edge_legend='', node_legend='',
     return fig
 
 
-def plotly(G, layout):
+def detail_depth(tree, max_nodes):
+    """ Deepest level such that the expanded nodes up to it are at most max_nodes.
+
+    Args:
+        tree (dict): The arrays returned by :func:`load_tree`.
+        max_nodes (int): Max number of nodes shown.
+
+    Returns:
+        int: The depth.
+    """
+    expanded = tree['status'] == STATUS_OPEN
+    per_depth = np.bincount(tree['depth'][expanded], minlength=int(tree['depth'].max()) + 1)
+    cumulative = np.cumsum(per_depth)
+    return max(int(np.searchsorted(cumulative, max_nodes, side='right')) - 1, 0)
+
+
+def ancestor_at_depth(tree, depth):
+    """ The ancestor of each node at a given depth (the node itself if it is not deeper). -1 if it is not in the tree. """
+    rows = np.arange(len(tree['depth']))
+    ancestor = rows.copy()
+    deeper = np.flatnonzero(tree['depth'] > depth)
+    while len(deeper) > 0:
+        ancestor[deeper] = tree['parent_row'][ancestor[deeper]]
+        deeper = deeper[ancestor[deeper] >= 0]
+        deeper = deeper[tree['depth'][ancestor[deeper]] > depth]
+    return ancestor
+
+
+def plotly_lod(tree, max_nodes=max_plot_nodes, title=''):
+    """ Level-of-detail view of a big tree.
+
+    Only the expanded nodes up to the depth where they fit in max_nodes are drawn. Below it,
+    each subtree is collapsed into its root, whose size shows the number of nodes in the subtree.
+    The pruned and infeasible nodes of each depth are aggregated into one glyph per depth, and the
+    histogram of their bounds is shown beside the tree, one row per depth.
+
+    Args:
+        tree (dict): The arrays returned by :func:`load_tree`.
+        max_nodes (int): Max number of nodes drawn.
+        title (str): The figure title.
+
+    Returns:
+        :class:`plotly.graph_objects.Figure`: The graph figure by plotly.
+    """
+    cut = detail_depth(tree, max_nodes)
+    depth = tree['depth']
+    status = tree['status']
+    ancestor = ancestor_at_depth(tree, cut)
+    # size of the collapsed subtrees
+    subtree = np.bincount(ancestor[ancestor >= 0], minlength=len(depth))
+    shown = np.flatnonzero((status != STATUS_PRUNED) & (status != STATUS_INFEASIBLE) & (depth <= cut))
+    incumbents = np.flatnonzero(status == STATUS_INCUMBENT)
+    if len(incumbents) > 0 and incumbents[-1] not in shown:
+        # the path to the best solution is always drawn
+        path = []
+        row = incumbents[-1]
+        while row >= 0:
+            path.append(row)
+            row = tree['parent_row'][row]
+        shown = np.union1d(shown, path)
+    sub = {c: tree[c][shown] for c in COLUMNS}
+    # parents of the shown nodes, as positions in 'shown'
+    row = np.searchsorted(shown, tree['parent_row'][shown])
+    row = np.minimum(row, max(len(shown) - 1, 0))
+    sub['parent_row'] = np.where((tree['parent_row'][shown] >= 0) & (shown[row] == tree['parent_row'][shown]), row, -1)
+    x, y = tidy_layout(sub['parent_row'])
+
+    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, column_widths=[0.75, 0.25], horizontal_spacing=0.02,
+        subplot_titles=('expanded nodes up to depth %d' % cut, 'bounds of the pruned nodes'))
+    fig.add_trace(edge_trace(x, y, sub['parent_row']), row=1, col=1)
+    collapsed = (sub['depth'] == cut) & (subtree[shown] > 1)
+    fig.add_trace(go.Scattergl(x=x, y=y, mode='markers',
+        customdata=np.column_stack((sub['node'], sub['value'], sub['estimate'], sub['room'], subtree[shown])),
+        hovertemplate="<br>".join(["node: %{customdata[0]}", "value: %{customdata[1]}", "estimate: %{customdata[2]}",
+            "room: %{customdata[3]}", "collapsed nodes: %{customdata[4]}"]),
+        marker=dict(color=node_colors(sub), size=np.where(collapsed, 4 + 2 * np.log2(np.maximum(subtree[shown], 1)), 4))),
+        row=1, col=1)
+
+    # one glyph per depth with the pruned and infeasible nodes
+    pruned = (status == STATUS_PRUNED) | (status == STATUS_INFEASIBLE)
+    max_depth = int(depth.max()) + 1
+    pruned_count = np.bincount(depth[status == STATUS_PRUNED], minlength=max_depth)
+    infeasible_count = np.bincount(depth[status == STATUS_INFEASIBLE], minlength=max_depth)
+    levels = np.flatnonzero(pruned_count + infeasible_count)
+    glyph_x = np.full(len(levels), (x.max() if len(x) > 0 else 0) + 1.0)
+    fig.add_trace(go.Scatter(x=glyph_x, y=-levels.astype(float), mode='markers+text', text=(pruned_count +
+        infeasible_count)[levels], textposition='middle right',
+        customdata=np.column_stack((levels, pruned_count[levels], infeasible_count[levels])),
+        hovertemplate="<br>".join(["depth: %{customdata[0]}", "pruned: %{customdata[1]}", "infeasible: %{customdata[2]}"]),
+        marker=dict(symbol='square', color='aquamarine', size=4 + 2 * np.log2(1 + (pruned_count + infeasible_count)[levels]))),
+        row=1, col=1)
+
+    # histogram of the bounds of the pruned nodes, per depth. The infeasible nodes have no meaningful bound
+    bounded = status == STATUS_PRUNED
+    if bounded.any():
+        estimate = tree['estimate'][bounded]
+        edges = np.linspace(estimate.min(), estimate.max() + 1, histogram_bins + 1)
+        counts, _, _ = np.histogram2d(depth[bounded], estimate, bins=(np.arange(max_depth + 1) - 0.5, edges))
+        fig.add_trace(go.Heatmap(z=counts, x=(edges[:-1] + edges[1:]) / 2, y=-np.arange(max_depth, dtype=float),
+            colorscale='Blues', showscale=False, hovertemplate="depth: %{y}<br>bound: %{x:.0f}<br>nodes: %{z}<extra></extra>"),
+            row=1, col=2)
+    fig.update_layout(title=title, showlegend=False, hovermode='closest', margin=dict(b=20,l=5,r=5,t=60))
+    fig.update_xaxes(showgrid=False, zeroline=False, showticklabels=False, row=1, col=1)
+    fig.update_yaxes(showgrid=False, zeroline=False, showticklabels=False)
+    return fig
+
+
+def plotly(tree, output_file=None, lod=None):
     """ plot an interactinve tree with Plotly.
 
     Args:
-        G (:class:`networkx.DiGraph`): The directed graph.
-        layout (str): One of the graph layouts supported by networkx.
+        tree (dict): The arrays returned by :func:`load_tree`.
+        output_file (str): The html file. If None, the figure is shown.
+        lod (bool): Use the level-of-detail view. By default, it is used above max_plot_nodes nodes.
 
     Returns:
         :class:`plotly.graph_objects.Figure`: The graph figure by plotly.
@@ -168,41 +293,72 @@ def plotly(G, layout):
     """
 
     title = 'Knapsack Tree'
-    edge_legend=''
-    node_legend=''
-    edge_weight_attrib_name='' 
-    node_weight_attrib_name=''
-    edge_hover_template="" 
-    node_hovertemplate="<br>".join([
-            "value: %{customdata[0]}",
-            "estimate: %{customdata[1]}",
-            "room: %{customdata[2]}"
-        ])
-
-    # populating the node hover data
-    # the map converts every element of the list (int) into string
-    # https://stackoverflow.com/questions/26320175/how-to-convert-integers-in-list-to-string-in-python#26320200
-    value = list(map(str, list(nx.get_node_attributes(G,'value').values())))
-    estimate = list(map(str, list(nx.get_node_attributes(G,'estimate').values())))
-    room = list(map(str, list(nx.get_node_attributes(G,'room').values())))
-    # convert the lists into a single list of 5-item tuple
-    node_customdata = list(zip(value, estimate, room))
-   
-    # populating the edge hover data
-    # since every edge is a new plotly scater, a list of customdata is necessary,
-    # one for every edge of the graph
-    edge_customdata = []
-    #for edge in G.edges:
-    #    edge_customdata.append((G.edges[edge]['name'], str(G.edges[edge]['size'])))
-
-    fig = plotly_tree(G, layout, 
-        title, edge_legend, node_legend, 
-        edge_weight_attrib_name, node_weight_attrib_name, 
-        edge_hover_template,node_hovertemplate, 
-        edge_customdata, node_customdata
-        )
-
-    fig.show()
+    if lod is None:
+        lod = len(tree['node']) > max_plot_nodes
+    if lod:
+        fig = plotly_lod(tree, max_plot_nodes, title)
+    else:
+        node_hovertemplate="<br>".join([
+                "value: %{customdata[0]}",
+                "estimate: %{customdata[1]}",
+                "room: %{customdata[2]}"
+            ])
+        # populating the node hover data, one row per node
+        node_customdata = np.column_stack((tree['value'], tree['estimate'], tree['room']))
+        fig = plotly_tree(tree, tidy_layout(tree['parent_row']), title, node_hovertemplate, node_customdata)
+
+    if output_file is not None and output_file.endswith('.html'):
+        fig.write_html(output_file)
+    else:
+        fig.show()
+    return fig
+
+
+def radial(x, y, distance=1.0):
+    """ Wrap a tidy layout around the root: the x is the angle and the depth the radius, like graphviz twopi.
+
+    Args:
+        x (:class:`numpy.ndarray`): The x of each node.
+        y (:class:`numpy.ndarray`): The y of each node, minus the depth.
+        distance (float): Min horizontal distance between nodes of the same depth.
+
+    Returns:
+        :class:`numpy.ndarray`, :class:`numpy.ndarray`: The new x and y of each node.
+    """
+    if len(x) == 0:
+        return x, y
+    angle = 2 * np.pi * (x - x.min()) / (x.max() - x.min() + distance)
+    return -y * np.cos(angle), -y * np.sin(angle)
+
+
+def matplotlib_tree(tree, output_file=None, radial_layout=False):
+    """ Plot the tree with matplotlib, using the tidy layout.
+
+    The edges are a single LineCollection and the nodes a single scatter, so big trees can be drawn.
+
+    Args:
+        tree (dict): The arrays returned by :func:`load_tree`.
+        output_file (str): The image file. If None, the figure is shown.
+        radial_layout (bool): Wrap the layout around the root. See :func:`radial`.
+    """
+    from matplotlib.collections import LineCollection
+    x, y = tidy_layout(tree['parent_row'])
+    if radial_layout:
+        x, y = radial(x, y)
+    rows = np.flatnonzero(tree['parent_row'] >= 0)
+    parents = tree['parent_row'][rows]
+    segments = np.stack((np.column_stack((x[parents], y[parents])), np.column_stack((x[rows], y[rows]))), axis=1)
+    fig, ax = plt.subplots(figsize=(16, 9))
+    ax.add_collection(LineCollection(segments, colors='#888', linewidths=0.5))
+    ax.scatter(x, y, c=node_colors(tree).tolist(), s=20 if len(x) < 1000 else 1, zorder=2)
+    ax.set_axis_off()
+    ax.autoscale()
+    if radial_layout:
+        ax.set_aspect('equal')
+    if output_file is not None:
+        fig.savefig(output_file, dpi=150)
+    else:
+        plt.show()
 
 
 if __name__ == '__main__':
@@ -211,36 +367,24 @@ if __name__ == '__main__':
             print ("ERROR: file", sys.argv[1], "not found")
             sys.exit(1)
 
-        G = nx.read_gpickle(sys.argv[1])
-        pos = None
-        print ("ploting a tree of", G.number_of_nodes(), "nodes ...")
-        if G.number_of_nodes() > 1000:
-            print ("WARNING: the tree is very big. You will probably run out of memory!")
-            input("Press any to continue or CTRL+C to abort...")
-        if sys.argv[2] == 'twopi':
-            pos = graphviz_layout(G, prog="twopi")
-        elif sys.argv[2] == 'dot':
-            pos = graphviz_layout(G, prog="dot")
-        elif sys.argv[2] == 'circo':
-            pos = graphviz_layout(G, prog="circo")
-        elif sys.argv[2] == 'plotly':
-            plotly(G,'dot')
+        tree = load_tree(sys.argv[1])
+        print ("ploting a tree of", len(tree['node']), "nodes ...")
+        if sys.argv[2] == 'plotly':
+            plotly(tree, sys.argv[3])
+        elif sys.argv[2] == 'plotly-lod':
+            plotly(tree, sys.argv[3], lod=True)
+        elif sys.argv[2] in ('tidy', 'dot'):
+            # dot is kept as a name of the tidy layout, which replaced the layouts of graphviz
+            matplotlib_tree(tree, sys.argv[3])
+        elif sys.argv[2] in ('radial', 'twopi', 'circo'):
+            matplotlib_tree(tree, sys.argv[3], radial_layout=True)
         elif sys.argv[2] == 'altair':
             print ("ERROR: not implemented yet")
             pass
         else:
             print ("ERROR: unsupported output format", sys.argv[2])
 
-
-        if sys.argv[2] == 'twopi' or sys.argv[2] == 'dot' or sys.argv[2] == 'circo':
-            node_colors = [v['color'] for n,v in G.nodes(data=True)]
-            nx.draw(G, pos, node_color = node_colors)
-            plt.show()
-            p=nx.drawing.nx_pydot.to_pydot(G)
-            p.write_png(sys.argv[3])
-
     else:
         print("ERROR: The required arguments are:")
-        print (" $ ./tree_plot <input_pickle_file> <output_format> <ouput_filename>')")
-        print (" suported formats: dot, twopi, circo, plotly, altair")
-
+        print (" $ ./tree_plot <input_trace_npz_or_pickle_file> <output_format> <ouput_filename>')")
+        print (" suported formats: tidy, radial, plotly, plotly-lod, altair (dot is tidy, twopi and circo are radial)")
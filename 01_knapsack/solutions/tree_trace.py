@@ -0,0 +1,196 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Binary trace of the search tree of bb_heap.py.
+
+    The nodes are appended to the file while the search runs, as fixed-size records, so the
+    memory used does not depend on the size of the tree and a killed run keeps the nodes written so far.
+    The file starts with the 8-byte MAGIC, followed by one record per node:
+
+    ========== ======= ===============================================
+    field      type    description
+    ========== ======= ===============================================
+    node       int64   node id (the iteration that created the node)
+    parent     int64   id of the parent node. -1 for the root
+    value      int64   value of the taken items
+    estimate   int64   upper bound of the node
+    room       int64   room left in the knapsack. negative if infeasible
+    depth      int32   depth of the node in the tree
+    status     uint8   one of the STATUS_* constants
+    ========== ======= ===============================================
+
+    Each record has 48 bytes, with 3 bytes of padding at the end. The records are in creation order,
+    so a parent always comes before its children. The best solution is the last node with STATUS_INCUMBENT.
+
+    The trace can be sampled: only 1 node in *sample* (by node id) and only the nodes up to *max_depth*
+    are written. The nodes that improve the best solution are always written. When sampling, the
+    parent of a node may not be in the trace.
+"""
+
+import struct
+import time # used for performance measurements
+import os
+import sys
+import numpy as np
+
+MAGIC = b'KSTRACE1'
+
+RECORD = struct.Struct('<qqqqqiB3x')
+
+# the same record as a NumPy dtype, used to read the trace in bulk
+RECORD_DTYPE = np.dtype([('node', '<i8'), ('parent', '<i8'), ('value', '<i8'), ('estimate', '<i8'),
+    ('room', '<i8'), ('depth', '<i4'), ('status', 'u1'), ('pad', 'V3')])
+
+# node still to be expanded when it was created
+STATUS_OPEN = 0
+# the estimate of the node is not better than the best value
+STATUS_PRUNED = 1
+# the node improved the best solution
+STATUS_INCUMBENT = 2
+# the items taken do not fit in the knapsack
+STATUS_INFEASIBLE = 3
+
+# colors used by the previous Networkx graph of the tree
+STATUS_COLORS = ['gray', 'aquamarine', 'yellow', 'aquamarine']
+
+# number of records packed before each write
+batch_size = 4096
+
+
+class Trace_Writer:
+    def __init__(self, file_name, sample=1, max_depth=None, records=None):
+        """ Append the nodes of the search tree to a binary file.
+
+        Args:
+            file_name (str): The trace file. It is overwritten, unless records is given.
+            sample (int): Write 1 node in 'sample'.
+            max_depth (int): Write only the nodes up to this depth. None writes all depths.
+            records (int): Number of records to keep from an existing trace, to continue it after a
+                checkpoint. The records written after the checkpoint are discarded.
+        """
+        self.file_name = file_name
+        # number of records written
+        self.records = 0
+        if records is not None and os.path.isfile(file_name) and os.path.getsize(file_name) >= len(MAGIC) + records * RECORD.size:
+            self.file = open(file_name, 'r+b')
+            self.file.truncate(len(MAGIC) + records * RECORD.size)
+            self.file.seek(0, os.SEEK_END)
+            self.records = records
+        else:
+            self.file = open(file_name, 'wb')
+            self.file.write(MAGIC)
+        self.sample = sample
+        self.max_depth = max_depth if max_depth is not None else sys.maxsize
+        # packed records not written yet
+        self.buffer = []
+
+    def node(self, node, parent, value, estimate, room, depth, status):
+        """ Append a node to the trace, unless it is sampled out. """
+        if status != STATUS_INCUMBENT and (depth > self.max_depth or node % self.sample != 0):
+            return
+        self.buffer.append(RECORD.pack(node, parent, value, estimate, room, depth, status))
+        if len(self.buffer) >= batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Write the buffered records to the file. """
+        self.file.write(b''.join(self.buffer))
+        self.file.flush()
+        self.records += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        """ Write the remaining records and close the file. """
+        self.flush()
+        self.file.close()
+
+
+def read_records(file_name, chunk_records=2**20):
+    """ Read the records of a trace in chunks, using constant memory.
+
+    Args:
+        file_name (str): The trace file.
+        chunk_records (int): Max number of records in each chunk.
+
+    Returns:
+        generator of :class:`numpy.ndarray`: The records, with dtype RECORD_DTYPE. A truncated last record is ignored.
+    """
+    with open(file_name, 'rb') as trace_file:
+        if trace_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a search tree trace" % file_name)
+        while True:
+            data = trace_file.read(chunk_records * RECORD.size)
+            count = len(data) // RECORD.size
+            if count == 0:
+                break
+            yield np.frombuffer(data, dtype=RECORD_DTYPE, count=count)
+
+
+def summary(file_name):
+    """ Print the number of nodes per status and the best solution of a trace.
+
+    Args:
+        file_name (str): The trace file.
+    """
+    counts = np.zeros(len(STATUS_COLORS), dtype=np.int64)
+    nodes = 0
+    max_depth = 0
+    best = None
+    for records in read_records(file_name):
+        nodes += len(records)
+        counts += np.bincount(records['status'], minlength=len(STATUS_COLORS))[:len(STATUS_COLORS)]
+        max_depth = max(max_depth, int(records['depth'].max()))
+        incumbents = np.flatnonzero(records['status'] == STATUS_INCUMBENT)
+        if len(incumbents) > 0:
+            best = records[incumbents[-1]]
+    print ("%s: %d nodes, %d bytes, max depth %d" % (file_name, nodes, os.path.getsize(file_name), max_depth))
+    print (" - open: %d, pruned: %d, incumbent: %d, infeasible: %d" % tuple(counts))
+    if best is not None:
+        print (" - best node: %d, value: %d" % (best['node'], best['value']))
+
+
+def overhead(file_names, sample=1, max_depth=None):
+    """ Report the time of the search with and without the trace.
+
+    Args:
+        file_names ([str]): The instance files.
+        sample (int): Write 1 node in 'sample'.
+        max_depth (int): Write only the nodes up to this depth.
+    """
+    try:
+        import solutions.bb_heap as bb_heap
+    except ImportError:
+        import bb_heap
+    bb_heap.debug = False
+    print (' {:20s} {:>12s} {:>12s} {:>12s} {:>10s} {:>12s}'.format("Instance","#Nodes","No trace (s)","Trace (s)","Overhead","Trace size"))
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            input_data = input_data_file.read()
+        times = []
+        for trace in (False, True):
+            bb_heap.build_tree = trace
+            bb_heap.trace_sample = sample
+            bb_heap.trace_max_depth = max_depth
+            start_time = time.time()
+            bb_heap.solve_it(input_data)
+            times.append(time.time() - start_time)
+        records = (os.path.getsize(bb_heap.tree_file) - len(MAGIC)) // RECORD.size
+        print (' {:20s} {:12d} {:12.3f} {:12.3f} {:9.1f}% {:10.1f}MB'.format(os.path.basename(file_name), records,
+            times[0], times[1], 100.0 * (times[1] - times[0]) / max(times[0], 1e-9), os.path.getsize(bb_heap.tree_file) / 2.0**20))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--overhead':
+        # optional sampling: --overhead [--sample N] [--max-depth K] <instance files>
+        args = sys.argv[2:]
+        options = {'--sample': 1, '--max-depth': None}
+        while len(args) > 1 and args[0] in options:
+            options[args[0]] = int(args[1])
+            args = args[2:]
+        overhead(args, options['--sample'], options['--max-depth'])
+    elif len(sys.argv) > 1:
+        summary(sys.argv[1])
+    else:
+        print("ERROR: The required arguments are:")
+        print (" $ ./tree_trace <trace_file>")
+        print (" $ ./tree_trace --overhead [--sample N] [--max-depth K] <instance files>")
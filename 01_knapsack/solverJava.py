@@ -1,37 +1,155 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+""" Runs the Java solver (Solver.java) from Python.
+
+    A single 'java Solver -worker' process solves all the instances, so the JVM starts only once.
+    The instances and the solutions are sent through its standard input and output as frames:
+    the length in bytes (4 bytes, big endian) followed by the UTF-8 text. When the solver fails on an
+    instance, the worker sends the error message with a negative length and keeps running, and the
+    error is raised as a ValueError. No temporary file is used, so several runs can share the same directory.
+"""
+
 import os
+import time # used for performance measurements
+import struct
+import atexit
+import threading
 from subprocess import Popen, PIPE
 
-def solve_it(input_data):
+# max number of times a crashed worker is restarted for the same instance
+max_restarts = 1
+
+
+class Java_Worker:
+    def __init__(self, command=None):
+        """ Connection to a long-lived Java worker. It is started on the first instance and restarted when it crashes.
+
+        Args:
+            command ([str]): The command that starts the worker. By default, the Solver class next to this file.
+        """
+        if command is None:
+            command = ['java', '-cp', os.path.dirname(os.path.abspath(__file__)), 'Solver', '-worker']
+        self.command = command
+        self.process = None
+        # number of times the worker was started. used to report the restarts
+        self.starts = 0
+        # one instance at a time per worker
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.process = Popen(self.command, stdin=PIPE, stdout=PIPE)
+        self.starts += 1
+
+    def close(self, kill=False):
+        """ Stop the worker. Closing its input is enough, unless it is stuck or crashed. """
+        if self.process is None:
+            return
+        if kill:
+            self.process.kill()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+    def request(self, input_data):
+        """ Send one instance and wait for its solution. A negative length is an error frame.
+
+        Raises:
+            ValueError: If the solver failed on this instance. The worker is still running.
+        """
+        payload = input_data.encode('utf-8')
+        self.process.stdin.write(struct.pack('>I', len(payload)) + payload)
+        self.process.stdin.flush()
+        size = struct.unpack('>i', self.read(4))[0]
+        if size < 0:
+            raise ValueError('the java solver failed: %s' % self.read(-size).decode('utf-8'))
+        return self.read(size).decode('utf-8')
 
-    # Writes the inputData to a temporay file
+    def read(self, size):
+        data = self.process.stdout.read(size)
+        if len(data) < size:
+            raise EOFError('the java worker closed its output')
+        return data
 
-    tmp_file_name = 'tmp.data'
-    tmp_file = open(tmp_file_name, 'w')
-    tmp_file.write(input_data)
-    tmp_file.close()
+    def solve(self, input_data):
+        """ Solve an instance. A worker that crashes is restarted and the instance is sent again.
 
-    # Runs the command: java Solver -file=tmp.data
+        Args:
+            input_data (str): The problem in the input format.
 
-    process = Popen(['java', 'Solver', '-file=' + tmp_file_name], stdout=PIPE, universal_newlines=True)
-    (stdout, stderr) = process.communicate()
+        Returns:
+            str: The output of the Java solver.
+        """
+        with self.lock:
+            for attempt in range(max_restarts + 1):
+                if self.process is None or self.process.poll() is not None:
+                    self.close()
+                    self.start()
+                try:
+                    return self.request(input_data)
+                except (OSError, EOFError) as e:
+                    error = e
+                    self.close(kill=True)
+            raise RuntimeError('the java worker failed %d times: %s' % (max_restarts + 1, error))
 
-    # removes the temporay file
-    os.remove(tmp_file_name)
 
-    return stdout.strip()
+# the worker shared by the calls of solve_it
+_worker = None
+
+
+def get_worker():
+    """ The worker of this process, created on the first call. """
+    global _worker
+    if _worker is None:
+        _worker = Java_Worker()
+        atexit.register(_worker.close)
+    return _worker
+
+
+def solve_it(input_data):
+    return get_worker().solve(input_data).strip()
+
+
+def throughput(data_dir):
+    """ Solve every instance of data_dir with the shared worker and with one worker per instance (one JVM per instance,
+    as when the solver was started for each call), and report the instances per second.
+
+    Args:
+        data_dir (str): The directory with the instances.
+    """
+    file_names = sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir))
+    instances = []
+    for file_name in file_names:
+        with open(file_name, 'r') as input_data_file:
+            instances.append(input_data_file.read())
+    print (' {:20s} {:>10s} {:>10s} {:>14s}'.format("Worker","Instances","Time (s)","Instances/s"))
+    for shared in (False, True):
+        start_time = time.time()
+        worker = Java_Worker()
+        for input_data in instances:
+            worker.solve(input_data)
+            if not shared:
+                worker.close()
+        worker.close()
+        elapsed = time.time() - start_time
+        print (' {:20s} {:10d} {:10.3f} {:14.1f}'.format('shared' if shared else 'one per instance', len(instances),
+            elapsed, len(instances) / elapsed))
 
 
 import sys
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and sys.argv[1] == '--throughput':
+        # the instances per second with and without the shared worker
+        throughput(sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    elif len(sys.argv) > 1:
         file_location = sys.argv[1].strip()
         with open(file_location, 'r') as input_data_file:
             input_data = input_data_file.read()
         print(solve_it(input_data))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/ks_4_0)')
-
@@ -0,0 +1,201 @@
+#!/usr/bin/python3.6
+# -*- coding: utf-8 -*-
+
+""" Benchmark of the solver of a problem directory (01_knapsack, 02_coloring, ...) over its data directory.
+
+    Each instance runs in its own process, 'python benchmark.py --child <dir> <instance>', which imports
+    solver.py of the directory and calls its solve_it. Up to 'workers' instances run at the same time and an
+    instance is killed after 'timeout' seconds, with the processes it started (e.g. the race of dispatch.py).
+    For each instance, one JSON line is saved with:
+
+    * wall_time and cpu_time (s), and max_rss (KB) of the process, measured with os.wait4;
+    * objective and optimal, the first line of the solution;
+    * nodes, the 'nodes' of the 'last_decision' dict of the module of solve_it, e.g. dispatch.py. Otherwise,
+      the last number matched by 'nodes_pattern' in the messages of the solver, e.g. the number of
+      iterations printed by bb_heap.py. None when the solver does not report it;
+    * status: 'ok', 'timeout', or 'error'. The last line of the error messages is saved in 'error'.
+
+    When a baseline (the JSON lines of a previous run) is given, a table compares both runs.
+
+    Usage:
+
+        $ python benchmark.py [--workers N] [--timeout S] [--output <file>] [--baseline <file>] <dir> [instances]
+"""
+
+import os
+import re
+import sys
+import io
+import json
+import time # used for performance measurements
+import signal
+import threading
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# number of instances solved at the same time. None uses all cores
+workers = None
+
+# max time of an instance (s)
+timeout = 10 * 60
+
+# finds the number of nodes in the messages of the solver. The last match is used
+nodes_pattern = r'#(?:iterations|nodes):?\s*(\d+)'
+
+
+def run_child(problem_dir, file_name):
+    """ Solve one instance in this process and print its result as a JSON line.
+
+    The messages printed by the solver are captured, so only the result is printed. The number of nodes
+    is taken from the last_decision of the solver module, when it has one, or from its messages.
+
+    Args:
+        problem_dir (str): The problem directory, with solver.py.
+        file_name (str): The instance file.
+    """
+    file_name = os.path.abspath(file_name)
+    os.chdir(problem_dir)
+    sys.path.insert(0, os.getcwd())
+    import solver
+    with open(file_name, 'r') as input_data_file:
+        input_data = input_data_file.read()
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        output_data = solver.solve_it(input_data)
+    first_line = output_data.split('\n')[0].split()
+    decision = getattr(sys.modules[solver.solve_it.__module__], 'last_decision', None)
+    if isinstance(decision, dict) and decision.get('nodes') is not None:
+        nodes = int(decision['nodes'])
+    else:
+        matches = re.findall(nodes_pattern, messages.getvalue())
+        nodes = int(matches[-1]) if matches else None
+    objective = float(first_line[0])
+    print (json.dumps({'objective': int(objective) if objective.is_integer() else objective, 'optimal': int(first_line[1]) if len(first_line) > 1 else 0,
+        'nodes': nodes}))
+
+
+def run_instance(problem_dir, file_name):
+    """ Solve one instance in a new process, killed after 'timeout' seconds with the processes it started.
+
+    Args:
+        problem_dir (str): The problem directory, with solver.py.
+        file_name (str): The instance file.
+
+    Returns:
+        dict: The result of the instance. See the module documentation.
+    """
+    result = {'instance': os.path.basename(file_name), 'status': 'ok', 'objective': None, 'optimal': None,
+        'nodes': None, 'error': None}
+    start_time = time.time()
+    # the child leads a new process group, so the processes it starts are killed with it. Otherwise, they keep
+    # the output pipe open after the timeout. The error messages go to the same pipe, before the result
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', problem_dir, file_name],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, start_new_session=True)
+
+    def expire():
+        result['status'] = 'timeout'
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    output = process.stdout.read()
+    # os.wait4 gives the resource usage of this process only, not of the other instances
+    _, status, usage = os.wait4(process.pid, 0)
+    timer.cancel()
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+    process.stdout.close()
+    result['wall_time'] = time.time() - start_time
+    result['cpu_time'] = usage.ru_utime + usage.ru_stime
+    result['max_rss'] = usage.ru_maxrss
+    lines = output.strip().split('\n')
+    if result['status'] == 'ok':
+        if process.returncode != 0 or not output.strip():
+            result['status'] = 'error'
+            result['error'] = lines[-1] if output.strip() else 'exit status %d' % process.returncode
+        else:
+            result.update(json.loads(lines[-1]))
+    return result
+
+
+def run_benchmark(problem_dir, file_names, output_name):
+    """ Solve the instances in parallel and save the results as JSON lines, in the order of file_names.
+
+    Args:
+        problem_dir (str): The problem directory, with solver.py.
+        file_names ([str]): The instance files.
+        output_name (str): The JSON lines file.
+
+    Returns:
+        [dict]: The results of the instances.
+    """
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_instance, problem_dir, f) for f in file_names]
+        results = []
+        with open(output_name, 'w') as output_file:
+            for future in futures:
+                result = future.result()
+                output_file.write(json.dumps(result) + '\n')
+                output_file.flush()
+                results.append(result)
+                print (' - %-20s %-8s %10.3f s %s' % (result['instance'], result['status'], result['wall_time'],
+                    result['error'] or ''))
+    return results
+
+
+def load_results(file_name):
+    """ Load the JSON lines saved by run_benchmark, by instance name. """
+    with open(file_name, 'r') as input_file:
+        results = [json.loads(line) for line in input_file if line.strip()]
+    return {r['instance']: r for r in results}
+
+
+def print_comparison(results, baseline):
+    """ Print the results next to the results of the baseline.
+
+    Args:
+        results ([dict]): The results of this run.
+        baseline (dict): The results of the baseline, by instance name. None to print only this run.
+    """
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    print (' {:20s} {:>8s} {:>14s} {:>14s} {:>4s} {:>4s} {:>10s} {:>10s} {:>7s} {:>12s} {:>12s} {:>9s}'.format("Instance",
+        "Status","Objective","Baseline","Opt","Base","Time (s)","Base (s)","Speedup","#Nodes","Base nodes","RSS (MB)"))
+    for r in results:
+        b = baseline.get(r['instance'], {}) if baseline is not None else {}
+        speedup = b['wall_time'] / r['wall_time'] if b.get('wall_time') and r['status'] == 'ok' else None
+        print (' {:20s} {:>8s} {:>14s} {:>14s} {:>4s} {:>4s} {:>10s} {:>10s} {:>7s} {:>12s} {:>12s} {:>9s}'.format(
+            r['instance'], r['status'], fmt(r['objective'], '.0f'), fmt(b.get('objective'), '.0f'),
+            fmt(r['optimal'], 'd'), fmt(b.get('optimal'), 'd'), fmt(r['wall_time'], '.3f'), fmt(b.get('wall_time'), '.3f'),
+            fmt(speedup, '.2f'), fmt(r['nodes'], 'd'), fmt(b.get('nodes'), 'd'), fmt(r['max_rss'] / 1024.0, '.1f')))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1:
+        args = sys.argv[1:]
+        options = {'--workers': (int, None), '--timeout': (float, 10 * 60), '--output': (str, None),
+            '--baseline': (str, None)}
+        settings = {k: default for k, (_, default) in options.items()}
+        while len(args) > 1 and args[0] in options:
+            settings[args[0]] = options[args[0]][0](args[1])
+            args = args[2:]
+        workers = settings['--workers']
+        timeout = settings['--timeout']
+        problem_dir = os.path.abspath(args[0])
+        if len(args) > 1:
+            file_names = [os.path.abspath(f) for f in args[1:]]
+        else:
+            data_dir = os.path.join(problem_dir, 'data')
+            file_names = sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir)
+                if os.path.isfile(os.path.join(data_dir, f)))
+        output_name = settings['--output'] or os.path.join(problem_dir, 'benchmark.jsonl')
+        results = run_benchmark(problem_dir, file_names, output_name)
+        print_comparison(results, load_results(settings['--baseline']) if settings['--baseline'] else None)
+    else:
+        print('This benchmark requires a problem directory. (i.e. python benchmark.py --timeout 60 01_knapsack)')